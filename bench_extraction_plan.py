@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+字段提取规格的基准测试: 编译后的一次遍历计划 vs 每个路径单独取值
+
+用法:
+    python bench_extraction_plan.py [平台 页面状态.json ...]
+
+不传文件时使用按线上页面结构构造的抖音、小红书样例数据
+"""
+
+import sys
+import os
+import json
+import timeit
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils import config
+from src.utils.extraction import compile_spec, parse_path, get_plan
+
+
+def walk_path(data, steps):
+    """不共享前缀，单独按一个路径取值"""
+    values = [data]
+    for kind, arg in steps:
+        next_values = []
+        for value in values:
+            if kind == 0 and isinstance(value, dict) and arg in value:
+                next_values.append(value[arg])
+            elif kind == 1 and isinstance(value, list) and arg < len(value):
+                next_values.append(value[arg])
+            elif kind == 2 and isinstance(value, list):
+                next_values.extend(value)
+        values = next_values
+    return [value for value in values if value is not None and value != ""]
+
+
+def per_path(spec, parsed, data):
+    """逐字段、逐路径单独遍历（编译计划之前的做法）"""
+    result = {}
+    for name, alternatives in spec.items():
+        chosen = []
+        for alternative in alternatives:
+            paths = [alternative] if isinstance(alternative, str) else alternative
+            chosen = [value for path in paths for value in walk_path(data, parsed[path])]
+            if chosen:
+                break
+        result[name] = chosen if name.endswith("_list") else (chosen[0] if chosen else None)
+    return result
+
+
+def sample_douyin():
+    def url_list(name):
+        return {"uri": name, "url_list": [f"https://p3.douyinpic.com/{name}.jpeg", f"https://p9/{name}"]}
+
+    return {
+        "videoInfoRes": {
+            "status_code": 0,
+            "item_list": [
+                {
+                    "desc": "抖音作品描述 @作者",
+                    "author": {"nickname": "抖音作者", "avatar_thumb": url_list("avatar")},
+                    "images": [url_list(f"img{i}") for i in range(9)],
+                    "video": {
+                        "play_addr": url_list("playwm"),
+                        "cover": url_list("cover"),
+                        "origin_cover": url_list("origin"),
+                        "dynamic_cover": url_list("dynamic"),
+                    },
+                    "statistics": {"digg_count": 1, "comment_count": 2},
+                }
+            ],
+        }
+    }
+
+
+def sample_xiaohongshu():
+    return {
+        "noteId": "n0001",
+        "imageList": [
+            {
+                "urlDefault": f"https://sns-webpic-qc.xhscdn.com/202401/abc/token{i}!nd_dft_wlteh_webp_3",
+                "stream": {"h264": [{"masterUrl": f"https://sns-video/live{i}.mp4"}]},
+            }
+            for i in range(9)
+        ],
+        "video": {"media": {"stream": {"h264": [{"masterUrl": "https://sns-video/v.mp4"}]}}},
+    }
+
+
+def bench(app_type, data, number=20000):
+    spec = config.EXTRACTION_SPECS[app_type]
+    compile_time = timeit.timeit(lambda: compile_spec(spec), number=100) / 100
+    plan = get_plan(app_type)
+    parsed = {
+        path: parse_path(path)
+        for alternatives in spec.values()
+        for alternative in alternatives
+        for path in ([alternative] if isinstance(alternative, str) else alternative)
+    }
+    plan_time = timeit.timeit(lambda: plan.run(data), number=number) / number
+    path_time = timeit.timeit(lambda: per_path(spec, parsed, data), number=number) / number
+    print(f"[{app_type}] 编译: {compile_time * 1e6:.1f} us")
+    print(f"  编译计划一次遍历: {plan_time * 1e6:7.2f} us/次")
+    print(f"  逐路径单独遍历:   {path_time * 1e6:7.2f} us/次")
+    print(f"  结果一致: {plan.run(data) == per_path(spec, parsed, data)}")
+    print(f"  结果: {json.dumps(plan.run(data), ensure_ascii=False)[:200]}")
+
+
+def main():
+    args = sys.argv[1:]
+    if args:
+        for app_type, path in zip(args[::2], args[1::2]):
+            with open(path, "r", encoding="utf-8") as f:
+                bench(app_type, json.load(f))
+    else:
+        bench("douyin", sample_douyin())
+        bench("xiaohongshu", sample_xiaohongshu())
+
+
+if __name__ == "__main__":
+    main()
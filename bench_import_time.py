@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+启动耗时基准测试: 用 `python -X importtime -c "import main"` 统计导入 main:app 的总耗时
+
+用法:
+    python bench_import_time.py [运行次数] [--top N]
+
+取多次运行的中位数，超过 IMPORT_TIME_BUDGET_MS（毫秒）时以非 0 状态退出，可直接用于 CI
+"""
+
+import sys
+import os
+import re
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, ROOT)
+
+from src.utils.config import config
+
+# import time: self [us] | cumulative | imported package
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def run_once():
+    """在新进程中导入 main，返回 (总耗时微秒, [(自身耗时, 累计耗时, 模块名), ...])"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    modules = []
+    total = 0
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append((int(self_us), int(cumulative_us), name))
+        # 缩进最少的是顶层导入，累加得到总耗时
+        if len(indent) == 1:
+            total += int(cumulative_us)
+    return total, modules
+
+
+def main():
+    args = sys.argv[1:]
+    top = 15
+    if "--top" in args:
+        index = args.index("--top")
+        top = int(args[index + 1])
+        del args[index:index + 2]
+    runs = int(args[0]) if args else 5
+
+    totals = []
+    modules = []
+    for _ in range(runs):
+        total, modules = run_once()
+        totals.append(total / 1000)
+    median = statistics.median(totals)
+
+    print(f"导入 main 总耗时（{runs} 次）: 中位数 {median:.1f} ms, 最小 {min(totals):.1f} ms, 最大 {max(totals):.1f} ms")
+    print(f"累计耗时最多的 {top} 个模块（最后一次运行）:")
+    for self_us, cumulative_us, name in sorted(modules, key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms (自身 {self_us / 1000:6.1f} ms)  {name}")
+
+    budget = config.IMPORT_TIME_BUDGET_MS
+    if median > budget:
+        print(f"超出启动耗时预算: {median:.1f} ms > {budget} ms")
+        sys.exit(1)
+    print(f"在启动耗时预算内: {median:.1f} ms <= {budget} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+快手 INIT_STATE 扁平化查找的基准测试: 迭代、提前结束的查找 vs 原递归查找
+
+用法:
+    python bench_kuaishou_walker.py [抓取的页面.html 或 INIT_STATE.json ...]
+
+不传文件时使用按线上页面结构构造的样例数据
+"""
+
+import sys
+import os
+import json
+import timeit
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.app.kuaishou.index import Kuaishou
+from src.utils.state_blob import extract_state
+
+
+def legacy_flat_search_data(ks, data_dict, user_name="", counter=None):
+    """原递归查找（改为迭代前的实现），counter 用于统计访问的节点数"""
+    if counter is not None:
+        counter[0] += 1
+    if isinstance(data_dict, dict):
+        for key in ["userName", "authorName", "nickname", "author"]:
+            if key in data_dict and isinstance(data_dict[key], str) and len(data_dict[key]) > 1:
+                user_name = data_dict[key]
+                if not ks.title:
+                    ks.title = user_name
+                break
+        if "user" in data_dict and isinstance(data_dict["user"], dict):
+            user_dict = data_dict["user"]
+            for key in ["name", "userName", "nickname"]:
+                if key in user_dict and isinstance(user_dict[key], str) and len(user_dict[key]) > 1:
+                    user_name = user_dict[key]
+                    if not ks.title:
+                        ks.title = user_name
+                    break
+        for key in ["caption", "description", "desc", "title"]:
+            if not ks.description and key in data_dict:
+                desc_text = data_dict[key]
+                if isinstance(desc_text, str) and len(desc_text) > 2:
+                    ks.description = desc_text
+                    break
+        if not ks.video and "manifest" in data_dict:
+            ks.get_video_data(data_dict["manifest"])
+        if not ks.image_list and "ext_params" in data_dict:
+            ks.get_image_data(data_dict["ext_params"])
+        for key, value in data_dict.items():
+            if isinstance(value, (dict, list)):
+                legacy_flat_search_data(ks, value, user_name, counter)
+    elif isinstance(data_dict, list):
+        for item in data_dict:
+            if isinstance(item, (dict, list)):
+                legacy_flat_search_data(ks, item, user_name, counter)
+
+
+def new_extractor():
+    """构造一个未填充字段的 Kuaishou 实例（不请求页面）"""
+    ks = Kuaishou.__new__(Kuaishou)
+    ks.title = ""
+    ks.description = ""
+    ks.video = ""
+    ks.image_list = []
+    ks.image_prefix = "https://tx2.a.kwimgs.com/"
+    ks.nodes_visited = 0
+    return ks
+
+
+def sample_payload(feed_size=300, atlas=True):
+    """按线上 INIT_STATE 结构构造样例: 大量推荐流 / 配置数据 + 当前作品（atlas=False 时为只有视频的作品）"""
+    def feed_item(i):
+        return {
+            "id": f"feed{i}",
+            "tags": [{"type": 1, "name": f"tag{j}"} for j in range(5)],
+            "stats": {"like": i, "view": i * 10, "share": {"count": i, "channels": [1, 2, 3]}},
+            "cover": {"width": 720, "height": 1280, "urls": [{"cdn": "a", "u": f"x{i}"}]},
+        }
+
+    photo = {
+        "id": "3xabc",
+        "caption": "作品描述文本",
+        "manifest": {
+            "adaptationSet": [
+                {"representation": [{"url": "https://v.kwaicdn.com/video.mp4", "backupUrl": []}]}
+            ]
+        },
+    }
+    if atlas:
+        photo["ext_params"] = {"atlas": {"list": ["upic/2024/01/01/a.jpg", "upic/2024/01/01/b.jpg"]}}
+    return {
+        "userAgent": {"isMobile": True},
+        "config": {"experiments": [{"k": f"exp{i}", "v": [i, {"on": True}]} for i in range(200)]},
+        "tv-8f2a": {
+            "result": 1,
+            "recommend": {"feeds": [feed_item(i) for i in range(feed_size)]},
+            "photo": photo,
+            "user": {"name": "快手作者"},
+        },
+    }
+
+
+def deep_payload(depth=5000):
+    """嵌套层级超过递归深度限制的数据"""
+    node = {"photo": sample_payload(0)["tv-8f2a"]["photo"], "user": {"name": "快手作者"}}
+    for _ in range(depth):
+        node = {"wrap": [node]}
+    return node
+
+
+def load_payload(path):
+    """读取抓取的页面或 INIT_STATE JSON"""
+    with open(path, "rb") as f:
+        content = f.read()
+    if path.endswith(".json"):
+        return json.loads(content)
+    return extract_state(content, "window.INIT_STATE")
+
+
+def bench(name, payload, number=200):
+    legacy_counter = [0]
+    legacy = new_extractor()
+    legacy_flat_search_data(legacy, payload, counter=legacy_counter)
+    current = new_extractor()
+    current.flat_search_data(payload)
+
+    legacy_time = timeit.timeit(lambda: legacy_flat_search_data(new_extractor(), payload), number=number)
+    current_time = timeit.timeit(lambda: new_extractor().flat_search_data(payload), number=number)
+
+    print(f"[{name}]")
+    print(f"  原递归查找: {legacy_time / number * 1e6:10.1f} us/次, 访问节点 {legacy_counter[0]}")
+    print(f"  迭代查找:   {current_time / number * 1e6:10.1f} us/次, 访问节点 {current.nodes_visited}")
+    print(f"  加速比: {legacy_time / current_time:.1f}x")
+    same = (legacy.title, legacy.description, legacy.video, legacy.image_list) == (
+        current.title, current.description, current.video, current.image_list
+    )
+    print(f"  结果一致: {same}")
+
+
+def main():
+    paths = sys.argv[1:]
+    if paths:
+        for path in paths:
+            payload = load_payload(path)
+            if payload is None:
+                print(f"[{path}] 未找到 window.INIT_STATE")
+                continue
+            bench(os.path.basename(path), payload)
+    else:
+        bench("样例页面", sample_payload())
+        # 视频作品: 没有图片，需要遍历整棵树（与原递归查找的结果一致）
+        bench("视频作品", sample_payload(atlas=False))
+
+    # 深层嵌套: 原递归查找会超出递归深度限制
+    payload = deep_payload()
+    try:
+        legacy_flat_search_data(new_extractor(), payload)
+        print("[深层嵌套] 原递归查找: 完成")
+    except RecursionError:
+        print("[深层嵌套] 原递归查找: RecursionError")
+    current = new_extractor()
+    current.flat_search_data(payload)
+    print(f"[深层嵌套] 迭代查找: 访问节点 {current.nodes_visited}, 视频 {current.video}")
+
+
+if __name__ == "__main__":
+    main()
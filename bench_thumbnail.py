@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+缩略图生成的吞吐量基准测试（张/秒/核）: make_thumbnail vs 完整解码后直接缩放
+
+用法:
+    python bench_thumbnail.py [-w 宽度] [-q 质量] [-n 每个进程的张数] [-p 进程数] [图片文件 ...]
+
+不传文件时使用生成的 1080x1440 JPEG 和 PNG 样例；
+先在单进程中测量每核吞吐量，再用与 CPU 核数相同的进程池测量总吞吐量
+"""
+
+import sys
+import os
+import io
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+from src.utils.thumbnail import make_thumbnail
+
+
+def naive_thumbnail(data, width, format, quality):
+    """完整解码原图，直接 LANCZOS 缩放（不使用 draft 和 reducing_gap）"""
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, "WEBP" if format == "webp" else "JPEG", quality=quality)
+    return output.getvalue(), "image/" + format
+
+
+def sample_images():
+    """生成接近照片的样例: 渐变叠加噪声"""
+    gradient = Image.linear_gradient("L").resize((1080, 1440))
+    noise = Image.effect_noise((1080, 1440), 40)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_TOP_BOTTOM)))
+    samples = {}
+    for format in ("JPEG", "PNG"):
+        output = io.BytesIO()
+        image.save(output, format, quality=90)
+        samples[f"1080x1440.{format.lower()}"] = output.getvalue()
+    return samples
+
+
+def run_batch(fn, data, width, format, quality, number):
+    """在当前进程连续生成 number 张缩略图，返回耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(number):
+        fn(data, width, format, quality)
+    return time.perf_counter() - start
+
+
+def bench(name, data, args):
+    print(f"[{name}] {len(data) / 1024:.0f} KB -> {args.width}px, 质量 {args.quality}")
+    for format in ("webp", "jpeg"):
+        size = len(make_thumbnail(data, args.width, format, args.quality)[0])
+        for label, fn in (("make_thumbnail", make_thumbnail), ("完整解码缩放", naive_thumbnail)):
+            elapsed = run_batch(fn, data, args.width, format, args.quality, args.number)
+            print(f"  {format:4} {label:14} 单核: {args.number / elapsed:7.1f} 张/秒")
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            # 先让每个进程导入 Pillow，不计入耗时
+            list(pool.map(make_thumbnail, [data] * args.processes, [args.width] * args.processes,
+                          [format] * args.processes, [args.quality] * args.processes))
+            start = time.perf_counter()
+            futures = [
+                pool.submit(run_batch, make_thumbnail, data, args.width, format, args.quality, args.number)
+                for _ in range(args.processes)
+            ]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+        total = args.number * args.processes / elapsed
+        print(f"  {format:4} 进程池 x{args.processes}: {total:7.1f} 张/秒, 每核 {total / args.processes:6.1f} 张/秒,"
+              f" 输出 {size / 1024:.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缩略图生成吞吐量基准测试")
+    parser.add_argument("-w", "--width", type=int, default=480)
+    parser.add_argument("-q", "--quality", type=int, default=80)
+    parser.add_argument("-n", "--number", type=int, default=20)
+    parser.add_argument("-p", "--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("files", nargs="*")
+    args = parser.parse_args()
+    if args.files:
+        samples = {}
+        for path in args.files:
+            with open(path, "rb") as f:
+                samples[os.path.basename(path)] = f.read()
+    else:
+        samples = sample_images()
+    for name, data in samples.items():
+        bench(name, data, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+小红书 __INITIAL_STATE__ 解析的内存基准测试: 完整解析 vs 按路径懒解析
+
+用法:
+    python bench_xiaohongshu_state.py [抓取的页面.html ...]
+
+不传文件时使用按线上页面结构构造的样例页面，输出每次请求的峰值内存分配
+"""
+
+import sys
+import os
+import json
+import time
+import tracemalloc
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.app.xiaohongshu.index import Xiaohongshu
+from src.utils.state_blob import extract_state, LazyState
+
+STATE_NAME = "window.__INITIAL_STATE__"
+
+
+def sample_page(feed_size=2000):
+    """按线上页面结构构造样例: 推荐流、用户、配置等大量无关数据 + 当前笔记"""
+    def feed_note(i):
+        return {
+            "id": f"feed{i:06d}",
+            "noteCard": {
+                "displayTitle": f"推荐笔记标题 {i}",
+                "user": {"userId": f"u{i}", "nickname": f"用户{i}", "avatar": f"https://sns-avatar/{i}.jpg"},
+                "interactInfo": {"likedCount": str(i * 3), "liked": False},
+                "cover": {
+                    "urlDefault": f"https://sns-webpic/{i}.jpg",
+                    "infoList": [{"imageScene": "WB_DFT", "url": f"https://sns-webpic/{i}_dft.jpg"}],
+                },
+                "video": None,
+            },
+        }
+
+    note = {
+        "noteId": "n0001",
+        "title": "当前笔记",
+        "desc": "当前笔记描述",
+        "imageList": [
+            {
+                "urlDefault": f"https://sns-webpic-qc.xhscdn.com/202401/abc/token{i}!nd_dft_wlteh_webp_3",
+                "stream": {"h264": [{"masterUrl": f"https://sns-video/live{i}.mp4"}]},
+            }
+            for i in range(9)
+        ],
+        "video": {"media": {"stream": {"h264": [{"masterUrl": "https://sns-video/v.mp4"}]}}},
+    }
+    state = {
+        "global": {"appSettings": {"flags": {f"flag{i}": i % 2 == 0 for i in range(500)}}},
+        "user": {"userPageData": {"notes": [feed_note(i) for i in range(feed_size // 4)]}},
+        "feed": {"feeds": [feed_note(i) for i in range(feed_size)]},
+        "note": {
+            "noteDetailMap": {"n0001": {"note": note, "comments": {"list": []}}},
+            "firstNoteId": "n0001",
+        },
+    }
+    state_text = json.dumps(state, ensure_ascii=False).replace("null", "undefined")
+    return (
+        "<html><head><title>当前笔记 - 小红书</title>"
+        '<meta name="description" content="当前笔记描述"></head><body>'
+        f"<script>{STATE_NAME}={state_text}</script></body></html>"
+    ).encode("utf-8")
+
+
+def full_parse(html):
+    """改动前: 完整解析页面状态后再取当前笔记"""
+    data_dict = extract_state(html, STATE_NAME)
+    return Xiaohongshu.find_note_data(data_dict)
+
+
+def lazy_parse(html):
+    """改动后: 只解析 noteDetailMap[firstNoteId].note"""
+    note = LazyState.find(html, STATE_NAME).get("note")
+    first_note_id = note.get("firstNoteId").load()
+    return note.get("noteDetailMap", first_note_id, "note").load()
+
+
+def measure(fn, html, number=5):
+    """返回 (峰值分配字节数, 平均耗时秒, 结果)"""
+    tracemalloc.start()
+    result = fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    for _ in range(number):
+        fn(html)
+    return peak, (time.perf_counter() - started) / number, result
+
+
+def bench(name, html):
+    print(f"[{name}] 页面大小: {len(html) / 1024:.0f} KB")
+    full_peak, full_time, full_result = measure(full_parse, html)
+    lazy_peak, lazy_time, lazy_result = measure(lazy_parse, html)
+    print(f"  完整解析: 峰值分配 {full_peak / 1024:8.0f} KB, 耗时 {full_time * 1000:7.2f} ms")
+    print(f"  懒解析:   峰值分配 {lazy_peak / 1024:8.0f} KB, 耗时 {lazy_time * 1000:7.2f} ms")
+    print(f"  结果一致: {full_result == lazy_result}")
+    text = "https://www.xiaohongshu.com/explore/n0001"
+    peak, elapsed, _ = measure(lambda content: Xiaohongshu.extract(text, "png", content), html)
+    print(f"  Xiaohongshu.extract 整次请求: 峰值分配 {peak / 1024:8.0f} KB, 耗时 {elapsed * 1000:7.2f} ms")
+
+
+def main():
+    paths = sys.argv[1:]
+    if paths:
+        for path in paths:
+            with open(path, "rb") as f:
+                bench(os.path.basename(path), f.read())
+    else:
+        bench("样例页面", sample_page())
+
+
+if __name__ == "__main__":
+    main()
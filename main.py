@@ -16,6 +16,11 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # 导入配置和日志模块
 from src.utils import get_app_logger, config, get_environment, EnvType
+from src.utils.http_client import init_http_client, close_http_client
+from src.utils.executor import init_process_pool, shutdown_process_pool
+from src.utils.extraction import compile_all
+from src.utils.db import DatabasePool, POOL_READY, init_db_pool, close_db_pool
+from fastapi.responses import JSONResponse
 
 # 获取应用日志器
 logger = get_app_logger()
@@ -47,15 +52,35 @@ app = FastAPI(
     ]
 )
 
+# 启动事件是否已完成（/ready 使用）
+app_started = False
+
 # 应用启动和关闭事件
 @app.on_event("startup")
 async def startup_event():
     """应用启动时的事件处理"""
     logger.info(f"API 服务启动 - 环境: {current_env}")
+    # 创建共享 HTTP 客户端并预热平台连接
+    await init_http_client()
+    # 编译各平台的字段提取规格（在创建进程池之前，子进程直接继承编译结果）
+    compile_all()
+    # 创建解析进程池
+    init_process_pool()
+    # 在后台创建数据库连接池，不阻塞启动
+    await init_db_pool()
+    global app_started
+    app_started = True
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时的事件处理"""
+    global app_started
+    app_started = False
+    await close_tracking()
+    await close_db_pool()
+    await close_http_client()
+    analyze_service.cache.close()
+    shutdown_process_pool()
     logger.info("API 服务关闭")
 
 # Root endpoint
@@ -76,9 +101,30 @@ async def health_check():
     """健康检查端点"""
     logger.info("执行健康检查")
     return {"status": "健康", "环境": current_env}
-    
+
+# Readiness probe endpoint
+@app.get("/ready")
+async def readiness_check(require_db: bool = False):
+    """
+    就绪检查端点，与 /health（进程存活）分开
+
+    启动事件完成前返回 503；数据库连接池状态单独返回，
+    require_db=true 时数据库未就绪也返回 503
+    """
+    database = DatabasePool().status()
+    ready = app_started and (not require_db or database["state"] == POOL_READY)
+    content = {
+        "status": "就绪" if ready else "未就绪",
+        "started": app_started,
+        "database": database,
+        "环境": current_env,
+    }
+    return JSONResponse(content=content, status_code=200 if ready else 503)
+
 # 注册所有路由模块
 from src.routes import db_register_routes
+from src.routes.analyze import analyze_service
+from src.routes.tracking import close_tracking
 db_register_routes(app)
 
 # 配置 uvicorn 使用文件日志而不是控制台输出
@@ -97,8 +143,12 @@ if __name__ == "__main__":
     # 配置 uvicorn 日志
     configure_uvicorn_logging()
     
+    # 自动重载模式只能使用单个工作进程；多进程时由 uvicorn 管理工作进程
+    # （预加载应用后 fork、共享已导入模块的方式见 start_server.py）
+    workers = 1 if config.RELOAD else max(1, config.WORKERS)
+
     # 开始服务
-    logger.info(f"启动 uvicorn 服务 - 主机: {config.HOST}, 端口: {config.PORT}")
+    logger.info(f"启动 uvicorn 服务 - 主机: {config.HOST}, 端口: {config.PORT}, 工作进程数: {workers}")
     
     # 使用配置中的参数
     uvicorn.run(
@@ -107,7 +157,10 @@ if __name__ == "__main__":
         port=config.PORT,            # Port to bind the server to
         reload=config.RELOAD,        # Auto-reload when code changes
         log_level=config.LOG_LEVEL.lower(),  # Log level
-        workers=1,                   # Number of worker processes
+        workers=workers,             # Number of worker processes
+        backlog=config.SERVER_BACKLOG,  # 监听队列长度
+        timeout_keep_alive=config.SERVER_KEEP_ALIVE_TIMEOUT,  # 空闲长连接保持时间
+        limit_concurrency=config.SERVER_LIMIT_CONCURRENCY or None,  # 最大并发连接数
         log_config=None,             # 禁用 uvicorn 默认日志配置
         access_log=False,            # 禁用 uvicorn 访问日志
         openapi_version="3.0.2"
@@ -1,9 +1,27 @@
 # src 包初始化
-from .app.xiaohongshu.index import Xiaohongshu
-from .app.douyin.index import Douyin
-from .app.xiaohongshu.image import Image
-from .app.kuaishou.index import Kuaishou
-from .app.test.index import Test
-from .app.weibo.index import Weibo
-
-__all__ = ["Xiaohongshu", "Image", "Douyin", "Kuaishou", "Test", "Weibo"]
\ No newline at end of file
+# 平台类在首次访问时才导入（PEP 562），避免启动时加载所有平台及其依赖
+import importlib
+
+_LAZY_IMPORTS = {
+    "Xiaohongshu": "src.app.xiaohongshu.index",
+    "Douyin": "src.app.douyin.index",
+    "Image": "src.app.xiaohongshu.image",
+    "Kuaishou": "src.app.kuaishou.index",
+    "Test": "src.app.test.index",
+    "Weibo": "src.app.weibo.index",
+}
+
+__all__ = ["Xiaohongshu", "Image", "Douyin", "Kuaishou", "Test", "Weibo"]
+
+
+def __getattr__(name):
+    module_path = _LAZY_IMPORTS.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
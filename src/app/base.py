@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Pattern, Tuple, Union
+from src.utils.index import find_url
+from src.utils.executor import run_in_process
+from src.utils.resolver import resolve_short_link
+
+
+class BaseExtractor:
+    """
+    平台提取器基类
+
+    一次解析分为两步:
+    - fetch: 在事件循环中通过共享 HTTP 客户端异步抓取页面原始字节
+    - extract: 纯函数，从原始字节得到结果字典，在解析进程池中执行
+    load 依次执行这两步；需要根据解析结果改用其他数据源的平台（如微博）可以重写 load
+    """
+
+    # 平台类型，与结果中的 app_type 一致
+    app_type = ""
+    # 平台域名，同时匹配其所有子域名，用于按链接分发到平台
+    HOSTS: List[str] = []
+    # 请求头，解析短链接时使用
+    HEADERS: Dict[str, str] = {}
+    # 从 URL 中解析内容 ID 的正则，第一个分组为 ID
+    CONTENT_ID_PATTERNS: List[Pattern] = []
+
+    # 页面原始内容: extract 中为抓取到的字节，脚本中同步请求时为文本
+    content: Union[bytes, str] = b""
+    _html: Optional[str] = None
+
+    @property
+    def html(self) -> str:
+        """页面文本，首次访问时才由 content 解码（只有 format=html 时用到）"""
+        if self._html is None:
+            content = self.content
+            self._html = content.decode("utf-8", "replace") if isinstance(content, bytes) else content
+        return self._html
+
+    @classmethod
+    def parse_content_id(cls, url: str) -> Optional[str]:
+        """从 URL 中解析平台内容 ID，无法解析时返回 None"""
+        for pattern in cls.CONTENT_ID_PATTERNS:
+            match = pattern.search(url)
+            if match:
+                return match.group(1)
+        return None
+
+    @classmethod
+    async def fetch(cls, url: str) -> Dict[str, Any]:
+        """抓取页面，返回传给 extract 的关键字参数（至少包含原始字节 content）"""
+        raise NotImplementedError
+
+    @staticmethod
+    def extract(text: str, type: str, content: bytes, **kwargs) -> Dict[str, Any]:
+        """从页面原始字节提取结果字典，需要可以被 pickle 以便在进程池中执行"""
+        raise NotImplementedError
+
+    def result(self) -> Dict[str, Any]:
+        """返回解析结果字典（to_dict 中 data 字段的内容）"""
+        raise NotImplementedError
+
+    @classmethod
+    def from_result(cls, text: str, type: str, result: Dict[str, Any], content: bytes = b""):
+        """用 extract 返回的结果字典构造实例，不重新解析页面（content 为页面原始字节）"""
+        obj = cls.__new__(cls)
+        obj.text = text
+        obj.type = type
+        obj.content = content
+        for key, value in result.items():
+            setattr(obj, key, value)
+        return obj
+
+    @classmethod
+    async def resolve(cls, url: str) -> str:
+        """将短链接解析为规范链接（结果有缓存）"""
+        return await resolve_short_link(url, cls.HEADERS)
+
+    @classmethod
+    async def load(cls, text: str, type: str, url: str) -> Tuple[Dict[str, Any], bytes]:
+        """抓取页面并在进程池中解析，返回 (结果字典, 页面原始字节)"""
+        fetched = await cls.fetch(url)
+        result = await run_in_process(cls.extract, text, type, **fetched)
+        return result, fetched["content"]
+
+    @classmethod
+    async def create(cls, text: str, type: str, url: Optional[str] = None):
+        """
+        异步抓取页面并在进程池中解析，不阻塞事件循环
+
+        参数:
+            text: 分享链接或包含链接的文本
+            type: 图片类型
+            url: 已解析好的规范链接，为 None 时从 text 中提取并解析短链接
+        """
+        if url is None:
+            url = find_url(text)
+            if not url:
+                raise ValueError(f"无法从文本 '{text}' 中提取 URL")
+            url = await cls.resolve(url)
+        result, content = await cls.load(text, type, url)
+        return cls.from_result(text, type, result, content=content)
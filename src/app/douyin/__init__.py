@@ -0,0 +1,11 @@
+# douyin 包初始化
+# 只声明平台信息，提取器模块在首次使用时才导入（见 src/app/registry.py）
+
+# 平台类型
+APP_TYPE = "douyin"
+# 抖音域名，同时匹配其所有子域名
+HOSTS = ["douyin.com", "iesdouyin.com"]
+# 提取器类，格式为 模块:类名
+EXTRACTOR = "src.app.douyin.index:Douyin"
+
+__all__ = ["APP_TYPE", "HOSTS", "EXTRACTOR"]
@@ -1,17 +1,43 @@
 import json
-from bs4 import BeautifulSoup
 import httpx
 import re
 from src.utils import get_analyze_logger, config
 from src.utils.index import find_url
 from src.utils.response import Response
+from src.utils import http_client
+from src.utils.state_blob import extract_state, loads_js_state, find_title, find_meta, iter_scripts
+from src.utils.extraction import get_plan
+from src.app.base import BaseExtractor
+from src.app.douyin import HOSTS
 
 
 logger = get_analyze_logger()
 
+# 请求头
+HEADERS = {
+    "User-Agent": config.MOBILE_USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Referer": "https://www.google.com/",
+}
 
-class Douyin:
-    def __init__(self, text, type):
+# extract_user_name 中 CSS 选择器 .author-name, .user-name, .nickname, .user-info-name 对应的 class
+_USER_NAME_CLASS_RE = re.compile(
+    rb"""\sclass\s*=\s*["'][^"']*(?<![\w-])(?:author-name|user-name|nickname|user-info-name)(?![\w-])""",
+    re.I,
+)
+
+
+class Douyin(BaseExtractor):
+    app_type = "douyin"
+    HOSTS = HOSTS
+    CONTENT_ID_PATTERNS = [
+        re.compile(r"/(?:video|note|slides)/(\d+)"),
+        re.compile(r"[?&]modal_id=(\d+)"),
+    ]
+    HEADERS = HEADERS
+
+    def __init__(self, text, type, html=None):
         self.text = text
         self.type = type
         self.url = find_url(text)
@@ -24,24 +50,55 @@ class Douyin:
             error_msg = f"无法从文本 '{text}' 中提取 URL"
             raise ValueError(error_msg)
         try:
-            headers = {
-                "User-Agent": config.MOBILE_USER_AGENT,
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-            }
-            response = httpx.get(
-                self.url, follow_redirects=True, headers=headers, timeout=10.0
-            )
-            self.html = response.text
-            self.soup = BeautifulSoup(self.html, "html.parser")
-            
-            # 提取页面内容
-            self.extract_douyin_data()
+            # 未传入页面内容时同步获取（兼容脚本中的直接调用）
+            if html is None:
+                response = httpx.get(
+                    self.url, follow_redirects=True, headers=HEADERS, timeout=10.0
+                )
+                html = response.text
+            self.content = html
+            # 优先直接从原始 HTML 中提取页面状态，失败时才构建 DOM
+            if not self.extract_fast():
+                # bs4 只在 DOM 方案中使用，首次使用时才导入
+                from bs4 import BeautifulSoup
+
+                self.soup = BeautifulSoup(self.content, "html.parser")
+
+                # 提取页面内容
+                self.extract_douyin_data()
         except Exception as e:
             logger.error(f"获取抖音内容失败: {e}")
             raise e
 
+    @classmethod
+    async def fetch(cls, url):
+        """通过共享 HTTP 客户端异步获取页面"""
+        try:
+            response = await http_client.fetch(url, headers=HEADERS)
+        except Exception as e:
+            logger.error(f"获取抖音内容失败: {e}")
+            raise e
+        return {"content": response.content}
+
+    @staticmethod
+    def extract(text, type, content):
+        """从页面原始字节提取结果字典（在解析进程池中执行）"""
+        return Douyin(text, type, html=content).result()
+
+    def extract_fast(self):
+        """不构建 DOM，直接从原始 HTML 中提取 window._ROUTER_DATA，成功返回 True"""
+        router_data = extract_state(self.content, "window._ROUTER_DATA")
+        if not isinstance(router_data, dict):
+            return False
+        self.extract_user_name_fast()
+        self.image_data = {}
+        self.video_data = {}
+        # 有 note_(id)/page 时取图文数据, 没有的话取 video_(id)/page
+        loaderData = router_data.get("loaderData", {})
+        data_dict = loaderData.get("note_(id)/page") or loaderData.get("video_(id)/page", {})
+        self.get_dict_data(data_dict)
+        return True
+
     def extract_douyin_data(self):
         """提取抖音内容"""
         try:
@@ -56,7 +113,7 @@ class Douyin:
                 if script.string and "window._ROUTER_DATA" in script.string:
                     data_text = script.string.split("window._ROUTER_DATA = ")[1]
                     # 判断有没有note_(id)/page, 没有的话取video_(id)/page
-                    loaderData = json.loads(data_text).get("loaderData", {})
+                    loaderData = loads_js_state(data_text).get("loaderData", {})
                     if "note_(id)" in data_text:
                         data_dict = loaderData.get("note_(id)/page", {})
                     else:
@@ -87,138 +144,141 @@ class Douyin:
             # 方法3: 从脚本数据中提取用户名
             for script in self.soup.find_all("script"):
                 if script.string:
-                    # 尝试找到用户名相关的数据
-                    user_patterns = [
-                        r'"nickname":"([^"]+)"',
-                        r'"author":"([^"]+)"',
-                        r'"userName":"([^"]+)"',
-                        r'"user":\{[^}]*"name":"([^"]+)"'
-                    ]
-                    for pattern in user_patterns:
-                        matches = re.findall(pattern, script.string)
-                        if matches:
-                            user_name = matches[0].replace('\\n', ' ').replace('\\t', ' ')
-                            user_name = user_name.replace('\\u002F', '/').replace('\\/', '/').replace('\\', '')
-                            if user_name and len(user_name) > 1 and user_name != "抖音":
-                                self.title = user_name
-                                return
+                    user_name = self._match_user_name(script.string)
+                    if user_name:
+                        self.title = user_name
+                        return
             
             # 如果还没有找到用户名，尝试从页面标题中提取
             if self.soup.title and self.soup.title.text:
-                page_title = self.soup.title.text.strip()
-                # 尝试提取页面标题中的用户名部分
-                title_patterns = [
-                    r'^(.*?)的主页$',
-                    r'^(.*?)的抖音视频$',
-                    r'^(.*?)创作的视频$'
-                ]
-                for pattern in title_patterns:
-                    title_match = re.search(pattern, page_title)
-                    if title_match:
-                        user_name = title_match.group(1).strip()
-                        if user_name and len(user_name) > 1:
-                            self.title = user_name
-                            return
+                user_name = self._match_title_user_name(self.soup.title.text.strip())
+                if user_name:
+                    self.title = user_name
+                    return
             
         except Exception as e:
             logger.warning(f"提取抖音用户名失败: {e}")
 
+    def extract_user_name_fast(self):
+        """不构建 DOM，直接从原始 HTML 中提取用户名称"""
+        try:
+            # 方法1: 从meta标签提取
+            site_name = find_meta(self.content, property="og:site_name")
+            if site_name and site_name != "抖音":
+                self.title = site_name
+                return
+
+            # 方法2: 页面中有用户名元素时按 DOM 方案提取（CSS 选择器优先于脚本数据）
+            content = self.content if isinstance(self.content, bytes) else self.content.encode("utf-8")
+            if _USER_NAME_CLASS_RE.search(content):
+                from bs4 import BeautifulSoup
+
+                self.soup = BeautifulSoup(self.content, "html.parser")
+                self.extract_user_name()
+                return
+
+            # 方法3: 按文档顺序从各个 <script> 的数据中提取用户名，不匹配脚本之外的页面内容
+            for script in iter_scripts(self.content):
+                user_name = self._match_user_name(script)
+                if user_name:
+                    self.title = user_name
+                    return
+
+            # 方法4: 从页面标题中提取
+            user_name = self._match_title_user_name(find_title(self.content).strip())
+            if user_name:
+                self.title = user_name
+        except Exception as e:
+            logger.warning(f"提取抖音用户名失败: {e}")
+
+    @staticmethod
+    def _match_user_name(text):
+        """从脚本文本中匹配用户名，找不到时返回空字符串"""
+        # 尝试找到用户名相关的数据
+        user_patterns = [
+            r'"nickname":"([^"]+)"',
+            r'"author":"([^"]+)"',
+            r'"userName":"([^"]+)"',
+            r'"user":\{[^}]*"name":"([^"]+)"'
+        ]
+        for pattern in user_patterns:
+            matches = re.findall(pattern, text)
+            if matches:
+                user_name = matches[0].replace('\\n', ' ').replace('\\t', ' ')
+                user_name = user_name.replace('\\u002F', '/').replace('\\/', '/').replace('\\', '')
+                if user_name and len(user_name) > 1 and user_name != "抖音":
+                    return user_name
+        return ""
+
+    @staticmethod
+    def _match_title_user_name(page_title):
+        """从页面标题中提取用户名部分，找不到时返回空字符串"""
+        title_patterns = [
+            r'^(.*?)的主页$',
+            r'^(.*?)的抖音视频$',
+            r'^(.*?)创作的视频$'
+        ]
+        for pattern in title_patterns:
+            title_match = re.search(pattern, page_title)
+            if title_match:
+                user_name = title_match.group(1).strip()
+                if user_name and len(user_name) > 1:
+                    return user_name
+        return ""
+
     def get_dict_data(self, data_dict):
-        """获取抖音内容"""
+        """获取抖音内容（按 EXTRACTION_SPECS 中的字段路径一次遍历取出）"""
         try:
-            videoInfoRes = data_dict.get("videoInfoRes", {})
-            item_list = videoInfoRes.get("item_list", [])
-            item_data = item_list[0] if len(item_list) > 0 else {}
-            self.description = item_data.get("desc", "")
-            
+            fields = get_plan("douyin").run(data_dict)
+            self.description = fields["description"] or ""
+
             # 从数据中提取用户名
             if not self.title:
-                author = item_data.get("author", {})
-                if author:
-                    user_name = author.get("nickname", "")
-                    if user_name and len(user_name) > 1:
-                        self.title = user_name
+                user_name = fields["title"]
+                if isinstance(user_name, str) and len(user_name) > 1:
+                    self.title = user_name
 
-            get_image_data = item_data.get("images", [])
-            if get_image_data:
-                self.get_image_data(get_image_data)
+            # 图文的图片，或视频封面
+            self.image_list.extend(fields["image_list"])
+
+            video_url = fields["video"] or ""
+            if 'mp3' in video_url:
+                self.video = ""
+            else:
+                self.video = video_url.replace("playwm", "play")
 
-            get_video_data = item_data.get("video", {})
-            if get_video_data:
-                self.get_video_data(get_video_data)
-                
             # 如果描述中包含@用户名，尝试提取作为备选用户名
             if not self.title and self.description:
                 at_matches = re.findall(r'@([^\s#]+)', self.description)
                 if at_matches:
                     self.title = at_matches[0]
-                    
+
             # 如果仍然没有标题，使用默认值
             if not self.title:
                 self.title = "抖音用户"
         except Exception as e:
             raise e
 
-    def get_image_data(self, get_image_data):
-        """获取图片数据"""
-        try:
-            for item in get_image_data:
-                self.image_list.append(item.get("url_list", [])[0])
-        except Exception as e:
-            raise e
+    def result(self):
+        """返回解析结果字典"""
+        # 确保有标题
+        if not self.title:
+            self.title = "抖音用户"
 
-    def get_video_data(self, get_video_data):
-        """获取视频数据"""
-        try:
-            video_data = get_video_data.get("play_addr", {})
-            video_url = video_data.get("url_list", [])[0] if video_data else ""
-            if 'mp3' in video_url:
-                self.video = ""
-            else:
-                self.video = video_url.replace("playwm", "play")
-            
-            # 获取视频封面图
-            cover_data = get_video_data.get("cover", {})
-            if cover_data:
-                cover_url = cover_data.get("url_list", [])[0] if cover_data else ""
-                if cover_url:
-                    self.image_list.append(cover_url)
-            
-            # 如果没有封面，尝试获取原始封面
-            if not self.image_list:
-                origin_cover = get_video_data.get("origin_cover", {})
-                if origin_cover:
-                    origin_cover_url = origin_cover.get("url_list", [])[0] if origin_cover else ""
-                    if origin_cover_url:
-                        self.image_list.append(origin_cover_url)
-                        
-            # 尝试从动态封面获取
-            if not self.image_list:
-                dynamic_cover = get_video_data.get("dynamic_cover", {})
-                if dynamic_cover:
-                    dynamic_cover_url = dynamic_cover.get("url_list", [])[0] if dynamic_cover else ""
-                    if dynamic_cover_url:
-                        self.image_list.append(dynamic_cover_url)
-        except Exception as e:
-            raise e
+        return {
+            "url": self.url,
+            "final_url": "",
+            "title": self.title,
+            "description": self.description,
+            "image_list": self.image_list,
+            "video": self.video,
+            "app_type": "douyin",
+        }
 
     def to_dict(self):
         """将对象转换为字典，用于 API 返回"""
         try:
-            # 确保有标题
-            if not self.title:
-                self.title = "抖音用户"
-                
-            result = {
-                "url": self.url,
-                "final_url": "",
-                "title": self.title,
-                "description": self.description,
-                "image_list": self.image_list,
-                "video": self.video,
-                "app_type": "douyin",
-            }
-            return Response.success(result, "获取成功")
+            return Response.success(self.result(), "获取成功")
         except Exception as e:
             logger.error(f"抖音转换为字典时出错: {str(e)}", exc_info=True)
             return Response.error("获取失败")
@@ -0,0 +1,11 @@
+# kuaishou 包初始化
+# 只声明平台信息，提取器模块在首次使用时才导入（见 src/app/registry.py）
+
+# 平台类型
+APP_TYPE = "kuaishou"
+# 快手域名，同时匹配其所有子域名
+HOSTS = ["kuaishou.com", "chenzhongtech.com", "gifshow.com"]
+# 提取器类，格式为 模块:类名
+EXTRACTOR = "src.app.kuaishou.index:Kuaishou"
+
+__all__ = ["APP_TYPE", "HOSTS", "EXTRACTOR"]
@@ -1,17 +1,58 @@
+import asyncio
 import json
 import re
-from bs4 import BeautifulSoup
+from typing import Dict, List
+from urllib.parse import urlsplit
 import httpx
 from src.utils import get_analyze_logger, config
 from src.utils.index import find_url
 from src.utils.response import Response
+from src.utils import http_client
+from src.utils.state_blob import extract_state, loads_js_state
+from src.app.base import BaseExtractor
+from src.app.kuaishou import HOSTS
 
 
 logger = get_analyze_logger()
 
+# 尝试两种 User-Agent，优先使用移动设备 UA
+HEADERS_LIST = [
+    # 移动设备 UA
+    {
+        "User-Agent": config.MOBILE_USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
+        "Referer": "https://www.google.com/",
+    },
+    # PC 设备 UA
+    {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
+        "Referer": "https://www.google.com/",
+    }
+]
 
-class Kuaishou:
-    def __init__(self, text, type):
+
+class Kuaishou(BaseExtractor):
+    app_type = "kuaishou"
+    HOSTS = HOSTS
+    CONTENT_ID_PATTERNS = [
+        re.compile(r"/(?:short-video|photo)/([0-9a-zA-Z_-]+)"),
+        re.compile(r"[?&]photoId=([0-9a-zA-Z_-]+)"),
+    ]
+    HEADERS = HEADERS_LIST[0]
+    # 扁平化查找时优先访问的子树，视频、图片和描述通常在这些节点下
+    SEARCH_PRIORITY_KEYS = ("photo", "manifest", "ext_params", "atlas")
+    # search_node 读取的键，节点不含其中任何一个时跳过
+    SEARCH_NODE_KEYS = frozenset([
+        "userName", "authorName", "nickname", "author", "user",
+        "caption", "description", "desc", "title", "manifest", "ext_params",
+    ])
+    # UA 变体胜出次数: URL 模式 -> 每个变体胜出的次数，用于调整首选 UA（进程内共享）
+    _variant_wins: Dict[str, List[int]] = {}
+
+    def __init__(self, text, type, html=None):
         self.text = text
         self.type = type
         self.url = find_url(text)
@@ -20,58 +61,148 @@ class Kuaishou:
         self.image_list = []
         self.image_prefix = "https://tx2.a.kwimgs.com/"
         self.title = ""  # 初始化标题为空字符串，而不是使用页面默认标题
+        # 扁平化查找访问的节点数
+        self.nodes_visited = 0
         if not self.url:
             error_msg = f"无法从文本 '{text}' 中提取 URL"
             logger.error(error_msg)
             raise ValueError(error_msg)
         try:
-            # 尝试两种 User-Agent，优先使用移动设备 UA
-            headers_list = [
-                # 移动设备 UA
-                {
-                    "User-Agent": config.MOBILE_USER_AGENT,
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                    "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                    "Referer": "https://www.google.com/",
-                },
-                # PC 设备 UA
-                {
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                    "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                    "Referer": "https://www.google.com/",
-                }
-            ]
-            
-            # 尝试不同的 UA 请求
-            html = ""
-            response = None
-            for headers in headers_list:
-                try:
-                    response = httpx.get(
-                        self.url, follow_redirects=True, headers=headers, timeout=10.0
-                    )
+            # 未传入页面内容时同步获取（兼容脚本中的直接调用）
+            if html is None:
+                html = ""
+                response = None
+                # 尝试不同的 UA 请求
+                for headers in HEADERS_LIST:
+                    try:
+                        response = httpx.get(
+                            self.url, follow_redirects=True, headers=headers, timeout=10.0
+                        )
+                        html = response.text
+                        logger.info(f"快手请求成功，内容长度: {len(html)}")
+                        if "window.INIT_STATE" in html:
+                            break
+                    except Exception as e:
+                        logger.warning(f"快手请求失败，尝试其他 UA: {e}")
+                        continue
+
+                # 如果所有请求都失败，使用最后一次的响应
+                if not html and response:
                     html = response.text
-                    logger.info(f"快手请求成功，内容长度: {len(html)}")
-                    if "window.INIT_STATE" in html:
-                        break
-                except Exception as e:
-                    logger.warning(f"快手请求失败，尝试其他 UA: {e}")
-                    continue
-            
-            # 如果所有请求都失败，使用最后一次的响应
-            if not html and response:
-                html = response.text
-            
-            self.html = html
-            self.soup = BeautifulSoup(self.html, "html.parser")
-            
-            # 提取页面内容
-            self.extract_kuaishou_data()
+
+            self.content = html
+            # 优先直接从原始 HTML 中提取页面状态，失败时才构建 DOM
+            if not self.extract_fast():
+                # bs4 只在 DOM 方案中使用，首次使用时才导入
+                from bs4 import BeautifulSoup
+
+                self.soup = BeautifulSoup(self.content, "html.parser")
+
+                # 提取页面内容
+                self.extract_kuaishou_data()
         except Exception as e:
             logger.error(f"获取快手内容失败: {e}")
             raise e
 
+    @staticmethod
+    def _url_pattern(url):
+        """URL 模式: 域名 + 第一段路径，例如 www.kuaishou.com/short-video"""
+        parts = urlsplit(url)
+        segment = parts.path.strip("/").split("/")[0]
+        return f"{parts.hostname}/{segment}"
+
+    @classmethod
+    def _variant_order(cls, pattern):
+        """按历史胜出次数排列 UA 变体，次数相同时保持默认顺序（移动端优先）"""
+        wins = cls._variant_wins.get(pattern, [0] * len(HEADERS_LIST))
+        return sorted(range(len(HEADERS_LIST)), key=lambda index: -wins[index])
+
+    @classmethod
+    def _record_win(cls, pattern, index):
+        """记录胜出的 UA 变体"""
+        wins = cls._variant_wins.setdefault(pattern, [0] * len(HEADERS_LIST))
+        wins[index] += 1
+
+    @classmethod
+    def variant_stats(cls):
+        """获取各 URL 模式下 UA 变体的胜出次数"""
+        return {pattern: list(wins) for pattern, wins in cls._variant_wins.items()}
+
+    @classmethod
+    async def fetch(cls, url):
+        """
+        通过共享 HTTP 客户端异步获取页面，对不同的 UA 做对冲请求
+
+        先请求首选 UA，超过 KUAISHOU_HEDGE_DELAY 秒未返回、或返回的页面中没有
+        window.INIT_STATE 时立即启动下一个 UA，采用第一个包含 INIT_STATE 的响应并取消其余请求
+        """
+        pattern = cls._url_pattern(url)
+        variants = iter(cls._variant_order(pattern))
+        pending = set()
+        fallback = b""
+
+        async def _get(index):
+            response = await http_client.fetch(url, headers=HEADERS_LIST[index])
+            return index, response.content
+
+        def _launch_next():
+            index = next(variants, None)
+            if index is not None:
+                pending.add(asyncio.ensure_future(_get(index)))
+
+        _launch_next()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=config.KUAISHOU_HEDGE_DELAY,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # 首选 UA 迟迟未返回，启动对冲请求
+                    _launch_next()
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    try:
+                        index, content = task.result()
+                    except Exception as e:
+                        logger.warning(f"快手请求失败，尝试其他 UA: {e}")
+                        _launch_next()
+                        continue
+                    logger.info(f"快手请求成功，UA 变体: {index}，内容长度: {len(content)}")
+                    if b"window.INIT_STATE" in content:
+                        cls._record_win(pattern, index)
+                        return {"content": content}
+                    # 页面中没有可用数据，立即尝试下一个 UA
+                    fallback = fallback or content
+                    _launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+        # 所有 UA 都没有拿到 INIT_STATE，使用已有的响应走备用提取
+        return {"content": fallback}
+
+    @staticmethod
+    def extract(text, type, content):
+        """从页面原始字节提取结果字典（在解析进程池中执行）"""
+        return Kuaishou(text, type, html=content).result()
+
+    def extract_fast(self):
+        """不构建 DOM，直接从原始 HTML 中提取 window.INIT_STATE，成功返回 True"""
+        data_dict = extract_state(self.content, "window.INIT_STATE")
+        if not isinstance(data_dict, dict):
+            return False
+        self.image_data = {}
+        self.video_data = {}
+        try:
+            self.data_dict = data_dict
+            self.get_dict_data()
+            return True
+        except Exception as e:
+            logger.warning(f"处理 INIT_STATE 数据失败: {e}")
+            return False
+
     def extract_kuaishou_data(self):
         """提取快手内容"""
         try:
@@ -87,12 +218,8 @@ class Kuaishou:
                 if script.string and "window.INIT_STATE" in script.string:
                     try:
                         data_text = script.string.split("window.INIT_STATE = ")[1]
-                        # 处理可能的 JS 代码结束位置
-                        if ";" in data_text:
-                            data_text = data_text.split(";")[0]
-                            
-                        # 提取出来的数据转成dict
-                        data_dict = json.loads(data_text)
+                        # 提取出来的数据转成dict，只解析第一个完整的对象，忽略其后的 JS 代码
+                        data_dict = loads_js_state(data_text)
                         self.data_dict = data_dict
                         self.get_dict_data()
                         data_found = True
@@ -324,8 +451,8 @@ class Kuaishou:
                     self.get_image_data(obj4_data)
             
             # 路径 2: 扁平化查找
-            if not self.video or not self.image_list or not self.description or not self.title or not user_name:
-                self.flat_search_data(self.data_dict, user_name)
+            if not self.video or not self.image_list or not self.description or not self.title:
+                self.flat_search_data(self.data_dict)
             
             # 如果还是没有标题，使用默认值
             if not self.title:
@@ -335,54 +462,76 @@ class Kuaishou:
             logger.error(f"处理快手数据字典失败: {e}")
             raise e
     
-    def flat_search_data(self, data_dict, user_name=""):
-        """递归扁平化搜索数据"""
-        if isinstance(data_dict, dict):
-            # 尝试查找用户名
+    def flat_search_data(self, data_dict):
+        """
+        使用显式栈迭代搜索数据，标题、描述、视频和图片都找到后立即停止
+        （视频作品的封面图可能在后面的 ext_params 节点中，不能只找到视频就停止）
+
+        同一节点下优先访问 SEARCH_PRIORITY_KEYS 中的子树，返回访问的节点数
+        """
+        priority_keys = frozenset(self.SEARCH_PRIORITY_KEYS)
+        search_keys = self.SEARCH_NODE_KEYS
+        containers = (dict, list)
+        visited = 0
+        stack = [data_dict]
+        push = stack.append
+        while stack:
+            node = stack.pop()
+            visited += 1
+            if isinstance(node, dict):
+                # 字段只在 search_node 中填充，只需在调用后检查是否已全部找到
+                if not search_keys.isdisjoint(node):
+                    self.search_node(node)
+                    if self.title and self.description and self.video and self.image_list:
+                        break
+                if priority_keys.isdisjoint(node):
+                    # 大多数节点没有优先子树，按原顺序访问子节点
+                    children = node.values()
+                else:
+                    children = [node[key] for key in self.SEARCH_PRIORITY_KEYS if key in node]
+                    children += [value for key, value in node.items() if key not in priority_keys]
+            else:
+                children = node
+            # 栈为后进先出: 子节点逆序压栈
+            for child in reversed(children):
+                if isinstance(child, containers):
+                    push(child)
+        self.nodes_visited = visited
+        logger.debug(f"快手数据扁平化查找访问节点数: {visited}")
+        return visited
+
+    def search_node(self, data_dict):
+        """从单个字典节点中查找用户名、描述、视频和图片"""
+        # 尝试查找用户名，直接设置标题为用户名
+        if not self.title:
             for key in ["userName", "authorName", "nickname", "author"]:
                 if key in data_dict and isinstance(data_dict[key], str) and len(data_dict[key]) > 1:
-                    user_name = data_dict[key]
-                    # 直接设置标题为用户名
-                    if not self.title:
-                        self.title = user_name
+                    self.title = data_dict[key]
                     break
-            
-            # 查找用户信息对象
-            if "user" in data_dict and isinstance(data_dict["user"], dict):
-                user_dict = data_dict["user"]
-                for key in ["name", "userName", "nickname"]:
-                    if key in user_dict and isinstance(user_dict[key], str) and len(user_dict[key]) > 1:
-                        user_name = user_dict[key]
-                        # 直接设置标题为用户名
-                        if not self.title:
-                            self.title = user_name
-                        break
-            
-            # 设置描述
+
+        # 查找用户信息对象
+        if not self.title and "user" in data_dict and isinstance(data_dict["user"], dict):
+            user_dict = data_dict["user"]
+            for key in ["name", "userName", "nickname"]:
+                if key in user_dict and isinstance(user_dict[key], str) and len(user_dict[key]) > 1:
+                    self.title = user_dict[key]
+                    break
+
+        # 设置描述
+        if not self.description:
             for key in ["caption", "description", "desc", "title"]:
-                if not self.description and key in data_dict:
-                    desc_text = data_dict[key]
-                    if isinstance(desc_text, str) and len(desc_text) > 2:
-                        self.description = desc_text
-                        break
-            
-            # 搜索可能的视频
-            if not self.video and "manifest" in data_dict:
-                self.get_video_data(data_dict["manifest"])
-            
-            # 搜索可能的图片
-            if not self.image_list and "ext_params" in data_dict:
-                self.get_image_data(data_dict["ext_params"])
-            
-            # 继续递归搜索
-            for key, value in data_dict.items():
-                if isinstance(value, (dict, list)):
-                    self.flat_search_data(value, user_name)
-        
-        elif isinstance(data_dict, list):
-            for item in data_dict:
-                if isinstance(item, (dict, list)):
-                    self.flat_search_data(item, user_name)
+                desc_text = data_dict.get(key)
+                if isinstance(desc_text, str) and len(desc_text) > 2:
+                    self.description = desc_text
+                    break
+
+        # 搜索可能的视频
+        if not self.video and isinstance(data_dict.get("manifest"), dict):
+            self.get_video_data(data_dict["manifest"])
+
+        # 搜索可能的图片
+        if not self.image_list and isinstance(data_dict.get("ext_params"), dict):
+            self.get_image_data(data_dict["ext_params"])
 
     def get_video_data(self, obj3_data):
         """获取视频数据"""
@@ -444,23 +593,26 @@ class Kuaishou:
             logger.error(f"获取快手图片数据失败: {e}")
             raise e
 
+    def result(self):
+        """返回解析结果字典"""
+        # 如果没有标题，使用默认值
+        if not self.title:
+            self.title = "快手用户"
+
+        return {
+            "url": self.url,
+            "final_url": "",
+            "title": self.title,
+            "description": self.description,
+            "image_list": self.image_list,
+            "video": self.video,
+            "app_type": "kuaishou",
+        }
+
     def to_dict(self):
         """将对象转换为字典，用于 API 返回"""
         try:
-            # 如果没有标题，使用默认值
-            if not self.title:
-                self.title = "快手用户"
-                
-            result = {
-                "url": self.url,
-                "final_url": "",
-                "title": self.title,
-                "description": self.description,
-                "image_list": self.image_list,
-                "video": self.video,
-                "app_type": "kuaishou",
-            }
-            return Response.success(result, "获取成功")
+            return Response.success(self.result(), "获取成功")
         except Exception as e:
             logger.error(f"快手转换为字典时出错: {str(e)}", exc_info=True)
             return Response.error("获取失败")
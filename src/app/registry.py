@@ -0,0 +1,129 @@
+import importlib
+import re
+from typing import Dict, List, Optional, Pattern, Tuple, Type
+from urllib.parse import urlsplit
+from src.app.base import BaseExtractor
+
+__all__ = ["ExtractorRegistry", "registry"]
+
+# 平台包，包中声明 APP_TYPE、HOSTS 和 EXTRACTOR（模块:类名）
+PLATFORM_PACKAGES = [
+    "src.app.xiaohongshu",
+    "src.app.douyin",
+    "src.app.kuaishou",
+    "src.app.weibo",
+]
+
+# URL 末尾可能的标点符号（与 find_url 一致）
+_TRAILING_PUNCTUATION_RE = re.compile(r"[.,;:!?)]+$")
+
+
+class ExtractorRegistry:
+    """
+    平台提取器注册表
+
+    每个平台通过 HOSTS 声明自己的域名（匹配该域名及其所有子域名），
+    注册时只记录提取器的模块路径，首次用到该平台时才导入模块:
+    - for_host / for_url: 按域名查表，从完整域名开始逐级去掉最左侧的标签，查找次数只与域名层级有关
+    - match: 用所有平台域名编译出的一个正则，从任意文本中找出第一个受支持的链接
+    """
+
+    def __init__(self):
+        # 平台类型 -> 提取器路径（模块:类名）
+        self._targets: Dict[str, str] = {}
+        # 平台类型 -> 域名
+        self._platform_hosts: Dict[str, List[str]] = {}
+        # 平台类型 -> 已导入的提取器
+        self._extractors: Dict[str, Type[BaseExtractor]] = {}
+        # 域名 -> 平台类型
+        self._hosts: Dict[str, str] = {}
+        self._text_pattern: Optional[Pattern] = None
+
+    def register(self, app_type: str, hosts: List[str], target: str):
+        """注册平台，target 为 模块:类名；域名已被其他平台注册时抛出 ValueError"""
+        for host in hosts:
+            host = host.lower()
+            registered = self._hosts.get(host)
+            if registered is not None and registered != app_type:
+                raise ValueError(f"域名 {host} 已注册到 {registered}")
+            self._hosts[host] = app_type
+        self._targets[app_type] = target
+        self._platform_hosts[app_type] = list(hosts)
+        self._extractors.pop(app_type, None)
+        self._text_pattern = None
+
+    def register_package(self, package: str):
+        """注册平台包中声明的平台（只导入包本身，不导入提取器模块）"""
+        module = importlib.import_module(package)
+        self.register(module.APP_TYPE, module.HOSTS, module.EXTRACTOR)
+
+    def get(self, app_type: str) -> Optional[Type[BaseExtractor]]:
+        """按平台类型获取提取器，首次获取时导入提取器模块"""
+        extractor = self._extractors.get(app_type)
+        if extractor is None:
+            target = self._targets.get(app_type)
+            if target is None:
+                return None
+            module_path, _, class_name = target.partition(":")
+            extractor = getattr(importlib.import_module(module_path), class_name)
+            self._extractors[app_type] = extractor
+        return extractor
+
+    def loaded(self, app_type: str) -> Optional[Type[BaseExtractor]]:
+        """获取已导入的提取器，未导入时返回 None（不触发导入）"""
+        return self._extractors.get(app_type)
+
+    def app_types(self) -> List[str]:
+        """已注册的平台类型"""
+        return list(self._targets)
+
+    def for_host(self, host: str) -> Optional[Type[BaseExtractor]]:
+        """按域名获取提取器，不支持时返回 None"""
+        host = host.lower().rstrip(".")
+        while host:
+            app_type = self._hosts.get(host)
+            if app_type is not None:
+                return self.get(app_type)
+            _, _, host = host.partition(".")
+        return None
+
+    def for_url(self, url: str) -> Optional[Type[BaseExtractor]]:
+        """按链接的域名获取提取器，不支持时返回 None"""
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            return None
+        return self.for_host(host) if host else None
+
+    def _get_text_pattern(self) -> Pattern:
+        if self._text_pattern is None:
+            groups = []
+            for app_type, platform_hosts in self._platform_hosts.items():
+                hosts = "|".join(re.escape(host.lower()) for host in platform_hosts)
+                groups.append(f"(?P<{app_type}>{hosts})")
+            self._text_pattern = re.compile(
+                r"https?://(?:[a-z0-9-]+\.)*(?:" + "|".join(groups) + r")(?![a-z0-9.-])[^\s,，]*",
+                re.I,
+            )
+        return self._text_pattern
+
+    def match(self, text: str) -> Optional[Tuple[Type[BaseExtractor], str]]:
+        """从任意文本中找出第一个受支持的链接，返回 (提取器, 链接)，找不到时返回 None"""
+        match = self._get_text_pattern().search(text)
+        if not match:
+            return None
+        url = _TRAILING_PUNCTUATION_RE.sub("", match.group(0))
+        return self.get(match.lastgroup), url
+
+    async def create(self, app_type: str, text: str, type: Optional[str], url: Optional[str] = None):
+        """通过注册表创建平台实例（异步抓取并解析）"""
+        extractor = self.get(app_type)
+        if extractor is None:
+            raise ValueError(f"不支持的平台: {app_type}")
+        return await extractor.create(text, type, url=url)
+
+
+# 全局注册表
+registry = ExtractorRegistry()
+for _package in PLATFORM_PACKAGES:
+    registry.register_package(_package)
@@ -1,17 +1,15 @@
-from seleniumwire import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
+from typing import TYPE_CHECKING
 from src.utils import get_test_logger
-from seleniumwire.request import (
-    Request as SeleniumRequest,
-    Response as SeleniumResponse,
-)
 from src.utils.response import Response
 import gzip
 import json
 
+if TYPE_CHECKING:
+    from seleniumwire.request import (
+        Request as SeleniumRequest,
+        Response as SeleniumResponse,
+    )
+
 # 在原有导入基础上新增必要模块
 logger = get_test_logger()
 
@@ -25,6 +23,10 @@ class Test:
         self._init_driver()
 
     def _init_driver(self):
+        # selenium 首次使用时才导入
+        from seleniumwire import webdriver
+        from selenium.webdriver.chrome.options import Options
+
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
@@ -68,11 +70,11 @@ class Test:
         #     if 'statuses/show' in request.url:
         #         logger.info(request.response)
 
-    def on_request(self, request: SeleniumRequest):
+    def on_request(self, request: "SeleniumRequest"):
         if "statuses/show" in request.url:
             logger.info(request.url)
 
-    def on_response(self, request: SeleniumRequest, response: SeleniumResponse):
+    def on_response(self, request: "SeleniumRequest", response: "SeleniumResponse"):
         if "statuses/show" in request.url:
             body_str = gzip.decompress(response.body)
             body = json.loads(body_str)
@@ -1,28 +1,57 @@
-from bs4 import BeautifulSoup
-import execjs
+import re
+from typing import TYPE_CHECKING
 import httpx
-from seleniumwire import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
 from src.utils import config, get_analyze_logger
-from seleniumwire.request import (
-    Request as SeleniumRequest,
-    Response as SeleniumResponse,
-)
 from src.utils.response import Response
+from src.utils import http_client
+from src.utils.state_blob import extract_state
+from src.app.base import BaseExtractor
+from src.utils.executor import run_in_process
+from src.app.weibo import HOSTS
 import gzip
 import json
 
+if TYPE_CHECKING:
+    from seleniumwire.request import (
+        Request as SeleniumRequest,
+        Response as SeleniumResponse,
+    )
+
 logger = get_analyze_logger()
 
+# 请求头
+HEADERS = {
+    "User-Agent": config.MOBILE_USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Referer": "https://www.google.com/",
+}
+
+# statuses/show 接口请求头
+JSON_HEADERS = {
+    "User-Agent": config.MOBILE_USER_AGENT,
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
+    "X-Requested-With": "XMLHttpRequest",
+}
+
 
-class Weibo:
-    def __init__(self, url, type):
+class Weibo(BaseExtractor):
+    app_type = "weibo"
+    HOSTS = HOSTS
+    CONTENT_ID_PATTERNS = [
+        re.compile(r"/(?:detail|status)/([0-9a-zA-Z]+)"),
+        re.compile(r"weibo\.com/\d+/([0-9a-zA-Z]+)"),
+        re.compile(r"[?&]mblogid=([0-9a-zA-Z]+)"),
+    ]
+    HEADERS = HEADERS
+    # $render_data 解析方案的使用次数，execjs 为备用方案
+    parser_stats = {"json": 0, "native": 0, "execjs": 0, "failed": 0}
+
+    def __init__(self, url, type=None, html=None, status=None):
         self.url = url
         self.type = type
-        self.html = ""
+        self.content = ""
         self.soup = ""
         self.image_list = []
         self.live_list = []
@@ -31,23 +60,98 @@ class Weibo:
         self.description = ""
         self.video = ""
         self.app_type = "weibo"
+        # 数据来源: json（statuses/show 接口）/ native / execjs（页面 $render_data），未解析到数据时为 None
+        self.parser = None
         # self._init_driver()
-        self._init_request()
+        if status is not None:
+            # 已通过 statuses/show 接口拿到数据，无需请求页面
+            self.parser = "json"
+            self.load_status(status)
+        else:
+            self._init_request(html)
+
+    @classmethod
+    async def load(cls, text, type, url):
+        """
+        获取并解析微博数据: 优先从分享链接中解析出微博 ID，直接请求 statuses/show 接口，
+        接口请求失败或返回的数据无效时再获取 m.weibo.cn 页面
+        """
+        status_id = cls.parse_content_id(url)
+        if status_id:
+            fetched = await cls.fetch_status(status_id)
+            if fetched is not None:
+                result = await run_in_process(cls.extract, text, type, **fetched)
+                if result is not None:
+                    return result, fetched["content"]
+                logger.warning(f"微博 statuses/show 返回的数据无效，使用页面方案: {status_id}")
+        return await super().load(text, type, url)
+
+    @classmethod
+    async def fetch(cls, url):
+        """通过共享 HTTP 客户端获取 m.weibo.cn 页面"""
+        try:
+            response = await http_client.fetch(url, headers=HEADERS)
+        except Exception as e:
+            logger.error(f"获取微博内容失败: {e}")
+            raise e
+        return {"content": response.content}
+
+    @classmethod
+    async def fetch_status(cls, status_id):
+        """
+        请求 statuses/show 接口，失败时返回 None
+        只检查状态码和内容类型，JSON 在解析进程池中由 extract 解析和校验
+        """
+        api_url = config.WEIBO_STATUS_API.format(id=status_id)
+        headers = {**JSON_HEADERS, "Referer": f"https://m.weibo.cn/detail/{status_id}"}
+        try:
+            response = await http_client.fetch(api_url, headers=headers)
+            if response.status_code == 200 and "json" in response.headers.get("content-type", ""):
+                return {"content": response.content, "source": "json"}
+            logger.warning(f"微博 statuses/show 返回异常，使用页面方案: {status_id}, {response.status_code}")
+        except Exception as e:
+            logger.warning(f"微博 statuses/show 请求失败，使用页面方案: {status_id}, {e}")
+        return None
+
+    @staticmethod
+    def extract(text, type, content, source="html"):
+        """
+        从原始字节（页面或 statuses/show 接口的 JSON）提取结果字典（在解析进程池中执行）
+        接口返回的数据无效（ok 不为 1 或没有 data）时返回 None，由 load 回退到页面方案
+        """
+        if source == "json":
+            try:
+                payload = json.loads(content)
+            except ValueError:
+                return None
+            if not isinstance(payload, dict) or payload.get("ok") != 1 or not isinstance(payload.get("data"), dict):
+                return None
+            weibo = Weibo(text, type, status=payload["data"])
+        else:
+            weibo = Weibo(text, type, html=content)
+        # 数据来源随结果带回主进程，用于统计
+        return {**weibo.result(), "_parser": weibo.parser}
+
+    @classmethod
+    def from_result(cls, text, type, result, content=b""):
+        """用结果字典构造实例，并记录本次使用的解析方案"""
+        result = dict(result)
+        parser = result.pop("_parser", None)
+        cls.parser_stats[parser or "failed"] += 1
+        obj = super().from_result(text, type, result, content=content)
+        obj.parser = parser
+        return obj
 
     # request方案
-    def _init_request(self):
+    def _init_request(self, html=None):
         try:
-            headers = {
-                "User-Agent": config.MOBILE_USER_AGENT,
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-            }
-            response = httpx.get(
-                self.url, follow_redirects=True, headers=headers, timeout=10.0
-            )
-            self.html = response.text
-            self.soup = BeautifulSoup(self.html, "html.parser")
+            # 未传入页面内容时同步获取（兼容脚本中的直接调用）
+            if html is None:
+                response = httpx.get(
+                    self.url, follow_redirects=True, headers=HEADERS, timeout=10.0
+                )
+                html = response.text
+            self.content = html
 
             # 提取页面内容
             self.extract_weibo_data()
@@ -56,6 +160,45 @@ class Weibo:
             raise e
 
     def extract_weibo_data(self):
+        """提取 $render_data 中的 status 数据"""
+        render_data = self.extract_render_data()
+        if render_data is None and config.WEIBO_EXECJS_FALLBACK:
+            render_data = self.extract_render_data_execjs()
+        if render_data is None:
+            return
+        self.load_status(render_data.get("status", {}))
+
+    def load_status(self, status):
+        """从 status 数据中提取图片、实况、视频、标题和描述"""
+        self.body = status
+        self.get_image_list()
+        self.get_live_list()
+        self.get_video()
+        self.get_title()
+        self.get_description()
+
+    def extract_render_data(self):
+        """
+        在进程内解析 `$render_data = [...][0] || {}`，不依赖 JS 运行时
+
+        返回:
+            render_data 字典，找不到或解析失败时返回 None
+        """
+        data = extract_state(self.content, "$render_data")
+        if not isinstance(data, list):
+            return None
+        self.parser = "native"
+        # 对应 JS 中的 `[...][0] || {}`
+        render_data = data[0] if data else None
+        return render_data if isinstance(render_data, dict) and render_data else {}
+
+    def extract_render_data_execjs(self):
+        """备用方案: 用 JS 运行时执行 $render_data 所在的脚本（需开启 WEIBO_EXECJS_FALLBACK）"""
+        import execjs
+        from bs4 import BeautifulSoup
+
+        logger.warning(f"微博 $render_data 原生解析失败，使用 execjs 备用方案: {self.url}")
+        self.soup = BeautifulSoup(self.content, "html.parser")
         scripts = self.soup.find_all("script")
         for script in scripts:
             if script.string and "$render_data" in script.string:
@@ -68,18 +211,19 @@ class Weibo:
                 """
                 # 执行js代码
                 ctx = execjs.compile(js_code)
-                # 双引号的数据需要转换为单引号
-                render_data = ctx.call("get_render_data")
-                self.body = render_data.get("status", {})
-                self.get_image_list()
-                self.get_live_list()
-                self.get_video()
-                self.get_title()
-                self.get_description()
-                break
+                self.parser = "execjs"
+                return ctx.call("get_render_data")
+        return None
 
     # 无头浏览器方案
     def _init_driver(self):
+        # selenium 只在无头浏览器方案中使用，首次使用时才导入
+        from seleniumwire import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.common.by import By
+
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
@@ -118,13 +262,13 @@ class Weibo:
             EC.presence_of_element_located((By.CLASS_NAME, "woo-box-flex"))
         )
 
-    def on_request(self, request: SeleniumRequest):
+    def on_request(self, request: "SeleniumRequest"):
         if "statuses/show" in request.url:
             import time
 
             time.sleep(2)
 
-    def on_response(self, request: SeleniumRequest, response: SeleniumResponse):
+    def on_response(self, request: "SeleniumRequest", response: "SeleniumResponse"):
         if "statuses/show" in request.url:
             body_str = gzip.decompress(response.body)
             logger.info(body_str, "body_str")
@@ -166,20 +310,23 @@ class Weibo:
         self.description = description
         return self.description
 
+    def result(self):
+        """返回解析结果字典"""
+        return {
+            "url": self.url,
+            "final_url": "",
+            "title": self.title,
+            "description": self.description,
+            "image_list": self.image_list,
+            "live_list": self.live_list,
+            "video": self.video,
+            "app_type": self.app_type,
+        }
+
     def to_dict(self):
         """将对象转换为字典，用于 API 返回"""
         try:
-            result = {
-                "url": self.url,
-                "final_url": "",
-                "title": self.title,
-                "description": self.description,
-                "image_list": self.image_list,
-                "live_list": self.live_list,
-                "video": self.video,
-                "app_type": self.app_type,
-            }
-            return Response.success(result, "获取成功")
+            return Response.success(self.result(), "获取成功")
         except Exception as e:
             logger.error(f"微博转换为字典时出错: {str(e)}", exc_info=True)
             return Response.error("获取失败")
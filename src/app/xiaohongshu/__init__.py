@@ -1,4 +1,11 @@
 # xiaohongshu 包初始化
-# 这里不需要任何导入，因为已经在上层 __init__.py 中直接导入了所需内容
+# 只声明平台信息，提取器模块在首次使用时才导入（见 src/app/registry.py）
 
-__all__ = []  # 此包不直接导出任何内容
\ No newline at end of file
+# 平台类型
+APP_TYPE = "xiaohongshu"
+# 小红书域名，同时匹配其所有子域名
+HOSTS = ["xiaohongshu.com", "xhslink.com"]
+# 提取器类，格式为 模块:类名
+EXTRACTOR = "src.app.xiaohongshu.index:Xiaohongshu"
+
+__all__ = ["APP_TYPE", "HOSTS", "EXTRACTOR"]
@@ -1,15 +1,35 @@
+from src.app.base import BaseExtractor
+from src.app.xiaohongshu import HOSTS
 from src.app.xiaohongshu.image import Image
 from src.utils import find_url, get_analyze_logger, config, Response
+from src.utils import http_client
+from src.utils.state_blob import LazyState, loads_js_state, find_title, find_meta
+from src.utils.extraction import get_plan
 import re
 import httpx
-from bs4 import BeautifulSoup
 import json
 
 # 获取小红书模块的日志器
 logger = get_analyze_logger()
 
-class Xiaohongshu:
-    def __init__(self, text, type):
+# 请求头
+HEADERS = {
+    "User-Agent": config.DEFAULT_USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Referer": "https://www.google.com/",
+}
+
+class Xiaohongshu(BaseExtractor):
+    app_type = "xiaohongshu"
+    HOSTS = HOSTS
+    CONTENT_ID_PATTERNS = [
+        re.compile(r"/explore/([0-9a-zA-Z]+)"),
+        re.compile(r"/discovery/item/([0-9a-zA-Z]+)"),
+    ]
+    HEADERS = HEADERS
+
+    def __init__(self, text, type, html=None, final_url=None):
         try:
             self.text = text
             self.url = find_url(text)
@@ -19,43 +39,86 @@ class Xiaohongshu:
             self.live_list = []
             self.description = ""
             self.final_url = None
-            self.html = ""
+            self.content = ""
             self.soup = None
             self.title = ""
             self.data = {}
-            self.app_type_keyword = config.APP_TYPE_KEYWORD.get("xiaohongshu")
+            # 当前笔记数据 noteDetailMap[firstNoteId].note
+            self.note_data = {}
             if not self.url:
                 error_msg = f"无法从文本 '{text}' 中提取 URL"
                 raise ValueError(error_msg)
 
-            # 获取重定向 URL
-            headers = {
-                "User-Agent": config.DEFAULT_USER_AGENT,
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-            }
-
-            response = httpx.get(
-                self.url, follow_redirects=True, headers=headers, timeout=10.0
-            )
-            self.final_url = response.url
+            # 未传入页面内容时同步获取（兼容脚本中的直接调用）
+            if html is None:
+                response = httpx.get(
+                    self.url, follow_redirects=True, headers=HEADERS, timeout=10.0
+                )
+                html, final_url = response.text, response.url
+            self.final_url = final_url
             if "404" in str(self.final_url):
                 # 抛出异常
                 raise ValueError(f"小红书链接已失效: {self.final_url}")
-            self.html = response.text
-            # 使用 BeautifulSoup 解析 HTML
-            self.soup = BeautifulSoup(self.html, "html.parser")
-            # 提取页面标题
-            self.title = self.soup.title.text if self.soup.title else ""
-            # 尝试提取小红书数据（示例）
-            self.extract_xiaohongshu_data()
+            self.content = html
+            # 优先直接从原始 HTML 中提取页面状态，失败时才构建 DOM
+            if not self.extract_fast():
+                # bs4 只在 DOM 方案中使用，首次使用时才导入
+                from bs4 import BeautifulSoup
+
+                # 使用 BeautifulSoup 解析 HTML
+                self.soup = BeautifulSoup(self.content, "html.parser")
+                # 提取页面标题
+                self.title = self.soup.title.text if self.soup.title else ""
+                # 尝试提取小红书数据（示例）
+                self.extract_xiaohongshu_data()
             
         except Exception as e:
             logger.error(f"Xiaohongshu 初始化错误: {str(e)}", exc_info=True)
             raise e
             # 设置一些默认值，避免后续处理出错
 
+    @classmethod
+    async def fetch(cls, url):
+        """通过共享 HTTP 客户端异步获取页面"""
+        response = await http_client.fetch(url, headers=HEADERS)
+        return {"content": response.content, "final_url": str(response.url)}
+
+    @staticmethod
+    def extract(text, type, content, final_url=None):
+        """从页面原始字节提取结果字典（在解析进程池中执行）"""
+        return Xiaohongshu(text, type, html=content, final_url=final_url).result()
+
+    def extract_fast(self):
+        """
+        不构建 DOM，直接从原始 HTML 中提取当前笔记数据，成功返回 True
+
+        __INITIAL_STATE__ 中大部分是推荐流、用户和配置等用不到的数据，
+        这里只定位 note.firstNoteId 并解析 noteDetailMap[firstNoteId].note，其余部分直接跳过
+        """
+        try:
+            state = LazyState.find(self.content, "window.__INITIAL_STATE__")
+            if state is None:
+                return False
+            note = state.get("note")
+            first_note_id = note.get("firstNoteId") if note else None
+            first_note_id = first_note_id.load() if first_note_id else ""
+            note_data = None
+            if isinstance(first_note_id, str) and first_note_id:
+                note_data = note.get("noteDetailMap", first_note_id, "note")
+            note_data = note_data.load() if note_data else None
+            self.note_data = note_data if isinstance(note_data, dict) else {}
+        except ValueError as e:
+            logger.warning(f"小红书页面状态懒解析失败，使用 DOM 方案: {e}")
+            return False
+        self.title = find_title(self.content)
+        self.get_note_fields()
+        self.description = (
+            find_meta(self.content, name="description")
+            or find_meta(self.content, property="og:description")
+            or ""
+        )
+        return True
+
     def extract_xiaohongshu_data(self):
         """尝试从 HTML 中提取小红书数据"""
         self.data = {}
@@ -67,12 +130,11 @@ class Xiaohongshu:
                 try:
                     # 提取 JSON 数据
                     data_text = script.string.split("window.__INITIAL_STATE__=")[1]
-                    # 把字符串中的undefined替换为null
-                    data_text = data_text.replace("undefined", "null")
                     try:
-                        self.data_dict = json.loads(data_text)
-                        self.get_image_list()
-                        self.get_video()
+                        # 字符串外的 undefined 转为 null
+                        self.data_dict = loads_js_state(data_text)
+                        self.note_data = self.find_note_data(self.data_dict)
+                        self.get_note_fields()
                         self.get_meta_description()
                     except json.JSONDecodeError as e:
                         raise e
@@ -88,53 +150,37 @@ class Xiaohongshu:
         description = meta.get("content", "") if meta else ""
         self.description = description
 
-    def get_image_list(self):
-        """获取图片列表"""
-        try:
-            note = self.data_dict.get("note", {})
-            note_detail_map = note.get("noteDetailMap", {})
-            first_note_id = note.get("firstNoteId", "")
-            note_data = note_detail_map.get(first_note_id, {}).get("note", {})
-            image_list = note_data.get("imageList", [])
-            token_list = []
-            for image in image_list:
-                if image.get("urlDefault"):
-                    token_list.append(image.get("urlDefault", ""))
-                live_url = image.get("stream", {}).get("h264", [{}])[0].get("masterUrl")
-                if live_url:
-                    self.live_list.append(live_url)
-            self.image_list = Image(token_list, self.type).to_dict()
-        except Exception as e:
-            raise e
+    @staticmethod
+    def find_note_data(data_dict):
+        """从完整的页面状态中取出当前笔记数据 noteDetailMap[firstNoteId].note"""
+        note = data_dict.get("note", {})
+        note_detail_map = note.get("noteDetailMap", {})
+        first_note_id = note.get("firstNoteId", "")
+        return note_detail_map.get(first_note_id, {}).get("note", {})
 
-    def get_video(self):
-        """获取视频"""
-        try:
-            note = self.data_dict.get("note", {})
-            note_detail_map = note.get("noteDetailMap", {})
-            first_note_id = note.get("firstNoteId", "")
-            note_data = note_detail_map.get(first_note_id, {}).get("note", {})
-            video_info = note_data.get("video", {}).get("media", {})
-            masterUrl = (
-                video_info.get("stream", {}).get("h264", [{}])[0].get("masterUrl")
-            )
-            self.video = masterUrl
-        except Exception as e:
-            raise e
+    def get_note_fields(self):
+        """按 EXTRACTION_SPECS 中的字段路径一次遍历取出图片、实况和视频"""
+        fields = get_plan("xiaohongshu").run(self.note_data)
+        self.image_list = Image(fields["image_list"], self.type).to_dict()
+        self.live_list = fields["live_list"]
+        self.video = fields["video"]
+
+    def result(self):
+        """返回解析结果字典"""
+        return {
+            "url": self.url,
+            "final_url": str(self.final_url) if self.final_url else None,
+            "title": self.title,
+            "description": self.description,
+            "image_list": list(self.image_list),
+            "live_list": self.live_list,
+            "video": self.video,
+            "app_type": "xiaohongshu",
+        }
 
     def to_dict(self):
         """将对象转换为字典，用于 API 返回"""
         try:
-            result = {
-                "url": self.url,
-                "final_url": str(self.final_url) if self.final_url else None,
-                "title": self.title,
-                "description": self.description,
-                "image_list": self.image_list,
-                "live_list": self.live_list,
-                "video": self.video,
-                "app_type": "xiaohongshu",
-            }
-            return Response.success(result, "获取成功")
+            return Response.success(self.result(), "获取成功")
         except Exception as e:
             raise ValueError(f"小红书转换为字典时出错: {str(e)}")
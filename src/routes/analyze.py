@@ -1,11 +1,13 @@
-from typing import Optional
-from fastapi import APIRouter, HTTPException
+import json
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.responses import Response as HttpResponse
 from pydantic import BaseModel
-from src.app.kuaishou.index import Kuaishou
-from src.app.douyin.index import Douyin
-from src.app.weibo.index import Weibo
-from src.utils import config, get_analyze_logger
-from src.app.xiaohongshu.index import Xiaohongshu
+from src.app.registry import registry
+from src.utils import config, find_urls, get_analyze_logger
+from src.utils.response import Response
+from src.services.analyze_service import AnalyzeService
 
 # 获取应用日志器
 logger = get_analyze_logger()
@@ -15,6 +17,14 @@ class AnalyzeParams(BaseModel):
     url: str
     type: Optional[str] = "png"
     format: Optional[str] = "json"
+    cache: Optional[str] = "default"  # 缓存策略，"bypass" 跳过缓存强制重新获取
+
+
+class BatchAnalyzeParams(BaseModel):
+    urls: Optional[List[str]] = None  # 链接列表，每一项也可以是包含链接的文本
+    text: Optional[str] = None  # 批量粘贴的文本，会提取其中所有链接
+    type: Optional[str] = "png"
+    cache: Optional[str] = "default"
 
 
 # 创建路由器
@@ -23,58 +33,120 @@ router = APIRouter(
     tags=["analyze"],
     responses={404: {"description": "Not found"}},
 )
+analyze_service = AnalyzeService()
 
 
-# 无前缀的POST端点
-@router.post("")
-async def process_analyze(params: AnalyzeParams):
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 是否包含当前 ETag（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        # 只去掉弱校验前缀 W/，lstrip 会把 ETag 开头的 W 和 / 字符一并去掉
+        tag = tag[2:] if tag.startswith("W/") else tag
+        if tag == etag:
+            return True
+    return False
+
+
+async def analyze_response(
+    request: Request,
+    extractor,
+    text: str,
+    type: Optional[str],
+    cache: Optional[str],
+    url: Optional[str] = None,
+) -> HttpResponse:
+    """
+    解析并返回带 ETag 和 Cache-Control 的响应，GET 和 POST 接口共用
+
+    ETag 由序列化后的结果生成；If-None-Match 一致时返回 304，不发送响应体；
+    成功结果的 max-age 为结果在缓存中剩余的有效时间，失败结果不缓存
+    """
+    result, key = await analyze_service.analyze_keyed(extractor, text, type, cache, url=url)
+    body, etag = analyze_service.encode(key, result)
+    max_age = analyze_service.max_age(key, result)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}" if max_age > 0 else "no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return HttpResponse(status_code=304, headers=headers)
+    return HttpResponse(content=body, media_type="application/json", headers=headers)
+
+
+async def process_analyze_url(request: Request, url: str, type: Optional[str], cache: Optional[str]):
+    """按域名判断链接属于哪个平台并解析"""
     try:
-        url = params.url
-        app_type = ""
-        # 判断url是否包含小红书或抖音
-        if any(keyword in url for keyword in config.APP_TYPE_KEYWORD["xiaohongshu"]):
-            app_type = "xiaohongshu"
-        elif any(keyword in url for keyword in config.APP_TYPE_KEYWORD["douyin"]):
-            app_type = "douyin"
-        elif any(keyword in url for keyword in config.APP_TYPE_KEYWORD["kuaishou"]):
-            app_type = "kuaishou"
-        elif any(keyword in url for keyword in config.APP_TYPE_KEYWORD["weibo"]):
-            app_type = "weibo"
-        else:
-            from src.utils.response import Response
+        matched = analyze_service.detect_extractor(url)
+        if matched is None:
             return Response.error("不支持的URL")
-        
-        
-        # 根据app_type选择对应的模块
-        if app_type == 'xiaohongshu':
-            from src.app.xiaohongshu.index import Xiaohongshu
-            xiaohongshu = Xiaohongshu(url, params.type)
-            return xiaohongshu.to_dict()
-        elif app_type == 'douyin':
-            from src.app.douyin.index import Douyin
-            douyin = Douyin(url, params.type)
-            return douyin.to_dict()
-        elif app_type == 'kuaishou':
-            from src.app.kuaishou.index import Kuaishou
-            kuaishou = Kuaishou(url, params.type)
-            return kuaishou.to_dict()
-        elif app_type == 'weibo':
-            from src.app.weibo.index import Weibo
-            weibo = Weibo(url, params.type)
-            return weibo.to_dict()
-        else:
-            from src.utils.response import Response
-            return Response.error("请联系客服！")
+        extractor, matched_url = matched
+        return await analyze_response(request, extractor, url, type, cache, url=matched_url)
     
     except Exception as e:
         logger.error(f"处理聚合数据出错: {url}", exc_info=True)
         logger.error(f"处理聚合数据出错: {str(e)}", exc_info=True)
-        from src.utils.response import Response
         raise HTTPException(status_code=500, detail=Response.error(str(e)))
 
+
+# 无前缀的POST端点
+@router.post("")
+async def process_analyze(params: AnalyzeParams, request: Request):
+    return await process_analyze_url(request, params.url, params.type, params.cache)
+
+
+# 可被 HTTP 缓存的 GET 端点
+@router.get("")
+async def process_analyze_get(
+    request: Request,
+    url: str = Query(..., description="分享链接或包含链接的文本"),
+    type: Optional[str] = Query("png", description="图片类型，支持 \"png\" 或 \"webp\""),
+    cache: Optional[str] = Query("default", description="缓存策略，\"bypass\" 跳过缓存"),
+):
+    """
+    解析链接（GET），返回与 POST /analyze 相同的结果
+
+    响应带 ETag 和 Cache-Control，重复请求时带上 If-None-Match，结果未变化时返回 304
+    """
+    return await process_analyze_url(request, url, type, cache)
+
+# 批量解析
+@router.post("/batch")
+async def process_analyze_batch(params: BatchAnalyzeParams):
+    """
+    批量解析链接，以 NDJSON 流式返回，每解析完一个链接就返回一行（按完成顺序，不按输入顺序）
+    
+    参数:
+    - urls: 链接列表，每一项也可以是包含链接的文本
+    - text: 批量粘贴的文本，会提取其中所有链接
+    - type: 图片类型，支持 "png" 或 "webp"
+    - cache: 缓存策略，"bypass" 跳过缓存
+    
+    每行结果包含 index（链接在去重后列表中的位置）、url 以及与 /analyze 相同的 code/data/message
+    """
+    texts = list(params.urls or [])
+    if params.text:
+        texts.append(params.text)
+    # 提取所有链接并去重，保持输入顺序
+    urls = list(dict.fromkeys(url for text in texts for url in find_urls(text)))
+    if not urls:
+        return Response.error("未找到URL")
+    if len(urls) > config.BATCH_MAX_URLS:
+        return Response.error(f"单次最多解析 {config.BATCH_MAX_URLS} 个链接")
+    logger.info(f"批量解析 {len(urls)} 个链接")
+
+    async def _stream():
+        async for item in analyze_service.analyze_batch(urls, params.type, params.cache):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
 # 小红书
 @router.post("/xiaohongshu")
-async def process_xiaohongshu(params: AnalyzeParams):
+async def process_xiaohongshu(params: AnalyzeParams, request: Request):
     """
     处理小红书 URL 并返回数据
     
@@ -85,22 +157,20 @@ async def process_xiaohongshu(params: AnalyzeParams):
     """
     logger.info(f"处理小红书URL (POST): {params.url}")
     try:
-        xiaohongshu = Xiaohongshu(params.url, params.type)
-        
         if params.format.lower() == "html":
             # 返回 HTML 内容
-            from src.utils.response import Response
+            xiaohongshu = await registry.create("xiaohongshu", params.url, params.type)
             return Response.success(xiaohongshu.html, "获取成功")
         else:
             # 返回结构化数据
-            return xiaohongshu.to_dict()
+            return await analyze_response(request, registry.get("xiaohongshu"), params.url, params.type, params.cache)
     except Exception as e:
         logger.error(f"处理小红书URL出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
     
 # 抖音
 @router.post("/douyin")
-async def process_douyin(params: AnalyzeParams):
+async def process_douyin(params: AnalyzeParams, request: Request):
     """
     处理抖音 URL 并返回数据
     
@@ -111,22 +181,20 @@ async def process_douyin(params: AnalyzeParams):
     """
     logger.info(f"处理抖音URL (POST): {params.url}")
     try:
-        douyin = Douyin(params.url, params.type)
-        
         if params.format.lower() == "html":
             # 返回 HTML 内容
-            from src.utils.response import Response
+            douyin = await registry.create("douyin", params.url, params.type)
             return Response.success(douyin.html, "获取成功")
         else:
             # 返回结构化数据
-            return douyin.to_dict()
+            return await analyze_response(request, registry.get("douyin"), params.url, params.type, params.cache)
     except Exception as e:
         logger.error(f"处理抖音URL出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 # 快手
 @router.post("/kuaishou")
-async def process_kuaishou(params: AnalyzeParams):
+async def process_kuaishou(params: AnalyzeParams, request: Request):
     """
     处理快手 URL 并返回数据
     
@@ -137,22 +205,20 @@ async def process_kuaishou(params: AnalyzeParams):
     """
     logger.info(f"处理快手URL (POST): {params.url}")
     try:
-        kuaishou = Kuaishou(params.url, params.type)
-        
         if params.format.lower() == "html":
             # 返回 HTML 内容
-            from src.utils.response import Response
+            kuaishou = await registry.create("kuaishou", params.url, params.type)
             return Response.success(kuaishou.html, "获取成功")
         else:
             # 返回结构化数据
-            return kuaishou.to_dict()
+            return await analyze_response(request, registry.get("kuaishou"), params.url, params.type, params.cache)
     except Exception as e:
         logger.error(f"处理快手URL出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
     
 # 微博
 @router.post("/weibo")
-async def process_weibo(params: AnalyzeParams):
+async def process_weibo(params: AnalyzeParams, request: Request):
     """
     处理微博 URL 并返回数据
     
@@ -163,15 +229,33 @@ async def process_weibo(params: AnalyzeParams):
     """
     logger.info(f"处理微博URL (POST): {params.url}")
     try:
-        weibo = Weibo(params.url)
-        
         if params.format.lower() == "html":
             # 返回 HTML 内容
-            from src.utils.response import Response
+            weibo = await registry.create("weibo", params.url, params.type)
             return Response.success(weibo.html, "获取成功")
         else:
             # 返回结构化数据
-            return weibo.to_dict()
+            return await analyze_response(request, registry.get("weibo"), params.url, params.type, params.cache)
     except Exception as e:
         logger.error(f"处理抖音URL出错: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# 缓存统计
+@router.get("/cache/stats")
+async def process_cache_stats():
+    """获取解析结果缓存的命中、未命中、淘汰等统计信息"""
+    return Response.success(await analyze_service.cache_stats(), "获取成功")
+
+
+# 解析统计
+@router.get("/stats")
+async def process_stats():
+    """获取解析方案统计: 快手各 URL 模式下 UA 变体的胜出次数、微博 $render_data 解析方案的使用次数"""
+    # 只统计已经加载的平台，不为统计接口导入平台模块
+    kuaishou = registry.loaded("kuaishou")
+    weibo = registry.loaded("weibo")
+    return Response.success({
+        "kuaishou_ua_variants": kuaishou.variant_stats() if kuaishou else {},
+        "weibo_parser": dict(weibo.parser_stats) if weibo else {},
+    }, "获取成功")
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Response, Query
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Dict, Optional, Tuple
 from pydantic import BaseModel
-import requests
-from src.app.test.index import Test
 from src.utils import get_global_logger, config
+from src.utils.http_client import open_stream, iter_stream
+from src.utils.shared_fetch import FetchCoalescer, SharedFetch
+from src.utils.media_cache import MediaCache, CachedMedia, cached_response, normalize_url
+from src.utils.executor import run_in_process
+from src.utils.thumbnail import THUMBNAIL_FORMATS, pillow_available, make_thumbnail
+from src.utils.response import Response
+import asyncio
+import hashlib
 import httpx
 from fastapi.responses import StreamingResponse
-import io
+from starlette.responses import Response as HttpResponse
+from starlette.background import BackgroundTask
 import ipaddress
 from urllib.parse import urlparse
 
@@ -20,6 +27,88 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# 代理媒体文件的磁盘缓存
+media_cache = MediaCache(
+    config.MEDIA_CACHE_DIR,
+    max_bytes=config.MEDIA_CACHE_MAX_BYTES,
+    max_file_bytes=config.MEDIA_CACHE_MAX_FILE_BYTES,
+    revalidate_after=config.MEDIA_CACHE_REVALIDATE_AFTER,
+) if config.MEDIA_CACHE else None
+
+
+async def lookup_media(url: str, variant: str = "") -> Optional[CachedMedia]:
+    """查找磁盘缓存，未启用或出错时返回 None"""
+    if media_cache is None:
+        return None
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, media_cache.lookup, url, variant)
+    except Exception as e:
+        logger.warning(f"查找媒体缓存失败: {url}, {e}")
+        return None
+
+
+async def open_media(url: str, headers: dict, media: Optional[CachedMedia]) -> httpx.Response:
+    """请求上游；有需要重新验证的缓存时带上 If-None-Match / If-Modified-Since"""
+    if media is not None:
+        if media.etag:
+            headers["If-None-Match"] = media.etag
+        if media.last_modified:
+            headers["If-Modified-Since"] = media.last_modified
+    return await open_stream(url, headers=headers)
+
+
+async def revalidated(url: str, upstream: httpx.Response, media: Optional[CachedMedia]) -> bool:
+    """上游返回 304 时关闭响应并更新缓存的验证时间，返回是否可以继续使用缓存"""
+    if media is None or upstream.status_code != 304:
+        return False
+    await upstream.aclose()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, media_cache.mark_validated, url)
+    except Exception as e:
+        logger.warning(f"更新媒体缓存失败: {url}, {e}")
+    return True
+
+
+def media_body(url: str, upstream: httpx.Response):
+    """转发上游响应体，可以缓存时同时写入磁盘缓存"""
+    body = iter_stream(upstream)
+    if media_cache is not None and media_cache.cacheable(upstream.status_code, upstream.headers):
+        body = media_cache.tee(url, upstream.headers, body)
+    return body
+
+
+async def store_image(fetch: SharedFetch):
+    """图片读取完成后写入磁盘缓存"""
+    if media_cache is not None and media_cache.cacheable(fetch.status_code, fetch.headers):
+        await asyncio.get_running_loop().run_in_executor(
+            None, media_cache.store_chunks, fetch.url, fetch.headers, fetch.chunks
+        )
+
+
+# 图片代理: 合并同一图片的并发请求
+image_fetches = FetchCoalescer(max_bytes=config.IMAGE_PROXY_MAX_BYTES, on_complete=store_image)
+
+# 缩略图: 合并同一缩略图的并发生成
+thumbnail_renders: Dict[str, "asyncio.Future[Tuple[bytes, str]]"] = {}
+
+# 图片代理和缩略图请求上游时使用的请求头
+IMAGE_REQUEST_HEADERS = {
+    'Referer': 'https://weibo.com',  # 设置合法的Referer
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+}
+
+# 视频代理: 透传给上游的请求头和返回给客户端的响应头
+PROXY_REQUEST_HEADERS = ("range", "if-range")
+PROXY_RESPONSE_HEADERS = (
+    "content-length",
+    "content-range",
+    "accept-ranges",
+    "content-encoding",
+    "etag",
+    "last-modified",
+    "cache-control",
+)
+
 # 定义请求参数模型
 class SystemParams(BaseModel):
     url: str
@@ -30,115 +119,268 @@ class SystemParams(BaseModel):
 async def process_get_file_stream(params: SystemParams):
     """
     将文件的url转换成流返回
+
+    边读取上游边转发，内存占用与文件大小无关；客户端断开时停止读取上游。
+    完整读取的文件写入磁盘缓存，之后直接从缓存返回
     
     参数:
     - url: 文件链接
     - filename: 可选的文件名，用于设置Content-Disposition header
     """
     logger.info(f"处理文件流请求 (POST): {params.url}")
+    media = await lookup_media(params.url)
+    if media is not None and media.fresh:
+        return cached_response(media, headers=attachment_headers(params.url, params.filename))
     try:
-        async with httpx.AsyncClient() as client:
-            # 使用stream=True来支持大文件流式传输
-            response = await client.get(params.url, follow_redirects=True)
-            response.raise_for_status()  # 确保请求成功
-            
-            # 获取内容类型
-            content_type = response.headers.get("content-type", "application/octet-stream")
-            
-            # 处理文件名
-            filename = params.filename
-            if not filename:
-                # 尝试从URL或响应头获取文件名
-                cd_header = response.headers.get("content-disposition", "")
-                if "filename=" in cd_header:
-                    filename = cd_header.split("filename=")[1].strip('"\'')
-                else:
-                    # 从URL路径获取文件名
-                    filename = params.url.split("/")[-1].split("?")[0] or "downloaded_file"
-            
-            # 设置响应头
-            headers = {
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-            
-            # 返回流式响应
-            return StreamingResponse(
-                io.BytesIO(response.content), 
-                media_type=content_type,
-                headers=headers
-            )
-    except httpx.HTTPStatusError as e:
-        logger.error(f"HTTP错误: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=e.response.status_code, detail=f"远程服务器错误: {str(e)}")
+        upstream = await open_media(params.url, {}, media)
+        if await revalidated(params.url, upstream, media):
+            return cached_response(media, headers=attachment_headers(params.url, params.filename))
     except Exception as e:
         logger.error(f"处理文件流请求出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+    try:
+        upstream.raise_for_status()  # 确保请求成功
+    except httpx.HTTPStatusError as e:
+        await upstream.aclose()
+        logger.error(f"HTTP错误: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=e.response.status_code, detail=f"远程服务器错误: {str(e)}")
+    
+    # 获取内容类型
+    content_type = upstream.headers.get("content-type", "application/octet-stream")
+    
+    # 设置响应头，透传上游的长度和编码（按原始字节转发）
+    headers = attachment_headers(params.url, params.filename, upstream.headers.get("content-disposition", ""))
+    for name in ("content-length", "content-encoding"):
+        if name in upstream.headers:
+            headers[name] = upstream.headers[name]
+    
+    # 返回流式响应，发送速度受客户端接收速度限制；
+    # 客户端断开时 starlette 取消转发，background 确保上游连接被关闭
+    return StreamingResponse(
+        media_body(params.url, upstream),
+        media_type=content_type,
+        headers=headers,
+        background=BackgroundTask(upstream.aclose),
+    )
+
+
+def attachment_headers(url: str, filename: Optional[str], cd_header: str = "") -> dict:
+    """生成下载文件的 Content-Disposition 响应头"""
+    # 处理文件名
+    if not filename:
+        # 尝试从URL或响应头获取文件名
+        if "filename=" in cd_header:
+            filename = cd_header.split("filename=")[1].strip('"\'')
+        else:
+            # 从URL路径获取文件名
+            filename = url.split("/")[-1].split("?")[0] or "downloaded_file"
+    return {
+        "Content-Disposition": f"attachment; filename={filename}"
+    }
     
 @router.get("/image_proxy")
-async def process_image_proxy(url: str):
+async def process_image_proxy(url: str, request: Request):
     """
     处理图片代理请求 设置referer为weibo.com 返回图片信息供前端展示
+
+    同一图片的并发请求共享一次上游请求，边读取边转发，读取完成后写入磁盘缓存；
+    响应带长期缓存头，浏览器和 CDN 不再重复请求
     
     参数:
     - url: 图片链接
     """
+    cache_headers = {"Cache-Control": config.IMAGE_PROXY_CACHE_CONTROL}
+    media = await lookup_media(url)
+    if media is not None:
+        # 图片链接按内容生成，不需要重新验证
+        return cached_response(media, request.headers, cache_headers)
+    fetch = image_fetches.get(url, dict(IMAGE_REQUEST_HEADERS))
     try:
-        headers = {
-            'Referer': 'https://weibo.com',  # 设置合法的Referer
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-        }
-        response = requests.get(url, headers=headers, stream=True)
-        # 获取原始响应的内容类型
-        content_type = response.headers.get('Content-Type')
-        
-        # 构建响应时传递原始内容类型
-        return Response(
-            content=response.content,
-            media_type=content_type
-        )
-    
+        await fetch.wait_headers()
     except Exception as e:
         logger.error(f"处理图片代理请求出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+    if fetch.status_code >= 400:
+        logger.error(f"图片请求失败: {url}, 状态码: {fetch.status_code}")
+        raise HTTPException(status_code=fetch.status_code, detail=f"远程服务器错误: {fetch.status_code}")
 
-@router.get("/proxy")
-def proxy_download(url: str = Query(..., description="目标资源 URL")):
+    # 获取原始响应的内容类型，透传长度和编码（按原始字节转发）
+    content_type = fetch.headers.get('content-type')
+    response_headers = dict(cache_headers)
+    for name in ("content-length", "content-encoding", "etag", "last-modified"):
+        if name in fetch.headers:
+            response_headers[name] = fetch.headers[name]
+
+    # 构建响应时传递原始内容类型
+    return StreamingResponse(
+        fetch.iter_chunks(),
+        media_type=content_type,
+        headers=response_headers,
+    )
+
+async def load_image(url: str) -> bytes:
+    """读取原图: 优先从磁盘缓存读取，否则与图片代理共享上游请求（读取完成后同样写入缓存）"""
+    media = await lookup_media(url)
+    if media is not None:
+        def read() -> bytes:
+            with open(media.path, "rb") as f:
+                return f.read()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, read)
+        except OSError as e:
+            # 文件已被其他进程淘汰，重新请求上游
+            logger.warning(f"读取媒体缓存失败: {url}, {e}")
+    fetch = image_fetches.get(url, dict(IMAGE_REQUEST_HEADERS))
+    await fetch.wait_headers()
+    if fetch.status_code >= 400:
+        raise HTTPException(status_code=fetch.status_code, detail=f"远程服务器错误: {fetch.status_code}")
+    return b"".join([chunk async for chunk in fetch.iter_chunks()])
+
+
+async def render_thumbnail(url: str, variant: str, width: int, quality: int, format: str) -> Tuple[bytes, str]:
+    """读取原图、在解析进程池中生成缩略图并写入磁盘缓存，返回 (图片字节, Content-Type)"""
+    data = await load_image(url)
     try:
-        # 设置更符合抖音要求的请求头
-        headers = {
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "Accept-Encoding": "gzip, deflate",
-            "Accept-Language": "zh-TW,zh;q=0.9,ja;q=0.8,ko;q=0.7,zh-CN;q=0.6,en-GB;q=0.5,en;q=0.4,en-US;q=0.3",
-            "Host": "sns-video-qc.xhscdn.com",
-            "Proxy-Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Referer": "https://www.duoleta.com/",
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36 Edg/136.0.0.0"
-        }
-
-        logger.info(f"请求URL: {url}")
-        logger.info(f"请求头: {headers}")
-
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-
-        # 记录响应详情
-        logger.info(f"响应状态码: {response.status_code}")
-        logger.info(f"响应头: {response.headers}")
-        logger.info(f"响应内容前100字节: {response.text[:100]}")
-
-        if response.status_code != 200:
-            logger.error(f"请求失败: {response.text}")
-            raise HTTPException(status_code=response.status_code, detail=f"Failed to fetch resource: {response.text}")
-
-        content_type = response.headers.get("Content-Type", "application/octet-stream")
-
-        return StreamingResponse(
-            content=response.iter_content(chunk_size=1024),
-            media_type=content_type,
-            headers={"Content-Type": content_type}
-        )
+        thumbnail, content_type = await run_in_process(make_thumbnail, data, width, format, quality)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    if media_cache is not None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, media_cache.store_chunks, url, {"content-type": content_type}, [thumbnail], variant
+            )
+        except Exception as e:
+            logger.warning(f"保存缩略图缓存失败: {url}, {e}")
+    return thumbnail, content_type
+
+
+@router.get("/thumbnail")
+async def process_thumbnail(
+    request: Request,
+    url: str = Query(..., description="原图链接"),
+    width: int = Query(config.THUMBNAIL_DEFAULT_WIDTH, ge=1, le=config.THUMBNAIL_MAX_WIDTH, description="宽度（像素），按比例缩放，不放大"),
+    quality: int = Query(config.THUMBNAIL_DEFAULT_QUALITY, ge=1, le=95, description="编码质量"),
+    format: str = Query(config.THUMBNAIL_DEFAULT_FORMAT, description="输出格式: webp / jpeg"),
+):
+    """
+    生成图片缩略图
+
+    解码、缩放和编码在解析进程池中执行，不阻塞事件循环；同一缩略图的并发请求只生成一次。
+    结果按 (原图 URL, 宽度, 质量, 格式) 写入媒体磁盘缓存，响应带长期缓存头
+    """
+    if format not in THUMBNAIL_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的格式: {format}")
+    if not pillow_available():
+        raise HTTPException(status_code=501, detail="未安装 Pillow，无法生成缩略图")
+    cache_headers = {"Cache-Control": config.IMAGE_PROXY_CACHE_CONTROL}
+    variant = f"thumbnail:w={width},q={quality},f={format}"
+    media = await lookup_media(url, variant)
+    if media is not None:
+        return cached_response(media, request.headers, cache_headers)
+
+    key = f"{normalize_url(url)}#{variant}"
+    render = thumbnail_renders.get(key)
+    if render is None:
+        render = thumbnail_renders[key] = asyncio.ensure_future(render_thumbnail(url, variant, width, quality, format))
+        render.add_done_callback(lambda _: thumbnail_renders.pop(key, None))
+    try:
+        # 某个请求断开时不取消其他请求共享的生成任务
+        thumbnail, content_type = await asyncio.shield(render)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"生成缩略图出错: {url}, {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    return HttpResponse(
+        thumbnail,
+        media_type=content_type,
+        headers={**cache_headers, "ETag": f'"{hashlib.sha256(thumbnail).hexdigest()}"'},
+    )
+
+
+@router.get("/proxy")
+async def proxy_download(request: Request, url: str = Query(..., description="目标资源 URL")):
+    """
+    代理下载视频等资源，边读取边转发
+
+    透传客户端的 Range / If-Range 请求头，上游返回 206 时原样返回
+    206 Partial Content 和 Content-Range，播放器拖动进度时只下载需要的部分。
+    完整读取的文件写入磁盘缓存，之后直接从缓存按 Range 返回
+    """
+    media = await lookup_media(url)
+    if media is not None and media.fresh:
+        return cached_response(media, request.headers)
+    # 设置更符合抖音要求的请求头（Host 由 httpx 根据目标 URL 生成）
+    headers = {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        # 按原始字节转发，请求未压缩的内容，Range 和 Content-Length 才与客户端收到的字节一致
+        "Accept-Encoding": "identity",
+        "Accept-Language": "zh-TW,zh;q=0.9,ja;q=0.8,ko;q=0.7,zh-CN;q=0.6,en-GB;q=0.5,en;q=0.4,en-US;q=0.3",
+        "Upgrade-Insecure-Requests": "1",
+        "Referer": "https://www.duoleta.com/",
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36 Edg/136.0.0.0"
+    }
+    # 播放器的首个请求通常是 bytes=0-，按完整文件请求以便写入缓存；
+    # 其他 Range 透传给上游（不写入缓存），有需要重新验证的缓存时同时带上条件请求头:
+    # 上游返回 304 时从缓存按 Range 返回，内容已变化时原样返回上游的 206
+    range_header = request.headers.get("range")
+    whole_file_range = range_header is not None and range_header.replace(" ", "") == "bytes=0-"
+    if range_header and not whole_file_range:
+        for name in PROXY_REQUEST_HEADERS:
+            value = request.headers.get(name)
+            if value:
+                headers[name] = value
 
+    logger.info(f"请求URL: {url}, Range: {headers.get('range')}")
+
+    try:
+        upstream = await open_media(url, headers, media)
+        if await revalidated(url, upstream, media):
+            return cached_response(media, request.headers)
     except Exception as e:
         error_msg = f"Request failed: {str(e)}"
         logger.error(f"请求失败: {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
+
+    # 记录响应详情
+    logger.info(f"响应状态码: {upstream.status_code}, Content-Range: {upstream.headers.get('content-range')}")
+
+    if upstream.status_code not in (200, 206, 416):
+        await upstream.aclose()
+        logger.error(f"请求失败: {url}, 状态码: {upstream.status_code}")
+        raise HTTPException(status_code=upstream.status_code, detail=f"Failed to fetch resource: {upstream.status_code}")
+
+    content_type = upstream.headers.get("Content-Type", "application/octet-stream")
+    response_headers = {
+        name: upstream.headers[name] for name in PROXY_RESPONSE_HEADERS if name in upstream.headers
+    }
+    status_code = upstream.status_code
+    length = upstream.headers.get("content-length")
+    if whole_file_range and status_code == 200 and length and int(length) > 0 and "content-encoding" not in upstream.headers:
+        # 按完整文件请求的 bytes=0-，仍按客户端的 Range 返回 206
+        status_code = 206
+        response_headers["content-range"] = f"bytes 0-{int(length) - 1}/{length}"
+        response_headers["accept-ranges"] = "bytes"
+
+    return StreamingResponse(
+        content=media_body(url, upstream),
+        status_code=status_code,
+        media_type=content_type,
+        headers=response_headers,
+        background=BackgroundTask(upstream.aclose),
+    )
+
+
+@router.get("/cache/stats")
+async def media_cache_stats():
+    """代理媒体缓存统计（磁盘缓存、图片请求合并）"""
+    media = None
+    if media_cache is not None:
+        # 统计总字节数需要查询索引，在线程池中执行
+        media = await asyncio.get_running_loop().run_in_executor(None, media_cache.stats)
+    stats = {
+        "media": media,
+        "image_fetches": image_fetches.stats(),
+        "thumbnail_renders": len(thumbnail_renders),
+    }
+    return Response.success(stats, "获取成功")
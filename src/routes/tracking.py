@@ -1,19 +1,55 @@
-from fastapi import APIRouter, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from src.models.tracking import TrackingEvent, SourcePlatform
 from src.services.tracking_service import TrackingService
 from src.utils.response import Response
+from src.utils.db import DatabasePool, POOL_DISABLED
+from src.utils.config import config
 from typing import Optional
+from datetime import datetime
 from src.utils.logger import get_tracking_logger
 
 logger = get_tracking_logger()
 
+_tracking_service: Optional[TrackingService] = None
+
+
+def require_database():
+    """连接池未就绪时直接返回 503，不在请求中等待数据库连接"""
+    db_pool = DatabasePool()
+    if db_pool.is_ready():
+        return
+    if db_pool.state == POOL_DISABLED:
+        raise HTTPException(status_code=503, detail=Response.error("数据库未配置"))
+    raise HTTPException(
+        status_code=503,
+        detail=Response.error("数据库未就绪，请稍后重试"),
+        headers={"Retry-After": str(int(config.DB_RETRY_INITIAL_DELAY) or 1)},
+    )
+
+
+def get_tracking_service() -> TrackingService:
+    """首次使用时创建埋点服务"""
+    global _tracking_service
+    if _tracking_service is None:
+        _tracking_service = TrackingService()
+    return _tracking_service
+
+
+async def close_tracking():
+    """写完缓冲中的埋点事件（在应用 shutdown 事件中、关闭连接池之前调用）"""
+    if _tracking_service is not None:
+        await _tracking_service.buffer.close()
+
+
 router = APIRouter(prefix="/tracking", tags=["tracking"])
-tracking_service = TrackingService()
 
-@router.post("/event")
+@router.post("/event", status_code=202, dependencies=[Depends(require_database)])
 async def track_event(event: TrackingEvent, request: Request):
     """
     记录埋点事件
+
+    事件放入写入缓冲后立即返回 202，攒批后用一条多行 INSERT 写入；
+    队列已满时返回 503（TRACKING_OVERFLOW=reject）
     
     请求示例:
     {
@@ -30,13 +66,17 @@ async def track_event(event: TrackingEvent, request: Request):
     event.user_agent = request.headers.get("user-agent")
     event.ip_address = request.client.host
     event.referrer = request.headers.get("referer")
+    event.created_at = datetime.now()
     
-    success = tracking_service.track_event(event)
-    if success:
-        return Response.success(None, "埋点记录成功")
-    return Response.error("埋点记录失败")
+    if await get_tracking_service().enqueue_event(event):
+        return Response.success(None, "埋点已接收")
+    raise HTTPException(
+        status_code=503,
+        detail=Response.error("埋点队列已满，请稍后重试"),
+        headers={"Retry-After": "1"},
+    )
 
-@router.get("/events")
+@router.get("/events", dependencies=[Depends(require_database)])
 async def get_events(
     event_type: Optional[str] = Query(None, description="事件类型"),
     source_platform: Optional[SourcePlatform] = Query(None, description="来源平台"),
@@ -47,10 +87,16 @@ async def get_events(
     获取埋点事件列表
     支持按事件类型、来源平台、用户ID筛选
     """
-    events = tracking_service.get_events(
+    events = await get_tracking_service().get_events(
         event_type=event_type,
         source_platform=source_platform.value if source_platform else None,
         user_id=user_id,
         limit=limit
     )
-    return Response.success(events, "获取成功") 
\ No newline at end of file
+    return Response.success(events, "获取成功")
+
+
+@router.get("/stats")
+async def tracking_stats():
+    """埋点写入缓冲统计（队列长度、批大小、写入耗时），数据库未就绪时也可以查看"""
+    return Response.success(get_tracking_service().buffer.stats(), "获取成功")
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type
+from src.app.base import BaseExtractor
+from src.app.registry import registry
+from src.utils import config, find_url, get_analyze_logger
+from src.utils.cache import ResultCache
+from src.utils.disk_cache import DiskCache
+from src.utils.resolver import short_link_stats
+from src.utils.response import Response
+
+logger = get_analyze_logger()
+
+# find_url 在输入以链接开头时返回整段输入，其中含有分隔符时不是单个链接
+_URL_DELIMITER_RE = re.compile(r"[\s,，]")
+
+
+class AnalyzeService:
+    def __init__(self):
+        self.cache = ResultCache(
+            max_bytes=config.RESULT_CACHE_MAX_BYTES,
+            ttl=config.RESULT_CACHE_TTL,
+            store=DiskCache(
+                config.RESULT_CACHE_DISK_PATH,
+                max_bytes=config.RESULT_CACHE_DISK_MAX_BYTES,
+                stale_ttl=config.RESULT_CACHE_STALE_TTL,
+            ) if config.RESULT_CACHE_DISK else None,
+        )
+        # 缓存键 -> (结果, 序列化后的响应体, ETag)，结果对象不变时直接复用
+        self._encoded: "OrderedDict[tuple, Tuple[dict, bytes, str]]" = OrderedDict()
+        # 批量解析的并发控制，在事件循环中首次使用时创建
+        self._batch_semaphore: Optional[asyncio.Semaphore] = None
+        self._platform_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @staticmethod
+    def detect_extractor(text: str) -> Optional[Tuple[Type[BaseExtractor], str]]:
+        """
+        按域名从文本中找出第一个受支持的链接，返回 (提取器, 链接)，不支持时返回 None
+
+        先取出第一个链接按域名查表（查找次数只与域名层级有关）；
+        文本中没有单个链接或第一个链接不受支持时，再用所有平台域名的正则在整段文本中查找
+        """
+        url = find_url(text)
+        if url and not _URL_DELIMITER_RE.search(url):
+            extractor = registry.for_url(url)
+            if extractor is not None:
+                return extractor, url
+        return registry.match(text)
+
+    @staticmethod
+    def cache_key(extractor: Type[BaseExtractor], url: str, type: Optional[str]) -> tuple:
+        """
+        生成缓存键: 平台 + 内容 ID + 图片类型
+        无法从 URL 解析出内容 ID 时退化为使用 URL 本身
+        """
+        content_id = extractor.parse_content_id(url)
+        return (extractor.app_type, content_id or url, type)
+
+    async def analyze(
+        self,
+        extractor: Type[BaseExtractor],
+        text: str,
+        type: Optional[str],
+        cache: Optional[str] = "default",
+        url: Optional[str] = None,
+    ) -> dict:
+        """
+        解析分享链接，返回 to_dict() 的结果
+        :param extractor: 平台提取器类
+        :param text: 分享链接或包含链接的文本
+        :param type: 图片类型
+        :param cache: 缓存策略，"bypass" 表示跳过缓存强制重新获取
+        :param url: 已从文本中找出的链接，为 None 时取文本中的第一个链接
+        :return: 解析结果
+        """
+        result, _ = await self.analyze_keyed(extractor, text, type, cache, url=url)
+        return result
+
+    async def analyze_keyed(
+        self,
+        extractor: Type[BaseExtractor],
+        text: str,
+        type: Optional[str],
+        cache: Optional[str] = "default",
+        url: Optional[str] = None,
+    ) -> Tuple[dict, tuple]:
+        """与 analyze 相同，同时返回缓存键，用于生成 ETag 和缓存有效期"""
+        url = url or find_url(text)
+        if not url:
+            raise ValueError(f"无法从文本 '{text}' 中提取 URL")
+        # 先把短链接解析为规范链接，再从中解析内容 ID 作为缓存键
+        url = await extractor.resolve(url)
+        key = self.cache_key(extractor, url, type)
+
+        async def _load():
+            instance = await extractor.create(text, type, url=url)
+            return instance.to_dict()
+
+        result = await self.cache.get_or_load(
+            key,
+            _load,
+            bypass=(cache == "bypass"),
+            cacheable=lambda result: result.get("code") == Response.SUCCESS_CODE,
+        )
+        return result, key
+
+    def encode(self, key: tuple, result: dict) -> Tuple[bytes, str]:
+        """
+        将结果序列化为 JSON 响应体，并由响应体生成强 ETag
+
+        按键排序序列化，同一结果在各工作进程中得到相同的 ETag；
+        内存缓存命中时返回的是同一个结果对象，直接复用上次的序列化结果
+        """
+        entry = self._encoded.get(key)
+        if entry is not None and entry[0] is result:
+            self._encoded.move_to_end(key)
+            return entry[1], entry[2]
+        body = json.dumps(result, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._encoded[key] = (result, body, etag)
+        self._encoded.move_to_end(key)
+        while len(self._encoded) > config.RESULT_ENCODED_MAX_ENTRIES:
+            self._encoded.popitem(last=False)
+        return body, etag
+
+    def max_age(self, key: tuple, result: dict) -> int:
+        """结果可被 HTTP 缓存的时间（秒）: 成功结果为内存缓存中剩余的有效时间，其余为 0"""
+        if result.get("code") != Response.SUCCESS_CODE:
+            return 0
+        return int(self.cache.ttl_remaining(key))
+
+    def _get_semaphores(self, app_type: str):
+        """获取全局和平台级的并发信号量"""
+        if self._batch_semaphore is None:
+            self._batch_semaphore = asyncio.Semaphore(config.BATCH_CONCURRENCY)
+        if app_type not in self._platform_semaphores:
+            self._platform_semaphores[app_type] = asyncio.Semaphore(config.BATCH_PLATFORM_CONCURRENCY)
+        return self._batch_semaphore, self._platform_semaphores[app_type]
+
+    async def _analyze_one(self, index: int, url: str, type: Optional[str], cache: Optional[str]) -> dict:
+        """在并发限制下解析单个链接，异常转换为错误结果"""
+        matched = self.detect_extractor(url)
+        if matched is None:
+            return {"index": index, "url": url, **Response.error("不支持的URL")}
+        extractor = matched[0]
+        batch_semaphore, platform_semaphore = self._get_semaphores(extractor.app_type)
+        try:
+            async with platform_semaphore:
+                async with batch_semaphore:
+                    result = await self.analyze(extractor, url, type, cache)
+            return {"index": index, "url": url, **result}
+        except Exception as e:
+            logger.error(f"批量解析出错: {url}, {e}", exc_info=True)
+            return {"index": index, "url": url, **Response.error(str(e))}
+
+    async def analyze_batch(
+        self,
+        urls: List[str],
+        type: Optional[str],
+        cache: Optional[str] = "default",
+    ) -> AsyncIterator[dict]:
+        """
+        并发解析多个链接，按完成顺序逐个产出结果
+        :param urls: 已去重的链接列表
+        :param type: 图片类型
+        :param cache: 缓存策略
+        :return: 异步迭代器，每项包含 index（输入中的位置）、url 和解析结果
+        """
+        tasks = [
+            asyncio.ensure_future(self._analyze_one(index, url, type, cache))
+            for index, url in enumerate(urls)
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # 客户端断开时取消尚未完成的解析
+            for task in tasks:
+                task.cancel()
+
+    async def cache_stats(self) -> dict:
+        """获取缓存统计信息"""
+        return {
+            "result": await self.cache.stats(),
+            "short_link": await short_link_stats(),
+        }
@@ -1,15 +1,40 @@
 import json
 import ipaddress
+from datetime import datetime
 from src.utils.db import DatabaseConnection
+from src.utils.write_buffer import WriteBuffer
 from src.models.tracking import TrackingEvent
-from src.utils import get_test_logger
+from src.utils import get_test_logger, config
 from typing import List, Optional
 
 logger = get_test_logger()
 
+INSERT_EVENT_QUERY = """
+    INSERT INTO event_tracking 
+    (user_id, source_platform, event_type, ip_address, 
+    user_agent, referrer, event_params, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# ip_address 列不允许为空，无法解析的地址（如代理后的主机名）按 0.0.0.0 写入
+UNKNOWN_IP = ipaddress.ip_address("0.0.0.0").packed
+
 class TrackingService:
     def __init__(self):
+        # 每次调用使用独立的连接和游标，可以在并发请求间共享
         self.db = DatabaseConnection()
+        # 埋点写入缓冲: 接口先返回，事件攒批后一次写入
+        self.buffer = WriteBuffer(
+            self.insert_events,
+            batch_size=config.TRACKING_BATCH_SIZE,
+            flush_interval=config.TRACKING_FLUSH_INTERVAL_MS / 1000,
+            max_size=config.TRACKING_QUEUE_SIZE,
+            overflow=config.TRACKING_OVERFLOW,
+            write_one=self.insert_event,
+            retries=config.TRACKING_FLUSH_RETRIES,
+            retry_delay=config.TRACKING_RETRY_DELAY_MS / 1000,
+            retry_max_delay=config.TRACKING_RETRY_MAX_DELAY_MS / 1000,
+        )
     
     def _convert_ip_to_binary(self, ip: str) -> bytes:
         """
@@ -25,39 +50,49 @@ class TrackingService:
             logger.error(f"Invalid IP address: {ip}, error: {e}")
             return None
             
-    def track_event(self, event: TrackingEvent) -> bool:
+    def _event_row(self, event: TrackingEvent) -> tuple:
+        """
+        埋点事件对应的一行插入参数
+        事件时间取接收时间，不使用写入数据库的时间
+        """
+        return (
+            event.user_id,
+            event.source_platform.value,
+            event.event_type,
+            self._convert_ip_to_binary(event.ip_address) or UNKNOWN_IP,
+            event.user_agent,
+            event.referrer,
+            json.dumps(event.event_params),
+            event.created_at or datetime.now(),
+        )
+
+    async def enqueue_event(self, event: TrackingEvent) -> bool:
         """
-        记录埋点事件
+        放入写入缓冲，稍后批量写入
         :param event: 埋点事件对象
-        :return: 是否成功
+        :return: 是否接收（队列已满时返回 False）
         """
-        try:
-            query = """
-                INSERT INTO event_tracking 
-                (user_id, source_platform, event_type, ip_address, 
-                user_agent, referrer, event_params)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            params = (
-                event.user_id,
-                event.source_platform.value,
-                event.event_type,
-                event.ip_address,
-                event.user_agent,
-                event.referrer,
-                json.dumps(event.event_params)
-            )
-            
-            
-            result = self.db.execute_query(query, params)
-            return result > 0
-            
-        except Exception as e:
-            logger.error(f"Failed to track event: {e}")
-            return False
+        if event.created_at is None:
+            event.created_at = datetime.now()
+        return await self.buffer.put(event)
+
+    async def insert_event(self, event: TrackingEvent) -> int:
+        """
+        写入一条埋点事件，失败时抛出异常（批量写入失败后由写入缓冲逐条调用）
+        :param event: 埋点事件对象
+        :return: 写入的行数
+        """
+        return await self.db.execute_query_async(INSERT_EVENT_QUERY, self._event_row(event))
+
+    async def insert_events(self, events: List[TrackingEvent]) -> int:
+        """
+        批量写入埋点事件（由写入缓冲调用）
+        :param events: 埋点事件列表
+        :return: 写入的行数
+        """
+        return await self.db.execute_many_async(INSERT_EVENT_QUERY, [self._event_row(event) for event in events])
             
-    def get_events(self, 
+    async def get_events(self, 
                    event_type: Optional[str] = None,
                    source_platform: Optional[str] = None,
                    user_id: Optional[int] = None,
@@ -102,7 +137,7 @@ class TrackingService:
             query += " ORDER BY created_at DESC LIMIT %s"
             params.append(limit)
             
-            events = self.db.execute_query(query, tuple(params))
+            events = await self.db.execute_query_async(query, tuple(params))
             
             # 转换JSON字符串为字典
             for event in events:
@@ -1,4 +1,4 @@
-from .index import find_url
+from .index import find_url, find_urls
 from .logger import (
     get_app_logger,
     get_utils_logger,
@@ -12,6 +12,7 @@ from .config import config, get_environment, EnvType
 from .response import Response
 __all__ = [
     "find_url", 
+    "find_urls",
     "get_app_logger",
     "get_utils_logger",
     "get_tracking_logger",
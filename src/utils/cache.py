@@ -0,0 +1,198 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from .disk_cache import DiskCache
+from .logger import get_utils_logger
+
+__all__ = ["ResultCache"]
+
+logger = get_utils_logger()
+
+
+def _estimate_size(value: Any) -> int:
+    """估算缓存值占用的字节数（按 JSON 序列化后的长度计算）"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except Exception:
+        return len(str(value).encode("utf-8"))
+
+
+class ResultCache:
+    """
+    内存中的 LRU + TTL 缓存，按总字节数限制容量
+
+    get_or_load 对同一个 key 的并发加载做合并（single-flight）:
+    N 个并发请求只会触发一次 loader，其余请求等待同一个结果
+
+    传入 store（DiskCache）时作为第二级缓存: 内存未命中时先查磁盘，命中后写回内存；
+    磁盘中的值已过期但仍在 stale_ttl 内时直接返回旧值，并在后台刷新（stale-while-revalidate）
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, store: Optional[DiskCache] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.store = store
+        # key -> (过期时间, 字节数, 值)，按最近使用排序
+        self._data: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.refreshes = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存，不存在或已过期时返回 None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入缓存，超出容量时按 LRU 淘汰；ttl 为 None 时使用默认有效期"""
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def ttl_remaining(self, key: Hashable) -> float:
+        """返回缓存项剩余的有效时间（秒），不存在时返回 0"""
+        entry = self._data.get(key)
+        if entry is None:
+            return 0
+        return max(0.0, entry[0] - time.monotonic())
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        bypass: bool = False,
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        读取缓存，未命中时调用 loader 加载并写入缓存
+
+        参数:
+            key: 缓存键
+            loader: 加载函数，返回可等待对象
+            bypass: 为 True 时跳过缓存读取和请求合并，强制重新加载（结果仍会写入缓存）
+            cacheable: 判断结果是否可以缓存，例如只缓存成功的结果
+        """
+        if not bypass:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            task = self._inflight.get(key)
+            if task is not None:
+                self.coalesced += 1
+                return await asyncio.shield(task)
+            if self.store is not None:
+                stored = await self._run_store(self.store.get, key)
+                if stored is not None:
+                    value, expires_at = stored
+                    remaining = expires_at - time.time()
+                    if remaining > 0:
+                        self.hits += 1
+                        self.set(key, value, ttl=remaining)
+                        return value
+                    # 过期值: 直接返回，后台刷新
+                    self.stale_served += 1
+                    if key not in self._inflight:
+                        self.refreshes += 1
+                        self._start_load(key, loader, cacheable).add_done_callback(self._log_refresh_error)
+                    return value
+                # 查询磁盘期间其他请求可能已经开始加载
+                task = self._inflight.get(key)
+                if task is not None:
+                    self.coalesced += 1
+                    return await asyncio.shield(task)
+        self.misses += 1
+        task = self._start_load(key, loader, cacheable, register=not bypass)
+        # shield: 发起请求的客户端断开时，不取消其他请求正在等待的加载
+        return await asyncio.shield(task)
+
+    def _start_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool],
+        register: bool = True,
+    ) -> asyncio.Task:
+        """开始加载并写入内存和磁盘缓存，register 为 True 时登记为进行中的加载以合并并发请求"""
+
+        async def _load():
+            value = await loader()
+            if cacheable(value):
+                self.set(key, value)
+                if self.store is not None:
+                    await self._run_store(self.store.set, key, value, self.ttl)
+            return value
+
+        task = asyncio.ensure_future(_load())
+        if register:
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    @staticmethod
+    async def _run_store(fn: Callable[..., Any], *args) -> Any:
+        """在线程池中执行磁盘缓存操作，避免阻塞事件循环"""
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task):
+        """后台刷新失败时记录日志（旧值已经返回给调用方）"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"后台刷新缓存失败: {task.exception()}")
+
+    def close(self):
+        """关闭磁盘缓存连接"""
+        if self.store is not None:
+            self.store.close()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """加载结束后移除进行中的记录"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息（磁盘缓存的 COUNT / SUM 查询在线程池中执行）"""
+        disk = await self._run_store(self.store.stats) if self.store is not None else None
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "inflight": len(self._inflight),
+            "stale_served": self.stale_served,
+            "refreshes": self.refreshes,
+            "disk": disk,
+        }
@@ -32,14 +32,135 @@ class BaseConfig:
     LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
     LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'logs')
     LOG_BACKUP_COUNT = 30
-    # 关键词映射
-    APP_TYPE_KEYWORD = {
-        "xiaohongshu": ['小红书', 'xhs','xiaohongshu'],
-        "douyin": ['抖音', 'douyin', 'dy'],
-        "kuaishou": ['快手', 'kuaishou', 'ks'],
-        "weibo": ['微博', 'weibo', 'wb']
+
+    # HTTP 客户端配置（进程内共享的 httpx.AsyncClient）
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))  # 连接池最大连接数
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))  # 最多保持的空闲长连接
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # 空闲长连接的保活时间（秒）
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # 请求超时（秒）
+    HTTP2 = os.getenv("HTTP2", "1") == "1"  # 是否启用 HTTP/2（需要安装 h2）
+    # 启动时预热连接的平台域名
+    HTTP_PREWARM_HOSTS = [
+        "xhslink.com",
+        "www.xiaohongshu.com",
+        "v.douyin.com",
+        "www.iesdouyin.com",
+        "v.kuaishou.com",
+        "www.kuaishou.com",
+        "m.weibo.cn",
+    ]
+
+    # 文件流转发配置
+    STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(64 * 1024)))  # 文件流转发的分块大小（字节）
+
+    # 图片代理配置（图片链接按内容生成，可以长期缓存）
+    IMAGE_PROXY_CACHE_CONTROL = os.getenv("IMAGE_PROXY_CACHE_CONTROL", "public, max-age=31536000, immutable")
+    IMAGE_PROXY_MAX_BYTES = int(os.getenv("IMAGE_PROXY_MAX_BYTES", str(20 * 1024 * 1024)))  # 单张图片的最大字节数
+
+    # 解析进程池进程数，默认与 CPU 核数相同，为 0 时在当前进程解析
+    PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(os.cpu_count() or 1)))
+
+    # 解析结果缓存配置
+    RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "600"))  # 缓存有效期（秒）
+    RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 缓存容量（字节）
+    RESULT_ENCODED_MAX_ENTRIES = int(os.getenv("RESULT_ENCODED_MAX_ENTRIES", "4096"))  # 保留序列化结果和 ETag 的条目数
+    # 解析结果的磁盘缓存（SQLite，同一台机器的所有工作进程共享，重启和重新部署后仍然有效）
+    RESULT_CACHE_DISK = os.getenv("RESULT_CACHE_DISK", "1") == "1"  # 是否启用
+    RESULT_CACHE_DISK_PATH = os.getenv(
+        "RESULT_CACHE_DISK_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'storage', 'analyze_cache.sqlite3'),
+    )
+    RESULT_CACHE_DISK_MAX_BYTES = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))  # 磁盘缓存容量（字节）
+    RESULT_CACHE_STALE_TTL = int(os.getenv("RESULT_CACHE_STALE_TTL", "3600"))  # 过期后仍可先返回旧值再后台刷新的时间（秒）
+
+    # 代理媒体文件的磁盘缓存（按内容哈希存放，同一台机器的所有工作进程共享）
+    MEDIA_CACHE = os.getenv("MEDIA_CACHE", "1") == "1"  # 是否启用
+    MEDIA_CACHE_DIR = os.getenv(
+        "MEDIA_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'storage', 'media'),
+    )
+    MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))  # 缓存总容量（字节）
+    MEDIA_CACHE_MAX_FILE_BYTES = int(os.getenv("MEDIA_CACHE_MAX_FILE_BYTES", str(512 * 1024 * 1024)))  # 单个文件上限（字节）
+    MEDIA_CACHE_REVALIDATE_AFTER = int(os.getenv("MEDIA_CACHE_REVALIDATE_AFTER", "86400"))  # 超过该时间（秒）后向上游重新验证
+
+    # 缩略图配置（在解析进程池中生成，结果写入媒体磁盘缓存，需要安装 Pillow）
+    THUMBNAIL_DEFAULT_WIDTH = int(os.getenv("THUMBNAIL_DEFAULT_WIDTH", "480"))  # 默认宽度（像素）
+    THUMBNAIL_MAX_WIDTH = int(os.getenv("THUMBNAIL_MAX_WIDTH", "2048"))  # 最大宽度（像素）
+    THUMBNAIL_DEFAULT_QUALITY = int(os.getenv("THUMBNAIL_DEFAULT_QUALITY", "80"))  # 默认编码质量（1-95）
+    THUMBNAIL_DEFAULT_FORMAT = os.getenv("THUMBNAIL_DEFAULT_FORMAT", "webp")  # 默认输出格式（webp / jpeg）
+
+    # 短链接解析配置
+    SHORT_LINK_HOSTS = ["v.douyin.com", "v.kuaishou.com", "xhslink.com"]
+    SHORT_LINK_TTL = int(os.getenv("SHORT_LINK_TTL", str(7 * 24 * 3600)))  # 短链接映射缓存有效期（秒）
+    SHORT_LINK_CACHE_MAX_BYTES = int(os.getenv("SHORT_LINK_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))  # 缓存容量（字节）
+    SHORT_LINK_MAX_REDIRECTS = 5  # 最多跟随的重定向次数
+
+    # 快手对冲请求: 首选 UA 超过该时间（秒）未返回时启动备用 UA 的请求
+    KUAISHOU_HEDGE_DELAY = float(os.getenv("KUAISHOU_HEDGE_DELAY", "0.5"))
+
+    # 微博 $render_data 原生解析失败时是否使用 execjs（需要 JS 运行时）备用方案
+    WEIBO_EXECJS_FALLBACK = os.getenv("WEIBO_EXECJS_FALLBACK", "0") == "1"
+
+    # 微博 statuses/show 接口地址，{id} 为微博 ID（mid 或 bid）
+    WEIBO_STATUS_API = os.getenv("WEIBO_STATUS_API", "https://m.weibo.cn/statuses/show?id={id}")
+
+    # 各平台的字段路径规格，启动时编译为一次遍历的计划（见 src/utils/extraction.py）
+    # 每个字段按顺序取第一个有值的备选，列表形式的备选表示多个路径的结果依次合并
+    EXTRACTION_SPECS = {
+        # 抖音: 相对 loaderData 中的 note_(id)/page 或 video_(id)/page
+        "douyin": {
+            "title": ["videoInfoRes.item_list[0].author.nickname"],
+            "description": ["videoInfoRes.item_list[0].desc"],
+            "image_list": [
+                [
+                    "videoInfoRes.item_list[0].images[].url_list[0]",
+                    "videoInfoRes.item_list[0].video.cover.url_list[0]",
+                ],
+                "videoInfoRes.item_list[0].video.origin_cover.url_list[0]",
+                "videoInfoRes.item_list[0].video.dynamic_cover.url_list[0]",
+            ],
+            "video": ["videoInfoRes.item_list[0].video.play_addr.url_list[0]"],
+        },
+        # 小红书: 相对 note.noteDetailMap[firstNoteId].note
+        "xiaohongshu": {
+            "image_list": ["imageList[].urlDefault"],
+            "live_list": ["imageList[].stream.h264[0].masterUrl"],
+            "video": ["video.media.stream.h264[0].masterUrl"],
+        },
     }
 
+    # 启动耗时预算: `python -X importtime -c "import main"` 的总导入耗时上限（毫秒），见 bench_import_time.py
+    IMPORT_TIME_BUDGET_MS = int(os.getenv("IMPORT_TIME_BUDGET_MS", "1000"))
+
+    # 数据库连接池配置（连接池在启动后于后台创建，失败时按指数退避重试）
+    DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "6"))  # 连接池最大连接数，也是数据库线程池的线程数
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))  # 建立连接超时（秒）
+    DB_READ_TIMEOUT = int(os.getenv("DB_READ_TIMEOUT", "10"))  # 读超时（秒）
+    DB_WRITE_TIMEOUT = int(os.getenv("DB_WRITE_TIMEOUT", "10"))  # 写超时（秒）
+    DB_RETRY_INITIAL_DELAY = float(os.getenv("DB_RETRY_INITIAL_DELAY", "1"))  # 首次重试等待（秒）
+    DB_RETRY_MAX_DELAY = float(os.getenv("DB_RETRY_MAX_DELAY", "60"))  # 最长重试等待（秒）
+
+    # 埋点事件写入缓冲（先返回 202，攒批后用一条多行 INSERT 写入）
+    TRACKING_BATCH_SIZE = int(os.getenv("TRACKING_BATCH_SIZE", "500"))  # 攒够多少条写入一次
+    TRACKING_FLUSH_INTERVAL_MS = int(os.getenv("TRACKING_FLUSH_INTERVAL_MS", "200"))  # 最早一条事件最多等待多久写入（毫秒）
+    TRACKING_QUEUE_SIZE = int(os.getenv("TRACKING_QUEUE_SIZE", "20000"))  # 等待写入的事件上限
+    # 队列满时的处理: reject（返回 503，由客户端重试）/ drop_oldest（丢弃最早的事件）/ block（等待队列有空位）
+    TRACKING_OVERFLOW = os.getenv("TRACKING_OVERFLOW", "reject")
+    TRACKING_FLUSH_RETRIES = int(os.getenv("TRACKING_FLUSH_RETRIES", "3"))  # 批量写入失败后的重试次数，仍失败时逐条写入
+    TRACKING_RETRY_DELAY_MS = int(os.getenv("TRACKING_RETRY_DELAY_MS", "200"))  # 首次重试等待（毫秒），之后每次翻倍
+    TRACKING_RETRY_MAX_DELAY_MS = int(os.getenv("TRACKING_RETRY_MAX_DELAY_MS", "5000"))  # 最长重试等待（毫秒）
+
+    # 服务进程配置（start_server.py）
+    WORKERS = int(os.getenv("WORKERS", "1"))  # 工作进程数，大于 1 时主进程预加载应用后 fork 出工作进程
+    SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))  # 监听队列长度
+    SERVER_KEEP_ALIVE_TIMEOUT = int(os.getenv("SERVER_KEEP_ALIVE_TIMEOUT", "5"))  # 空闲长连接保持时间（秒）
+    SERVER_LIMIT_CONCURRENCY = int(os.getenv("SERVER_LIMIT_CONCURRENCY", "0"))  # 每个工作进程的最大并发连接数，超出返回 503，0 表示不限制
+
+    # 批量解析配置
+    BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "1000"))  # 单次批量请求最多处理的链接数
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))  # 全局并发上限
+    BATCH_PLATFORM_CONCURRENCY = int(os.getenv("BATCH_PLATFORM_CONCURRENCY", "4"))  # 单个平台的并发上限
+
 # 开发环境配置
 class DevelopmentConfig(BaseConfig):
     """开发环境配置"""
@@ -60,6 +181,9 @@ class ProductionConfig(BaseConfig):
     PORT = int(os.getenv("PORT", "8000"))  # 可通过环境变量设置端口
     RELOAD = False
     DEBUG = False
+    WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))  # 默认每个 CPU 核心一个工作进程
+    # 每个工作进程都有自己的解析进程池，默认平分 CPU 核心，避免进程数为核心数的平方
+    PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(max(1, (os.cpu_count() or 1) // WORKERS))))
     
     # 日志配置
     LOG_LEVEL = "INFO"
@@ -1,12 +1,37 @@
+import asyncio
+import functools
+import time
 import pymysql
 from dbutils.pooled_db import PooledDB
 import configparser
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from src.utils import get_db_logger
-from typing import Optional, Any, List, Dict
+from src.utils.config import config as app_config
+from typing import Optional, Any, Callable, Iterator, List, Dict, Tuple
 
 logger = get_db_logger()
 
+# 连接池状态
+POOL_DISABLED = "disabled"  # 没有数据库配置
+POOL_PENDING = "pending"    # 尚未开始连接
+POOL_WARMING = "warming"    # 正在连接，或连接失败后等待重试
+POOL_READY = "ready"        # 连接池可用
+POOL_CLOSED = "closed"      # 应用关闭后
+
+# 后台创建连接池的任务，由应用的 startup/shutdown 事件管理
+_warmup_task: Optional[asyncio.Task] = None
+
+# 执行阻塞数据库调用的线程池，线程数与连接池最大连接数相同，
+# 排队的调用在线程池中等待，不会占满默认线程池，也不会在连接池中阻塞等待连接
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class DatabaseNotReadyError(RuntimeError):
+    """连接池尚未就绪（未配置、正在连接或等待重试）"""
+
+
 class DatabasePool:
     _instance = None
     _config_valid = False
@@ -18,22 +43,27 @@ class DatabasePool:
         return cls._instance
     
     def __init__(self):
+        """只读取配置，不建立连接；连接池由 init_db_pool 在后台创建"""
         if self._initialized:
             return
             
         self._initialized = True
+        self.pool = None
+        self.state = POOL_PENDING
+        self.attempts = 0
+        self.last_error = None
+        self.ready_at = None
         try:
             self.config = self._load_config()
-            # 只有在成功加载配置文件时才尝试创建连接池
             if self.config is not None:
-                self.pool = self._create_pool()
                 DatabasePool._config_valid = True
             else:
                 logger.warning("No database configuration file found. Database features will be disabled.")
-                DatabasePool._config_valid = False
+                self.state = POOL_DISABLED
         except Exception as e:
-            logger.error(f"Error initializing database pool: {e}")
-            DatabasePool._config_valid = False
+            logger.error(f"Error loading database configuration: {e}")
+            self.config = None
+            self.state = POOL_DISABLED
             
     def _load_config(self) -> Optional[dict]:
         """加载数据库配置，如果配置文件不存在则返回None"""
@@ -51,7 +81,7 @@ class DatabasePool:
             return None
         
     def _create_pool(self) -> Optional[PooledDB]:
-        """创建数据库连接池"""
+        """创建数据库连接池（会同步建立 mincached 个连接，连接超时由 DB_CONNECT_TIMEOUT 限制）"""
         # 如果配置为None，则不创建连接池
         if self.config is None:
             return None
@@ -59,7 +89,7 @@ class DatabasePool:
         try:
             pool = PooledDB(
                 creator=pymysql,        # 使用链接数据库的模块
-                maxconnections=6,       # 连接池允许的最大连接数
+                maxconnections=app_config.DB_MAX_CONNECTIONS,  # 连接池允许的最大连接数
                 mincached=2,            # 初始化时，链接池中至少创建的空闲的链接，0表示不创建
                 maxcached=5,            # 链接池中最多闲置的链接，0和None不限制
                 maxshared=3,            # 链接池中最多共享的链接数量，0和None表示全部共享
@@ -73,47 +103,158 @@ class DatabasePool:
                 password=self.config['password'],
                 database=self.config['database'],
                 charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
+                cursorclass=pymysql.cursors.DictCursor,
+                connect_timeout=app_config.DB_CONNECT_TIMEOUT,
+                read_timeout=app_config.DB_READ_TIMEOUT,
+                write_timeout=app_config.DB_WRITE_TIMEOUT,
             )
             logger.info("Database connection pool created successfully")
             return pool
         except Exception as e:
             logger.error(f"Error creating database pool: {e}")
-            DatabasePool._config_valid = False
+            self.last_error = str(e)
             return None
+
+    def connect(self) -> bool:
+        """创建连接池（阻塞，需在线程池中调用），成功返回 True"""
+        if self.state == POOL_READY:
+            return True
+        self.attempts += 1
+        pool = self._create_pool()
+        if pool is None:
+            return False
+        if self.state == POOL_CLOSED:
+            # 连接期间应用已关闭
+            pool.close()
+            return False
+        self.pool = pool
+        self.state = POOL_READY
+        self.last_error = None
+        self.ready_at = time.time()
+        return True
+
+    def close(self):
+        """关闭连接池"""
+        self.state = POOL_CLOSED if self.config is not None else POOL_DISABLED
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+            logger.info("Database connection pool closed")
             
     def get_connection(self):
-        """获取数据库连接"""
-        if not DatabasePool._config_valid:
-            raise RuntimeError("Database is not configured properly")
+        """获取数据库连接，连接池未就绪时抛出 DatabaseNotReadyError"""
+        if not self.is_ready():
+            raise DatabaseNotReadyError(f"Database pool is not ready: {self.state}")
         return self.pool.connection()
 
+    def is_ready(self) -> bool:
+        """连接池是否可用"""
+        return self.state == POOL_READY
+
+    def status(self) -> Dict[str, Any]:
+        """连接池状态，用于 /ready"""
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "ready_at": self.ready_at,
+        }
+
     @classmethod
     def is_configured(cls) -> bool:
-        """检查数据库是否已正确配置"""
+        """检查是否找到了数据库配置"""
         return cls._config_valid
 
+
+async def _warm_up(db_pool: DatabasePool):
+    """后台创建连接池，失败时按指数退避重试，直到成功或应用关闭"""
+    loop = asyncio.get_running_loop()
+    delay = app_config.DB_RETRY_INITIAL_DELAY
+    while True:
+        if await loop.run_in_executor(None, db_pool.connect):
+            logger.info(f"Database pool ready after {db_pool.attempts} attempt(s)")
+            return
+        if db_pool.state == POOL_CLOSED:
+            return
+        logger.warning(
+            f"Database pool not ready (attempt {db_pool.attempts}), retrying in {delay:.0f}s: {db_pool.last_error}"
+        )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, app_config.DB_RETRY_MAX_DELAY)
+
+
+async def init_db_pool():
+    """
+    在后台创建数据库连接池（在应用 startup 事件中调用）
+
+    不等待连接完成，数据库慢或不可用时不影响应用启动；
+    连接池就绪前，数据库相关接口直接返回 503
+    """
+    global _warmup_task
+    db_pool = DatabasePool()
+    if db_pool.state not in (POOL_PENDING, POOL_CLOSED):
+        return
+    db_pool.state = POOL_WARMING
+    _warmup_task = asyncio.ensure_future(_warm_up(db_pool))
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """获取数据库线程池，首次使用时创建"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=app_config.DB_MAX_CONNECTIONS, thread_name_prefix="db")
+    return _executor
+
+
+async def run_in_db_thread(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """在数据库线程池中执行阻塞的数据库调用，不阻塞事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def close_db_pool():
+    """停止后台连接，等待进行中的数据库调用结束后关闭连接池（在应用 shutdown 事件中调用）"""
+    global _warmup_task, _executor
+    db_pool = DatabasePool()
+    if _executor is not None:
+        executor, _executor = _executor, None
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(executor.shutdown, wait=True))
+    db_pool.close()
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
+        _warmup_task = None
+
+
 class DatabaseConnection:
+    """
+    数据库访问对象，可以被多个并发请求共享
+
+    每次调用从连接池取出独立的连接和游标，用完关闭游标并归还连接，调用之间不共享状态；
+    同步方法会阻塞，在协程中使用 *_async 方法（在数据库线程池中执行）
+    """
+
     def __init__(self):
         self.pool = DatabasePool()
-        self.connection = None
-        self.cursor = None
-        
-    def __enter__(self):
-        """上下文管理器入口"""
-        if not DatabasePool.is_configured():
-            raise RuntimeError("Database is not configured properly")
-        self.connection = self.pool.get_connection()
-        self.cursor = self.connection.cursor()
-        return self
-        
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """上下文管理器出口"""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
-            
+
+    @contextmanager
+    def cursor(self) -> Iterator[Tuple[Any, Any]]:
+        """取出一个连接和游标，退出时关闭游标并把连接归还连接池"""
+        if not self.pool.is_ready():
+            raise DatabaseNotReadyError(f"Database pool is not ready: {self.pool.state}")
+        connection = self.pool.get_connection()
+        try:
+            cursor = connection.cursor()
+            try:
+                yield connection, cursor
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+
     def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """
         执行SQL查询
@@ -121,19 +262,42 @@ class DatabaseConnection:
         :param params: 查询参数
         :return: 查询结果
         """
-        if not DatabasePool.is_configured():
-            raise RuntimeError("Database is not configured properly")
-        try:
-            with self as db:
-                db.cursor.execute(query, params)
-                if query.strip().upper().startswith(('SELECT', 'SHOW')):
-                    return db.cursor.fetchall()
-                else:
-                    db.connection.commit()
-                    return db.cursor.rowcount
-        except Exception as e:
-            logger.error(f"Error executing query: {e}")
-            if not query.strip().upper().startswith(('SELECT', 'SHOW')):
-                if self.connection:
-                    self.connection.rollback()
-            raise 
\ No newline at end of file
+        is_read = query.strip().upper().startswith(('SELECT', 'SHOW'))
+        with self.cursor() as (connection, cursor):
+            try:
+                cursor.execute(query, params)
+                if is_read:
+                    return cursor.fetchall()
+                connection.commit()
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"Error executing query: {e}")
+                if not is_read:
+                    connection.rollback()
+                raise
+
+    def execute_many(self, query: str, params_list: List[tuple]) -> int:
+        """
+        批量执行写入语句并提交一次
+        INSERT ... VALUES (...) 会被 PyMySQL 改写为一条多行 INSERT
+        :param query: SQL语句
+        :param params_list: 每行的参数
+        :return: 影响的行数
+        """
+        with self.cursor() as (connection, cursor):
+            try:
+                cursor.executemany(query, params_list)
+                connection.commit()
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"Error executing batch: {e}")
+                connection.rollback()
+                raise
+
+    async def execute_query_async(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """在数据库线程池中执行 execute_query"""
+        return await run_in_db_thread(self.execute_query, query, params)
+
+    async def execute_many_async(self, query: str, params_list: List[tuple]) -> int:
+        """在数据库线程池中执行 execute_many"""
+        return await run_in_db_thread(self.execute_many, query, params_list)
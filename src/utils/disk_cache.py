@@ -0,0 +1,166 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+from .logger import get_utils_logger
+
+__all__ = ["DiskCache"]
+
+logger = get_utils_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+"""
+
+
+class DiskCache:
+    """
+    基于 SQLite（WAL 模式）的本地持久化缓存，同一台机器上的所有工作进程共享，重启后仍然有效
+
+    - 过期时间使用系统时间（time.time），各进程之间一致
+    - 过期后的 stale_ttl 秒内仍可读出（标记为过期），供调用方先返回旧值再后台刷新
+    - 总字节数超过 max_bytes 时按最近访问时间淘汰
+    - 连接在每个进程首次使用时打开（fork 之后），所有方法都是阻塞的，应在线程池中调用
+    """
+
+    # 命中时最多每隔多少秒更新一次访问时间，避免每次读取都写库
+    TOUCH_INTERVAL = 60
+    # 每写入多少次检查一次容量
+    EVICT_EVERY = 64
+
+    def __init__(self, path: str, max_bytes: int, stale_ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前进程的连接，fork 后重新打开"""
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _dump_key(key: Hashable) -> str:
+        return json.dumps(list(key) if isinstance(key, tuple) else key, ensure_ascii=False)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        读取缓存，返回 (值, 过期时间)；不存在或已超出 stale_ttl 时返回 None
+        过期时间早于当前时间表示这是一个过期值
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?",
+                    (self._dump_key(key),),
+                ).fetchone()
+                if row is None or row[1] + self.stale_ttl <= now:
+                    self.misses += 1
+                    return None
+                if now - row[2] > self.TOUCH_INTERVAL:
+                    conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, self._dump_key(key)))
+            value = json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self.errors += 1
+            logger.warning(f"读取磁盘缓存失败: {e}")
+            return None
+        if row[1] <= now:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return value, row[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """写入缓存，值需要可以 JSON 序列化"""
+        now = time.time()
+        try:
+            data = json.dumps(value, ensure_ascii=False)
+            size = len(data.encode("utf-8"))
+            if size > self.max_bytes:
+                return
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (self._dump_key(key), data, size, now + ttl, now),
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict(conn, now)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self.errors += 1
+            logger.warning(f"写入磁盘缓存失败: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """删除超出 stale_ttl 的缓存，总字节数超出容量时按最近访问时间淘汰到容量的 90%"""
+        conn.execute("DELETE FROM entries WHERE expires_at < ?", (now - self.stale_ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        removed = 0
+        keys = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            keys.append((key,))
+            removed += size
+            if removed >= target:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", keys)
+        self.evictions += len(keys)
+
+    def close(self):
+        """关闭当前进程的连接"""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        entries = total = 0
+        try:
+            with self._lock:
+                entries, total = self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()
+        except sqlite3.Error:
+            pass
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
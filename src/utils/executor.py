@@ -0,0 +1,56 @@
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Callable, Any
+from .config import config
+from .logger import get_utils_logger
+
+__all__ = ["init_process_pool", "shutdown_process_pool", "run_in_process"]
+
+logger = get_utils_logger()
+
+# 进程内共享的解析进程池，由应用的 startup/shutdown 事件管理
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def init_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    创建解析进程池（在应用 startup 事件中调用）
+
+    PROCESS_POOL_WORKERS 为 0 时不创建进程池，解析直接在当前进程执行
+    """
+    global _pool
+    if _pool is None and config.PROCESS_POOL_WORKERS > 0:
+        _pool = ProcessPoolExecutor(max_workers=config.PROCESS_POOL_WORKERS)
+        logger.info(f"解析进程池已创建 - 进程数: {config.PROCESS_POOL_WORKERS}")
+    return _pool
+
+
+def shutdown_process_pool():
+    """关闭解析进程池（在应用 shutdown 事件中调用）"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+        logger.info("解析进程池已关闭")
+
+
+async def run_in_process(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在进程池中执行 CPU 密集的函数，避免阻塞事件循环
+
+    fn 及其参数需要可以被 pickle（模块级函数 / 静态方法，参数为 bytes、str 等）
+    进程池未初始化时（如脚本中直接调用）在当前进程执行
+    """
+    if _pool is None:
+        return fn(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_pool, functools.partial(fn, *args, **kwargs))
+    except BrokenProcessPool:
+        # 工作进程异常退出（如内存不足被杀）后进程池不可再用，重建后让本次请求失败
+        logger.error("解析进程池已损坏，正在重建", exc_info=True)
+        shutdown_process_pool()
+        init_process_pool()
+        raise
@@ -0,0 +1,177 @@
+import itertools
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from .config import config
+from .logger import get_utils_logger
+
+__all__ = ["FieldPlan", "compile_spec", "compile_all", "get_plan"]
+
+logger = get_utils_logger()
+
+# 路径中的一步: 键名 `a` / `.a`、下标 `[0]`、遍历列表 `[]`
+_STEP_RE = re.compile(r"(?:^|\.)([^.\[\]]+)|\[(\d*)\]")
+
+_KEY = 0
+_INDEX = 1
+_EACH = 2
+
+# 已编译的各平台遍历计划，进程内缓存
+_plans: Dict[str, "FieldPlan"] = {}
+
+
+def parse_path(path: str) -> Tuple[Tuple[int, Any], ...]:
+    """
+    解析字段路径，例如 `videoInfoRes.item_list[0].video.play_addr.url_list[0]`、`imageList[].urlDefault`
+
+    路径不合法时抛出 ValueError
+    """
+    steps = []
+    pos = 0
+    while pos < len(path):
+        match = _STEP_RE.match(path, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"字段路径不合法: {path}，位置: {pos}")
+        if match.group(1) is not None:
+            steps.append((_KEY, match.group(1)))
+        elif match.group(2):
+            steps.append((_INDEX, int(match.group(2))))
+        else:
+            steps.append((_EACH, None))
+        pos = match.end()
+    if not steps:
+        raise ValueError("字段路径不能为空")
+    return tuple(steps)
+
+
+class _Node:
+    """遍历计划中的一个节点，路径前缀相同的字段共享节点"""
+
+    __slots__ = ("slots", "children", "_index")
+
+    def __init__(self):
+        # 到达该节点时取值写入的槽位
+        self.slots: List[int] = []
+        # (步骤类型, 参数, 子节点)
+        self.children: List[Tuple[int, Any, "_Node"]] = []
+        self._index: Dict[Tuple[int, Any], "_Node"] = {}
+
+    def child(self, step: Tuple[int, Any]) -> "_Node":
+        node = self._index.get(step)
+        if node is None:
+            node = self._index[step] = _Node()
+            self.children.append((step[0], step[1], node))
+        return node
+
+
+class FieldPlan:
+    """
+    由字段路径规格编译出的遍历计划，一次遍历取出所有字段
+
+    规格格式: {字段名: [备选1, 备选2, ...]}，按顺序取第一个有值的备选；
+    备选为一个路径，或多个路径组成的列表（结果依次合并）。
+    字段名以 `_list` 结尾时结果为列表，否则取第一个值，没有值时为 None
+
+    所有路径先合并为一棵前缀树（相同前缀只走一次），再生成一个嵌套 if / for 的
+    Python 函数，遍历时不再解释路径
+    """
+
+    def __init__(self, spec: Dict[str, List[Union[str, List[str]]]]):
+        self.root = _Node()
+        # 字段名 -> 各备选对应的槽位列表
+        self.fields: List[Tuple[str, List[List[int]]]] = []
+        self.slot_count = 0
+        for name, alternatives in spec.items():
+            if isinstance(alternatives, str):
+                alternatives = [alternatives]
+            slot_groups = []
+            for alternative in alternatives:
+                paths = [alternative] if isinstance(alternative, str) else alternative
+                slot_groups.append([self._add_path(path) for path in paths])
+            self.fields.append((name, slot_groups))
+        # 生成的遍历函数源码，便于调试
+        self.source = self._generate()
+        namespace: Dict[str, Any] = {}
+        exec(compile(self.source, "<extraction plan>", "exec"), namespace)
+        self._run: Callable[[Any], Dict[str, Any]] = namespace["run"]
+
+    def _add_path(self, path: str) -> int:
+        node = self.root
+        for step in parse_path(path):
+            node = node.child(step)
+        slot = self.slot_count
+        node.slots.append(slot)
+        self.slot_count += 1
+        return slot
+
+    def _generate(self) -> str:
+        lines = ["def run(data):"]
+        lines.extend(f"    s{slot} = []" for slot in range(self.slot_count))
+        counter = itertools.count()
+
+        def emit(node: _Node, var: str, depth: int):
+            pad = "    " * depth
+            # 能走到这里的值都不是 None
+            for slot in node.slots:
+                lines.append(f"{pad}if {var} != '': s{slot}.append({var})")
+            key_children = [(arg, child) for kind, arg, child in node.children if kind == _KEY]
+            list_children = [(kind, arg, child) for kind, arg, child in node.children if kind != _KEY]
+            if key_children:
+                lines.append(f"{pad}if isinstance({var}, dict):")
+                for arg, child in key_children:
+                    child_var = f"v{next(counter)}"
+                    lines.append(f"{pad}    {child_var} = {var}.get({arg!r})")
+                    lines.append(f"{pad}    if {child_var} is not None:")
+                    emit(child, child_var, depth + 2)
+            if list_children:
+                lines.append(f"{pad}if isinstance({var}, list):")
+                for kind, arg, child in list_children:
+                    child_var = f"v{next(counter)}"
+                    if kind == _INDEX:
+                        lines.append(f"{pad}    if len({var}) > {arg}:")
+                        lines.append(f"{pad}        {child_var} = {var}[{arg}]")
+                    else:
+                        lines.append(f"{pad}    for {child_var} in {var}:")
+                    lines.append(f"{pad}        if {child_var} is not None:")
+                    emit(child, child_var, depth + 3)
+
+        lines.append("    if data is not None:")
+        emit(self.root, "data", 2)
+        lines.append("    return {")
+        for name, slot_groups in self.fields:
+            candidates = " or ".join(
+                "(" + " + ".join(f"s{slot}" for slot in slots) + ")" for slots in slot_groups
+            )
+            if name.endswith("_list"):
+                lines.append(f"        {name!r}: {candidates} or [],")
+            else:
+                lines.append(f"        {name!r}: ({candidates} or [None])[0],")
+        lines.append("    }")
+        return "\n".join(lines) + "\n"
+
+    def run(self, data: Any) -> Dict[str, Any]:
+        """遍历数据并返回 {字段名: 值}"""
+        return self._run(data)
+
+
+def compile_spec(spec: Dict[str, List[Union[str, List[str]]]]) -> FieldPlan:
+    """将字段路径规格编译为遍历计划，规格不合法时抛出 ValueError"""
+    return FieldPlan(spec)
+
+
+def compile_all() -> Dict[str, FieldPlan]:
+    """编译配置中所有平台的字段规格（在应用 startup 事件中调用，规格有误时启动即失败）"""
+    for app_type in config.EXTRACTION_SPECS:
+        get_plan(app_type)
+    logger.info(f"字段提取规格已编译: {', '.join(_plans)}")
+    return _plans
+
+
+def get_plan(app_type: str) -> Optional[FieldPlan]:
+    """获取平台的遍历计划，首次使用时编译并缓存，没有配置规格时返回 None"""
+    plan = _plans.get(app_type)
+    if plan is None:
+        spec = config.EXTRACTION_SPECS.get(app_type)
+        if spec is None:
+            return None
+        plan = _plans[app_type] = compile_spec(spec)
+    return plan
@@ -0,0 +1,157 @@
+import asyncio
+from typing import AsyncIterator, Optional, Dict, Iterable
+import httpx
+from .config import config
+from .logger import get_utils_logger
+
+__all__ = [
+    "init_http_client",
+    "close_http_client",
+    "get_http_client",
+    "prewarm_connections",
+    "fetch",
+    "open_stream",
+    "iter_stream",
+]
+
+logger = get_utils_logger()
+
+# 进程内共享的异步 HTTP 客户端，由应用的 startup/shutdown 事件管理
+_client: Optional[httpx.AsyncClient] = None
+_prewarm_task: Optional[asyncio.Task] = None
+
+
+def _http2_available() -> bool:
+    """检查是否安装了 HTTP/2 支持（h2）"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _create_client() -> httpx.AsyncClient:
+    """
+    创建共享客户端
+
+    httpx 的连接池按上游 origin（协议 + 域名 + 端口）维护长连接，
+    因此每个平台域名都会复用自己的 keep-alive 连接
+    """
+    http2 = config.HTTP2 and _http2_available()
+    if config.HTTP2 and not http2:
+        logger.warning("未安装 h2，HTTP/2 已禁用")
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT),
+        follow_redirects=True,
+    )
+
+
+async def init_http_client(prewarm: bool = True) -> httpx.AsyncClient:
+    """
+    初始化共享客户端（在应用 startup 事件中调用）
+
+    参数:
+        prewarm: 是否在后台预热到各平台域名的连接
+    """
+    global _client, _prewarm_task
+    if _client is None:
+        _client = _create_client()
+        logger.info(
+            f"HTTP 客户端已创建 - 最大连接数: {config.HTTP_MAX_CONNECTIONS}, "
+            f"长连接数: {config.HTTP_MAX_KEEPALIVE_CONNECTIONS}"
+        )
+    if prewarm and config.HTTP_PREWARM_HOSTS:
+        # 放到后台执行，避免上游不可达时拖慢启动
+        _prewarm_task = asyncio.create_task(prewarm_connections(config.HTTP_PREWARM_HOSTS))
+    return _client
+
+
+async def close_http_client():
+    """关闭共享客户端（在应用 shutdown 事件中调用）"""
+    global _client, _prewarm_task
+    if _prewarm_task is not None and not _prewarm_task.done():
+        _prewarm_task.cancel()
+    _prewarm_task = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("HTTP 客户端已关闭")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享客户端，未初始化时（如脚本中直接调用）按需创建"""
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+async def prewarm_connections(hosts: Iterable[str]):
+    """向各平台域名发送 HEAD 请求，提前完成 TCP/TLS 握手并放入连接池"""
+    client = get_http_client()
+
+    async def _warm(host: str):
+        try:
+            await client.head(f"https://{host}/", follow_redirects=False, timeout=5.0)
+            logger.info(f"连接预热完成: {host}")
+        except Exception as e:
+            logger.warning(f"连接预热失败: {host}, {e}")
+
+    await asyncio.gather(*(_warm(host) for host in hosts))
+
+
+async def fetch(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    follow_redirects: bool = True,
+) -> httpx.Response:
+    """
+    通过共享客户端发起 GET 请求
+
+    参数:
+        url: 请求地址
+        headers: 请求头
+        timeout: 超时时间（秒），为 None 时使用客户端默认值
+        follow_redirects: 是否跟随重定向
+    """
+    client = get_http_client()
+    kwargs = {"headers": headers, "follow_redirects": follow_redirects}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return await client.get(url, **kwargs)
+
+
+async def open_stream(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    follow_redirects: bool = True,
+) -> httpx.Response:
+    """
+    通过共享客户端发起流式 GET 请求，只读取响应头，不读取响应体
+
+    调用方负责读取响应体（iter_stream）或调用 aclose() 归还连接
+    """
+    client = get_http_client()
+    request = client.build_request("GET", url, headers=headers)
+    return await client.send(request, stream=True, follow_redirects=follow_redirects)
+
+
+async def iter_stream(response: httpx.Response, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    逐块读取原始响应体（不解压，与上游的 Content-Length / Content-Encoding 一致）
+
+    读取完毕、出错或被取消（客户端断开）时关闭上游响应
+    """
+    try:
+        async for chunk in response.aiter_raw(chunk_size or config.STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await response.aclose()
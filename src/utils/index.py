@@ -1,8 +1,8 @@
 import re
-from typing import Optional
+from typing import List, Optional
 from .logger import get_utils_logger
 
-__all__ = ["find_url"]
+__all__ = ["find_url", "find_urls"]
 
 # 获取工具模块的日志器
 logger = get_utils_logger()
@@ -40,4 +40,29 @@ def find_url(string: str) -> Optional[str]:
         return None
     except Exception as e:
         logger.error(f"提取 URL 时出错: {str(e)}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+
+def find_urls(string: str) -> List[str]:
+    """
+    从文本中提取所有 URL（按出现顺序，去除重复）
+
+    参数:
+        string: 包含一个或多个 URL 的文本，例如批量粘贴的分享内容
+
+    返回:
+        URL 列表，未找到时返回空列表
+    """
+    try:
+        tmp = string.replace("，", " ").replace(",", " ")
+        urls = []
+        for match in re.finditer(r"(?P<url>https?://[^\s]+)", tmp):
+            # 移除 URL 末尾可能的标点符号
+            url = re.sub(r'[.,;:!?)]+$', '', match.group("url"))
+            if url not in urls:
+                urls.append(url)
+        logger.info(f"从文本中提取到 {len(urls)} 个URL")
+        return urls
+    except Exception as e:
+        logger.error(f"提取 URL 时出错: {str(e)}", exc_info=True)
+        return []
@@ -1,7 +1,8 @@
 import os
+import glob
 import logging
-import logging.handlers
 from datetime import datetime
+from typing import Optional
 
 # 导入配置模块
 from .config import config
@@ -22,10 +23,51 @@ def get_log_level(level_name: str) -> int:
     return level_map.get(level_name.upper(), logging.INFO)
 
 # 日志文件命名
-def get_log_filename(name):
-    """根据名称和日期生成日志文件名"""
-    today = datetime.now().strftime('%Y-%m-%d')
-    return os.path.join(config.LOG_DIR, f'{name}_{today}.log')
+def get_log_filename(name, date: Optional[str] = None):
+    """根据名称和日期生成日志文件名，date 为 None 时使用当天日期"""
+    if date is None:
+        date = datetime.now().strftime('%Y-%m-%d')
+    return os.path.join(config.LOG_DIR, f'{name}_{date}.log')
+
+
+class DailyFileHandler(logging.FileHandler):
+    """
+    按日期写入 `名称_日期.log` 的文件处理器，多进程写同一个文件也是安全的
+
+    TimedRotatingFileHandler 在午夜通过重命名文件滚动，多个工作进程各自重命名时
+    会互相覆盖、丢失日志；这里每条日志按自己的日期决定写入的文件，日期变化时
+    各进程独立切换到新文件，不重命名任何文件。文件以追加模式打开（O_APPEND），
+    每条日志写入后立即刷新，多个进程的日志按行交错而不会互相覆盖
+    """
+
+    def __init__(self, name: str, backup_count: int = 0, encoding: str = 'utf-8'):
+        self.log_name = name
+        self.backup_count = backup_count
+        self.current_date = datetime.now().strftime('%Y-%m-%d')
+        super().__init__(get_log_filename(name, self.current_date), mode='a', encoding=encoding, delay=True)
+
+    def emit(self, record):
+        # 由 Handler.handle 持有处理器锁时调用
+        date = datetime.fromtimestamp(record.created).strftime('%Y-%m-%d')
+        if date != self.current_date:
+            self.current_date = date
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(get_log_filename(self.log_name, date))
+            self.remove_expired()
+        super().emit(record)
+
+    def remove_expired(self):
+        """删除超过保留天数的日志文件（多个进程同时删除同一个文件时忽略错误）"""
+        if self.backup_count <= 0:
+            return
+        files = sorted(glob.glob(os.path.join(config.LOG_DIR, f'{glob.escape(self.log_name)}_????-??-??.log')))
+        for path in files[:-self.backup_count]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
 def setup_logger(name, log_level=None):
     """
@@ -49,12 +91,10 @@ def setup_logger(name, log_level=None):
     if logger.handlers:
         return logger
     
-    # 创建按日期滚动的文件处理器
-    file_handler = logging.handlers.TimedRotatingFileHandler(
-        get_log_filename(name),
-        when='midnight',
-        interval=1,
-        backupCount=config.LOG_BACKUP_COUNT  # 保留的日志文件数
+    # 创建按日期写入的文件处理器（多个工作进程共用）
+    file_handler = DailyFileHandler(
+        name,
+        backup_count=config.LOG_BACKUP_COUNT  # 保留的日志文件数
     )
     file_handler.setLevel(log_level)
     
@@ -111,12 +151,7 @@ def configure_root_logger():
         root_logger.removeHandler(handler)
     
     # 添加文件处理器
-    file_handler = logging.handlers.TimedRotatingFileHandler(
-        get_log_filename('system'),
-        when='midnight',
-        interval=1,
-        backupCount=config.LOG_BACKUP_COUNT
-    )
+    file_handler = DailyFileHandler('system', backup_count=config.LOG_BACKUP_COUNT)
     file_handler.setLevel(log_level)
     
     formatter = logging.Formatter(config.LOG_FORMAT, config.LOG_DATE_FORMAT)
@@ -0,0 +1,452 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from .config import config
+from .logger import get_utils_logger
+
+__all__ = ["MediaCache", "CachedMedia", "CachedFileResponse", "cached_response", "normalize_url", "parse_range"]
+
+logger = get_utils_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    url_key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    validated_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_digest ON media (digest);
+CREATE INDEX IF NOT EXISTS media_accessed_at ON media (accessed_at);
+"""
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """规范化 URL: 协议和域名小写、去掉默认端口和片段、查询参数排序"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个字节范围的 Range 请求头，返回闭区间 (start, end)
+
+    没有 Range、格式不支持（如多个范围）时返回 None，按完整文件返回；
+    范围无法满足时抛出 ValueError（应返回 416）
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, sep, last = header[6:].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if start is None:
+        # 后缀范围: 最后 N 个字节
+        if not end:
+            raise ValueError(header)
+        start, end = max(0, size - end), size - 1
+    elif end is None:
+        end = size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+class CachedMedia(NamedTuple):
+    """缓存命中的媒体文件"""
+    path: str
+    digest: str
+    size: int
+    content_type: Optional[str]
+    etag: Optional[str]  # 上游的 ETag，用于重新验证
+    last_modified: Optional[str]
+    fresh: bool  # 为 False 时需要向上游重新验证
+
+
+class CachedFileResponse(Response):
+    """
+    从缓存文件返回完整内容或一个字节范围
+
+    文件在创建响应时就打开，之后文件被其他进程淘汰删除也能读完
+    """
+
+    def __init__(
+        self,
+        media: CachedMedia,
+        byte_range: Optional[Tuple[int, int]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.file: BinaryIO = open(media.path, "rb")
+        self.start, self.end = byte_range or (0, media.size - 1)
+        self.status_code = 206 if byte_range is not None else 200
+        self.media_type = media.content_type or "application/octet-stream"
+        self.background = background
+        self.init_headers(headers)
+        self.headers["content-length"] = str(self.end - self.start + 1)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers.setdefault("etag", f'"{media.digest}"')
+        if media.last_modified:
+            self.headers.setdefault("last-modified", media.last_modified)
+        if byte_range is not None:
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{media.size}"
+
+    def _read(self, size: int) -> bytes:
+        return self.file.read(size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            self.file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(self._read, min(config.STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            self.file.close()
+        if self.background is not None:
+            await self.background()
+
+
+def cached_response(
+    media: CachedMedia,
+    request_headers: Optional[Mapping[str, str]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """
+    根据客户端的条件请求头返回缓存文件:
+    If-None-Match 与内容哈希一致时返回 304；Range 返回 206 或 416；If-Range 不一致时返回完整文件
+    """
+    request_headers = request_headers or {}
+    headers = dict(headers or {})
+    etag = f'"{media.digest}"'
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={**headers, "etag": etag})
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if if_range and if_range not in (etag, media.last_modified):
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, media.size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{media.size}"})
+    return CachedFileResponse(media, byte_range, headers)
+
+
+class _MediaWriter:
+    """把上游响应体写入临时文件，完成后按内容哈希原子地放入缓存"""
+
+    def __init__(self, cache: "MediaCache", url: str, headers: Mapping[str, str], variant: str = ""):
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        self.variant = variant
+        self.tmp_path = os.path.join(cache.tmp_dir, uuid.uuid4().hex)
+        self.file = open(self.tmp_path, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.failed = False
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.cache.max_file_bytes:
+            raise ValueError("文件超过缓存的单个文件大小上限")
+        self.hash.update(chunk)
+        self.file.write(chunk)
+
+    def commit(self):
+        """写入完成: 重命名到内容哈希对应的路径（已存在相同内容时直接复用），并更新索引"""
+        self.file.close()
+        expected = self.headers.get("content-length")
+        if expected is not None and int(expected) != self.size:
+            self.abort()
+            return
+        digest = self.hash.hexdigest()
+        path = self.cache.blob_path(digest)
+        if os.path.exists(path):
+            os.remove(self.tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 同一文件系统内的重命名是原子的，其他进程只会看到完整的文件
+            os.replace(self.tmp_path, path)
+        self.cache.add(self.url, digest, self.size, self.headers, self.variant)
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        self.failed = True
+        try:
+            self.file.close()
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class MediaCache:
+    """
+    代理媒体文件的磁盘缓存，同一台机器上的所有工作进程共享
+
+    - 按规范化的上游 URL 索引，文件按内容的 SHA-256 存放，不同 URL 的相同内容只存一份
+    - variant 区分同一 URL 的衍生文件（如不同尺寸的缩略图），与原文件共用容量和淘汰
+    - 文件先写入临时目录，完整后重命名到最终路径，不会读到写了一半的文件
+    - 总字节数超过 max_bytes 时按最近访问时间淘汰；总字节数在内存中累计，只在打开连接和 stats() 时从索引统计，
+      其他进程的写入和淘汰在下次 stats() 时同步
+    - 超过 revalidate_after 秒后用上游的 ETag / Last-Modified 重新验证
+    - 索引使用 SQLite（WAL 模式），连接在每个进程首次使用时打开；所有方法都是阻塞的，应在线程池中调用
+    """
+
+    # 命中时最多每隔多少秒更新一次访问时间
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, directory: str, max_bytes: int, max_file_bytes: int, revalidate_after: float):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, "blobs")
+        self.tmp_dir = os.path.join(directory, "tmp")
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.revalidate_after = revalidate_after
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        # 不同文件内容的总字节数（相同内容只计一次）
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前进程的连接，fork 后重新打开"""
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(self.blob_dir, exist_ok=True)
+            os.makedirs(self.tmp_dir, exist_ok=True)
+            conn = sqlite3.connect(
+                os.path.join(self.directory, "index.sqlite3"),
+                timeout=5,
+                check_same_thread=False,
+                isolation_level=None,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._bytes = self._total_bytes(conn)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def url_key(url: str, variant: str = "") -> str:
+        key = normalize_url(url)
+        if variant:
+            key = f"{key}#{variant}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def lookup(self, url: str, variant: str = "") -> Optional[CachedMedia]:
+        """查找 URL 对应的缓存文件，没有时返回 None"""
+        now = time.time()
+        key = self.url_key(url, variant)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT digest, size, content_type, etag, last_modified, validated_at, accessed_at "
+                "FROM media WHERE url_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            digest, size, content_type, etag, last_modified, validated_at, accessed_at = row
+            path = self.blob_path(digest)
+            if not os.path.exists(path):
+                # 文件已被其他进程淘汰
+                conn.execute("DELETE FROM media WHERE url_key = ?", (key,))
+                self._release(conn, digest, size)
+                self.misses += 1
+                return None
+            if now - accessed_at > self.TOUCH_INTERVAL:
+                conn.execute("UPDATE media SET accessed_at = ? WHERE url_key = ?", (now, key))
+        self.hits += 1
+        fresh = now - validated_at < self.revalidate_after
+        return CachedMedia(path, digest, size, content_type, etag, last_modified, fresh)
+
+    def mark_validated(self, url: str):
+        """上游返回 304 后更新验证时间"""
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "UPDATE media SET validated_at = ?, accessed_at = ? WHERE url_key = ?",
+                (now, now, self.url_key(url)),
+            )
+        self.revalidated += 1
+
+    def cacheable(self, status_code: int, headers: Mapping[str, str]) -> bool:
+        """判断上游响应是否可以缓存: 完整的 200 响应、未压缩、不超过单个文件上限、未禁止缓存"""
+        if status_code != 200:
+            return False
+        if headers.get("content-encoding", "identity") != "identity":
+            return False
+        cache_control = headers.get("cache-control", "").lower()
+        if "no-store" in cache_control or "private" in cache_control:
+            return False
+        length = headers.get("content-length")
+        return length is None or int(length) <= self.max_file_bytes
+
+    def writer(self, url: str, headers: Mapping[str, str], variant: str = "") -> "_MediaWriter":
+        """创建写入器（阻塞）"""
+        self._connect()
+        return _MediaWriter(self, url, headers, variant)
+
+    def add(self, url: str, digest: str, size: int, headers: Mapping[str, str], variant: str = ""):
+        """写入索引，并在超出容量时淘汰"""
+        now = time.time()
+        key = self.url_key(url, variant)
+        with self._lock:
+            conn = self._connect()
+            previous = conn.execute("SELECT digest, size FROM media WHERE url_key = ?", (key,)).fetchone()
+            added = conn.execute("SELECT 1 FROM media WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None
+            conn.execute(
+                "INSERT OR REPLACE INTO media "
+                "(url_key, url, digest, size, content_type, etag, last_modified, validated_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, url, digest, size,
+                    headers.get("content-type"), headers.get("etag"), headers.get("last-modified"),
+                    now, now,
+                ),
+            )
+            if added:
+                self._bytes += size
+            if previous is not None and previous[0] != digest:
+                # 同一 URL 的内容已更新，旧文件不再被引用时删除
+                self._release(conn, *previous)
+            self.stores += 1
+            self._evict(conn)
+
+    def _total_bytes(self, conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM media GROUP BY digest)"
+        ).fetchone()[0]
+
+    def _release(self, conn: sqlite3.Connection, digest: str, size: int):
+        """索引删除后，文件不再被任何 URL 引用时删除文件并扣减总字节数"""
+        if conn.execute("SELECT 1 FROM media WHERE digest = ? LIMIT 1", (digest,)).fetchone() is not None:
+            return
+        try:
+            os.remove(self.blob_path(digest))
+        except OSError:
+            pass
+        self._bytes = max(0, self._bytes - size)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """按最近访问时间删除索引，不再被引用的文件一并删除，直到总字节数回到容量以内"""
+        if self._bytes <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT url_key, digest, size FROM media ORDER BY accessed_at").fetchall()
+        for url_key, digest, size in rows:
+            if self._bytes <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM media WHERE url_key = ?", (url_key,))
+            self.evictions += 1
+            self._release(conn, digest, size)
+
+    def store_chunks(self, url: str, headers: Mapping[str, str], chunks: Iterable[bytes], variant: str = ""):
+        """把已经读取到内存中的完整响应体写入缓存（阻塞）"""
+        writer = self.writer(url, headers, variant)
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        except Exception:
+            writer.abort()
+            raise
+        writer.commit()
+
+    async def tee(self, url: str, headers: Mapping[str, str], chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        转发响应体的同时写入缓存
+
+        完整读取后才放入缓存；客户端断开、上游出错或超出大小上限时放弃写入，不影响转发
+        """
+        loop = asyncio.get_running_loop()
+        writer: Optional[_MediaWriter] = None
+        try:
+            writer = await loop.run_in_executor(None, self.writer, url, headers)
+        except OSError as e:
+            logger.warning(f"创建媒体缓存文件失败: {e}")
+        completed = False
+        try:
+            async for chunk in chunks:
+                if writer is not None and not writer.failed:
+                    try:
+                        await loop.run_in_executor(None, writer.write, chunk)
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"写入媒体缓存失败: {url}, {e}")
+                        await loop.run_in_executor(None, writer.abort)
+                yield chunk
+            completed = True
+        finally:
+            if writer is not None and not writer.failed:
+                if completed:
+                    try:
+                        await loop.run_in_executor(None, writer.commit)
+                    except (OSError, sqlite3.Error, ValueError) as e:
+                        logger.warning(f"保存媒体缓存失败: {url}, {e}")
+                        writer.abort()
+                else:
+                    writer.abort()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        entries = total = 0
+        try:
+            with self._lock:
+                conn = self._connect()
+                entries = conn.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+                # 同步其他进程的写入和淘汰
+                total = self._bytes = self._total_bytes(conn)
+        except sqlite3.Error:
+            pass
+        return {
+            "directory": self.directory,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,69 @@
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlsplit
+from .config import config
+from .cache import ResultCache
+from .http_client import get_http_client
+from .logger import get_utils_logger
+
+__all__ = ["is_short_link", "resolve_short_link", "short_link_stats"]
+
+logger = get_utils_logger()
+
+# 短链接 -> 规范链接的映射缓存，短链接指向的内容不会变化，因此有效期较长
+_cache = ResultCache(
+    max_bytes=config.SHORT_LINK_CACHE_MAX_BYTES,
+    ttl=config.SHORT_LINK_TTL,
+)
+
+
+def is_short_link(url: str) -> bool:
+    """判断是否为平台短链接"""
+    host = (urlsplit(url).hostname or "").lower()
+    return host in config.SHORT_LINK_HOSTS
+
+
+async def _follow_redirects(url: str, headers: Optional[Dict[str, str]]) -> str:
+    """
+    跟随重定向链直到离开短链接域名，只读取响应头，不下载响应体
+    """
+    client = get_http_client()
+    current = url
+    for _ in range(config.SHORT_LINK_MAX_REDIRECTS):
+        async with client.stream(
+            "GET", current, headers=headers, follow_redirects=False
+        ) as response:
+            location = response.headers.get("location")
+            if not response.is_redirect or not location:
+                return current
+        current = urljoin(current, location)
+        if not is_short_link(current):
+            return current
+    logger.warning(f"短链接重定向次数过多: {url}")
+    return current
+
+
+async def resolve_short_link(url: str, headers: Optional[Dict[str, str]] = None) -> str:
+    """
+    将平台短链接解析为规范链接，非短链接原样返回
+
+    解析结果会被缓存，同一个短链接只需要一次重定向请求；
+    解析失败时返回原链接，由后续请求自行跟随重定向
+    """
+    if not is_short_link(url):
+        return url
+    try:
+        canonical = await _cache.get_or_load(
+            url,
+            lambda: _follow_redirects(url, headers),
+            cacheable=lambda resolved: resolved != url,
+        )
+        logger.info(f"短链接解析: {url} -> {canonical}")
+        return canonical
+    except Exception as e:
+        logger.warning(f"短链接解析失败: {url}, {e}")
+        return url
+
+
+async def short_link_stats() -> dict:
+    """获取短链接缓存统计信息"""
+    return await _cache.stats()
@@ -0,0 +1,113 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from .config import config
+from .http_client import open_stream, iter_stream
+from .logger import get_utils_logger
+
+__all__ = ["SharedFetch", "FetchCoalescer"]
+
+logger = get_utils_logger()
+
+
+class SharedFetch:
+    """
+    一次上游请求，多个下游请求共享
+
+    读取到的分块按顺序保存在 chunks 中，每个订阅者从头开始读取，
+    追上后等待新的分块，后加入的请求同样能拿到完整的响应体
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.status_code: Optional[int] = None
+        self.headers: Optional[Dict[str, str]] = None
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.done = False
+        self.error: Optional[Exception] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        """唤醒所有等待中的订阅者"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_headers(self):
+        """等待上游响应头，请求失败时抛出异常"""
+        while self.headers is None and self.error is None:
+            await self._changed.wait()
+        if self.headers is None:
+            raise self.error
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        """从头读取响应体，上游读取失败时抛出异常"""
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.error is not None:
+                raise self.error
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class FetchCoalescer:
+    """
+    合并对同一个 URL 的并发请求: 进行中的请求直接共享，结束后不保留
+
+    适用于图片等较小的资源，响应体超过 max_bytes 时中止并报错；
+    on_complete 在完整读取后调用一次（例如写入磁盘缓存）
+    """
+
+    def __init__(self, max_bytes: int, on_complete: Optional[Callable[[SharedFetch], Awaitable[None]]] = None):
+        self.max_bytes = max_bytes
+        self.on_complete = on_complete
+        self._inflight: Dict[str, SharedFetch] = {}
+        self.fetches = 0
+        self.coalesced = 0
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> SharedFetch:
+        """获取 URL 对应的共享请求，没有进行中的请求时发起一个"""
+        fetch = self._inflight.get(url)
+        if fetch is not None:
+            self.coalesced += 1
+            return fetch
+        self.fetches += 1
+        fetch = self._inflight[url] = SharedFetch(url)
+        asyncio.ensure_future(self._run(fetch, headers))
+        return fetch
+
+    async def _run(self, fetch: SharedFetch, headers: Optional[Dict[str, str]]):
+        try:
+            upstream = await open_stream(fetch.url, headers=headers)
+            fetch.status_code = upstream.status_code
+            fetch.headers = dict(upstream.headers)
+            fetch.notify()
+            async for chunk in iter_stream(upstream, config.STREAM_CHUNK_SIZE):
+                fetch.size += len(chunk)
+                if fetch.size > self.max_bytes:
+                    raise ValueError(f"响应体超过 {self.max_bytes} 字节: {fetch.url}")
+                fetch.chunks.append(chunk)
+                fetch.notify()
+            fetch.done = True
+        except Exception as e:
+            logger.warning(f"共享请求失败: {fetch.url}, {e}")
+            fetch.error = e
+        finally:
+            self._inflight.pop(fetch.url, None)
+            fetch.notify()
+        if fetch.done and self.on_complete is not None:
+            try:
+                await self.on_complete(fetch)
+            except Exception as e:
+                logger.warning(f"共享请求完成回调失败: {fetch.url}, {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """返回合并统计信息"""
+        return {
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,386 @@
+import html as html_lib
+import json
+import re
+from typing import Any, Iterator, Optional, Union
+
+__all__ = [
+    "extract_state",
+    "loads_js_state",
+    "parse_js_literal",
+    "find_title",
+    "find_meta",
+    "iter_scripts",
+    "LazyState",
+]
+
+# JSON 字符串或 JS 的 undefined（字符串内的 undefined 原样保留）
+_UNDEFINED_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|\bundefined\b', re.S)
+_SCRIPT_END = b"</script"
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title\s*>", re.I | re.S)
+_META_RE = re.compile(rb"<meta\b[^>]*>", re.I)
+_SCRIPT_RE = re.compile(rb"<script\b[^>]*>(.*?)</script\s*>", re.I | re.S)
+_decoder = json.JSONDecoder()
+
+# 按路径懒解析时用到的字节级规则
+_WS_BYTES_RE = re.compile(rb"\s*")
+_STRING_BYTES_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# 跳过括号之外的内容（包括完整的字符串），停在下一个括号处
+_SKIP_RE = re.compile(rb'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*', re.S)
+_SCALAR_RE = re.compile(rb"[^,}\]]*")
+_OPEN_BRACKETS = b"{["
+_CLOSE_BRACKETS = b"}]"
+
+# JS 字面量解析用到的词法规则
+_WS_RE = re.compile(r"(?:\s+|//[^\n]*|/\*.*?\*/)*", re.S)
+_IDENT_RE = re.compile(r"[A-Za-z_$][\w$]*")
+_NUMBER_RE = re.compile(r"[+-]?(?:0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)")
+_STRING_CHUNK_RE = {'"': re.compile(r'[^"\\]*'), "'": re.compile(r"[^'\\]*")}
+_JS_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+_JS_KEYWORDS = {"true": True, "false": False, "null": None, "undefined": None}
+
+
+def _replace_undefined(match) -> str:
+    token = match.group(0)
+    return "null" if token == "undefined" else token
+
+
+class _JSLiteralParser:
+    """
+    JS 字面量解析器，支持 JSON 之外的写法: 单引号字符串、不带引号的键、
+    尾随逗号、注释、十六进制数字、undefined 以及 \\x / \\u 转义
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def error(self, message: str):
+        raise ValueError(f"{message}，位置: {self.pos}")
+
+    def skip(self):
+        self.pos = _WS_RE.match(self.text, self.pos).end()
+
+    def peek(self) -> str:
+        return self.text[self.pos:self.pos + 1]
+
+    def parse_value(self) -> Any:
+        self.skip()
+        ch = self.peek()
+        if ch == "{":
+            return self.parse_object()
+        if ch == "[":
+            return self.parse_array()
+        if ch in ('"', "'"):
+            return self.parse_string()
+        match = _NUMBER_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            return self.to_number(match.group(0))
+        match = _IDENT_RE.match(self.text, self.pos)
+        if match and match.group(0) in _JS_KEYWORDS:
+            self.pos = match.end()
+            return _JS_KEYWORDS[match.group(0)]
+        self.error("无法解析的 JS 字面量")
+
+    @staticmethod
+    def to_number(token: str):
+        sign = -1 if token.startswith("-") else 1
+        digits = token.lstrip("+-")
+        if digits[:2] in ("0x", "0X"):
+            return sign * int(digits, 16)
+        if any(ch in digits for ch in ".eE"):
+            return sign * float(digits)
+        return sign * int(digits)
+
+    def parse_key(self) -> str:
+        ch = self.peek()
+        if ch in ('"', "'"):
+            return self.parse_string()
+        match = _IDENT_RE.match(self.text, self.pos) or _NUMBER_RE.match(self.text, self.pos)
+        if not match:
+            self.error("无法解析的对象键")
+        self.pos = match.end()
+        return match.group(0)
+
+    def parse_object(self) -> dict:
+        self.pos += 1
+        result = {}
+        while True:
+            self.skip()
+            if self.peek() == "}":
+                self.pos += 1
+                return result
+            key = self.parse_key()
+            self.skip()
+            if self.peek() != ":":
+                self.error("对象键后缺少冒号")
+            self.pos += 1
+            result[key] = self.parse_value()
+            self.skip()
+            ch = self.peek()
+            self.pos += 1
+            if ch == "}":
+                return result
+            if ch != ",":
+                self.error("对象中缺少逗号")
+
+    def parse_array(self) -> list:
+        self.pos += 1
+        result = []
+        while True:
+            self.skip()
+            if self.peek() == "]":
+                self.pos += 1
+                return result
+            result.append(self.parse_value())
+            self.skip()
+            ch = self.peek()
+            self.pos += 1
+            if ch == "]":
+                return result
+            if ch != ",":
+                self.error("数组中缺少逗号")
+
+    def parse_string(self) -> str:
+        quote = self.text[self.pos]
+        chunk_re = _STRING_CHUNK_RE[quote]
+        self.pos += 1
+        chunks = []
+        while True:
+            match = chunk_re.match(self.text, self.pos)
+            chunks.append(match.group(0))
+            self.pos = match.end()
+            ch = self.peek()
+            if ch == quote:
+                self.pos += 1
+                break
+            if not ch:
+                self.error("字符串未结束")
+            # 处理转义
+            esc = self.text[self.pos + 1:self.pos + 2]
+            if esc == "u":
+                chunks.append(chr(int(self.text[self.pos + 2:self.pos + 6], 16)))
+                self.pos += 6
+            elif esc == "x":
+                chunks.append(chr(int(self.text[self.pos + 2:self.pos + 4], 16)))
+                self.pos += 4
+            elif esc == "\n":
+                # 行尾的反斜杠表示续行
+                self.pos += 2
+            else:
+                chunks.append(_JS_ESCAPES.get(esc, esc))
+                self.pos += 2
+        value = "".join(chunks)
+        # 合并 \\u 转义得到的 UTF-16 代理对
+        if any("\ud800" <= ch <= "\udfff" for ch in value):
+            value = value.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+        return value
+
+
+def parse_js_literal(text: str) -> Any:
+    """
+    解析开头的一个 JS 字面量（对象、数组、字符串、数字、布尔、null/undefined），忽略其后的内容
+
+    解析失败时抛出 ValueError
+    """
+    return _JSLiteralParser(text).parse_value()
+
+
+def loads_js_state(text: str) -> Any:
+    """
+    解析赋值给 window.xxx 的 JS 对象字面量
+
+    - 字符串外的 undefined 转为 null，字符串内的内容不受影响
+    - 只解析开头的一个完整值，忽略其后的 `;` 和其他 JS 代码，字符串中的 `;` 不影响解析
+    - 不是合法 JSON 时（单引号、未加引号的键等）退回到 parse_js_literal
+
+    解析失败时抛出 ValueError
+    """
+    text = text.lstrip()
+    try:
+        normalized = _UNDEFINED_RE.sub(_replace_undefined, text) if "undefined" in text else text
+        value, _ = _decoder.raw_decode(normalized)
+        return value
+    except ValueError:
+        return parse_js_literal(text)
+
+
+def _find_state_start(html: bytes, name: str) -> Optional[int]:
+    """返回 `name = ` 之后状态值的起始位置，找不到时返回 None"""
+    match = re.search(re.escape(name.encode("utf-8")) + rb"\s*=\s*(?=[\[{])", html)
+    return match.end() if match else None
+
+
+def extract_state(html: Union[bytes, str], name: str) -> Optional[Any]:
+    """
+    不构建 DOM，直接在原始 HTML 中定位 `name = {...}` 形式的页面状态并解析
+
+    状态只可能出现在 `</script` 之前（否则脚本会被 HTML 解析器提前截断），
+    因此只需要解码并解析从赋值号到该脚本结束之间的内容
+
+    参数:
+        html: 原始页面内容
+        name: 状态变量名，例如 window.__INITIAL_STATE__
+
+    返回:
+        解析后的对象，找不到或解析失败时返回 None
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    start = _find_state_start(html, name)
+    if start is None:
+        return None
+    end = html.find(_SCRIPT_END, start)
+    if end == -1:
+        end = len(html)
+    try:
+        return loads_js_state(html[start:end].decode("utf-8", "replace"))
+    except ValueError:
+        return None
+
+
+def _skip_value(buf: bytes, pos: int) -> int:
+    """跳过 pos 处的一个值而不构建对象，返回值结束的位置"""
+    pos = _WS_BYTES_RE.match(buf, pos).end()
+    first = buf[pos:pos + 1]
+    if first == b'"':
+        match = _STRING_BYTES_RE.match(buf, pos)
+        if not match:
+            raise ValueError(f"字符串未结束，位置: {pos}")
+        return match.end()
+    if not first or first not in _OPEN_BRACKETS:
+        # 数字、true / false / null / undefined
+        return _SCALAR_RE.match(buf, pos).end()
+    depth = 0
+    length = len(buf)
+    while True:
+        pos = _SKIP_RE.match(buf, pos).end()
+        if pos >= length:
+            raise ValueError("页面状态不完整")
+        ch = buf[pos]
+        pos += 1
+        if ch in _OPEN_BRACKETS:
+            depth += 1
+        elif ch in _CLOSE_BRACKETS:
+            depth -= 1
+            if depth == 0:
+                return pos
+        else:
+            raise ValueError(f"字符串未结束，位置: {pos}")
+
+
+def _find_key(buf: bytes, pos: int, key: str) -> Optional[int]:
+    """在 pos 处的对象中查找 key，返回对应值的起始位置；不是对象或不存在该键时返回 None"""
+    pos = _WS_BYTES_RE.match(buf, pos).end()
+    if buf[pos:pos + 1] != b"{":
+        return None
+    pos += 1
+    while True:
+        pos = _WS_BYTES_RE.match(buf, pos).end()
+        if buf[pos:pos + 1] == b"}":
+            return None
+        match = _STRING_BYTES_RE.match(buf, pos)
+        if not match:
+            raise ValueError(f"无法解析的对象键，位置: {pos}")
+        raw = match.group(0)
+        name = json.loads(raw) if b"\\" in raw else raw[1:-1].decode("utf-8", "replace")
+        pos = _WS_BYTES_RE.match(buf, match.end()).end()
+        if buf[pos:pos + 1] != b":":
+            raise ValueError(f"对象键后缺少冒号，位置: {pos}")
+        pos = _WS_BYTES_RE.match(buf, pos + 1).end()
+        if name == key:
+            return pos
+        pos = _WS_BYTES_RE.match(buf, _skip_value(buf, pos)).end()
+        ch = buf[pos:pos + 1]
+        if ch == b"}":
+            return None
+        if ch != b",":
+            raise ValueError(f"对象中缺少逗号，位置: {pos}")
+        pos += 1
+
+
+class LazyState:
+    """
+    按路径懒解析页面状态: 直接在原始字节上定位子树，跳过的部分不解码、不构建对象，
+    只有 load() 时才解析当前位置的一个值
+
+    只支持 JSON 写法（值中可以有 undefined），遇到其他 JS 写法时抛出 ValueError，
+    调用方应退回到 extract_state
+    """
+
+    def __init__(self, buf: bytes, pos: int):
+        self.buf = buf
+        self.pos = pos
+
+    @classmethod
+    def find(cls, html: Union[bytes, str], name: str) -> Optional["LazyState"]:
+        """定位 `name = {...}` 形式的页面状态，找不到时返回 None"""
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        start = _find_state_start(html, name)
+        return cls(html, start) if start is not None else None
+
+    def get(self, *keys: str) -> Optional["LazyState"]:
+        """按键路径进入子对象，路径不存在或中途不是对象时返回 None"""
+        pos = self.pos
+        for key in keys:
+            pos = _find_key(self.buf, pos, key)
+            if pos is None:
+                return None
+        return LazyState(self.buf, pos)
+
+    def load(self) -> Any:
+        """解析当前位置的值"""
+        end = _skip_value(self.buf, self.pos)
+        return loads_js_state(self.buf[self.pos:end].decode("utf-8", "replace"))
+
+
+def find_title(html: Union[bytes, str]) -> str:
+    """从原始 HTML 中提取 <title> 文本，不存在时返回空字符串"""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    match = _TITLE_RE.search(html)
+    if not match:
+        return ""
+    return html_lib.unescape(match.group(1).decode("utf-8", "replace"))
+
+
+def iter_scripts(html: Union[bytes, str]) -> Iterator[str]:
+    """按文档顺序依次返回原始 HTML 中每个非空 <script> 的内容（与 BeautifulSoup 的 script.string 一致）"""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    for match in _SCRIPT_RE.finditer(html):
+        if match.group(1):
+            yield match.group(1).decode("utf-8", "replace")
+
+
+def _get_attr(tag: bytes, attr: str) -> Optional[str]:
+    """读取标签中的属性值，支持单双引号"""
+    match = re.search(
+        rb"\s" + attr.encode("ascii") + rb"""\s*=\s*(?:"([^"]*)"|'([^']*)')""", tag, re.I
+    )
+    if not match:
+        return None
+    value = match.group(1) if match.group(1) is not None else match.group(2)
+    return html_lib.unescape(value.decode("utf-8", "replace"))
+
+
+def find_meta(
+    html: Union[bytes, str],
+    name: Optional[str] = None,
+    property: Optional[str] = None,
+) -> Optional[str]:
+    """
+    从原始 HTML 中提取 <meta name=... content=...> 或 <meta property=... content=...> 的 content
+
+    返回:
+        content 属性值，找不到时返回 None
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    attr, expected = ("name", name) if name is not None else ("property", property)
+    for match in _META_RE.finditer(html):
+        tag = match.group(0)
+        if _get_attr(tag, attr) == expected:
+            return _get_attr(tag, "content")
+    return None
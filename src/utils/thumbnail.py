@@ -0,0 +1,59 @@
+import io
+from typing import Tuple
+
+__all__ = ["THUMBNAIL_FORMATS", "pillow_available", "make_thumbnail"]
+
+# 输出格式 -> (Pillow 格式名, Content-Type)
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+def pillow_available() -> bool:
+    """检查是否安装了 Pillow"""
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def make_thumbnail(data: bytes, width: int, format: str, quality: int) -> Tuple[bytes, str]:
+    """
+    解码图片、按宽度等比缩小并重新编码，返回 (图片字节, Content-Type)
+
+    在解析进程池中执行（CPU 密集）；原图宽度不超过 width 时不放大。
+    JPEG 原图先用 draft 在解码时按 1/2、1/4、1/8 缩小，只解码需要的分辨率。
+    图片无法识别时抛出 ValueError
+    """
+    # Pillow 是可选依赖，且导入较慢，只在进程池中首次生成缩略图时导入
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    pil_format, content_type = THUMBNAIL_FORMATS[format]
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.format == "JPEG":
+            image.draft("RGB", (width, width * image.height // max(image.width, 1)))
+        # 动图只取第一帧
+        image.seek(0)
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"无法识别的图片: {e}")
+
+    if image.width > width:
+        height = max(1, round(image.height * width / image.width))
+        image.thumbnail((width, height), Image.LANCZOS, reducing_gap=2.0)
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if pil_format == "JPEG" and has_alpha:
+        # JPEG 不支持透明通道，铺在白色背景上
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image.convert("RGBA"), mask=image.convert("RGBA").getchannel("A"))
+        image = background
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    output = io.BytesIO()
+    image.save(output, pil_format, quality=quality)
+    return output.getvalue(), content_type
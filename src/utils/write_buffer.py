@@ -0,0 +1,227 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from .logger import get_utils_logger
+
+__all__ = ["WriteBuffer", "OVERFLOW_REJECT", "OVERFLOW_DROP_OLDEST", "OVERFLOW_BLOCK"]
+
+logger = get_utils_logger()
+
+# 队列满时的处理方式
+OVERFLOW_REJECT = "reject"            # 拒绝新数据，put 返回 False
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # 丢弃最早的数据，接收新数据
+OVERFLOW_BLOCK = "block"              # 等待队列有空位
+
+
+class WriteBuffer:
+    """
+    写缓冲: 数据先进入内存队列，攒够 batch_size 条或最早一条等待了 flush_interval 秒后批量写入
+
+    - 只有一个后台任务负责写入，同一时间最多占用一个数据库连接
+    - flush 是异步函数（如在数据库线程池中执行 executemany）；失败时按指数退避重试 retries 次，
+      重试期间这一批仍计入队列长度；仍然失败时用 write_one 逐条写入，只丢弃写入失败的那几条（记入 failed）
+    - 队列长度（含正在写入的一批）不超过 max_size，满时按 overflow 处理
+    - close 时停止接收并写完队列中的全部数据（在应用 shutdown 事件中调用）
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], Awaitable[Any]],
+        batch_size: int,
+        flush_interval: float,
+        max_size: int,
+        overflow: str = OVERFLOW_REJECT,
+        write_one: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        retries: int = 3,
+        retry_delay: float = 0.2,
+        retry_max_delay: float = 5.0,
+    ):
+        if overflow not in (OVERFLOW_REJECT, OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK):
+            raise ValueError(f"未知的队列溢出处理方式: {overflow}")
+        self.flush = flush
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_size = max(self.batch_size, max_size)
+        self.overflow = overflow
+        self.write_one = write_one
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        # (进入队列的时间, 数据)
+        self._items: Deque[Tuple[float, Any]] = deque()
+        # 正在写入（含重试中）的一批
+        self._inflight = 0
+        self._task: Optional[asyncio.Task] = None
+        # 事件在首次使用时创建，绑定到当前事件循环
+        self._arrived: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._closing = False
+        self.accepted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.row_fallbacks = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def _start(self):
+        if self._task is None:
+            self._arrived = asyncio.Event()
+            self._space = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    def _notify_arrived(self):
+        self._arrived.set()
+        self._arrived = asyncio.Event()
+
+    def _notify_space(self):
+        self._space.set()
+        self._space = asyncio.Event()
+
+    async def put(self, item: Any) -> bool:
+        """放入一条数据，返回是否接收（已关闭或队列满且为 reject 时返回 False）"""
+        if self._closing:
+            self.rejected += 1
+            return False
+        self._start()
+        while len(self._items) + self._inflight >= self.max_size:
+            if self.overflow == OVERFLOW_DROP_OLDEST and self._items:
+                self._items.popleft()
+                self.dropped += 1
+            elif self.overflow != OVERFLOW_REJECT:
+                # block，或 drop_oldest 时队列中只剩正在写入（重试中）的一批: 等待写入结束
+                await self._space.wait()
+                if self._closing:
+                    self.rejected += 1
+                    return False
+            else:
+                self.rejected += 1
+                return False
+        self._items.append((time.monotonic(), item))
+        self.accepted += 1
+        depth = len(self._items)
+        self.max_depth = max(self.max_depth, depth + self._inflight)
+        # 写入任务在队列为空时无限期等待，攒够一批时需要立即写入
+        if depth == 1 or depth >= self.batch_size:
+            self._notify_arrived()
+        return True
+
+    async def _wait(self, timeout: Optional[float]):
+        try:
+            await asyncio.wait_for(self._arrived.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        """后台写入任务: 凑满一批、最早一条到期或正在关闭时写入"""
+        while True:
+            if not self._items:
+                if self._closing:
+                    return
+                await self._wait(None)
+                continue
+            if len(self._items) < self.batch_size and not self._closing:
+                timeout = self._items[0][0] + self.flush_interval - time.monotonic()
+                if timeout > 0:
+                    await self._wait(timeout)
+                    continue
+            batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+            self._inflight = len(batch)
+            try:
+                await self._write(batch)
+            finally:
+                self._inflight = 0
+                self._notify_space()
+
+    async def _flush_with_retry(self, items: List[Any]) -> bool:
+        """批量写入，失败时按指数退避重试，返回是否成功"""
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            try:
+                await self.flush(items)
+                return True
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"批量写入 {len(items)} 条失败，已重试 {self.retries} 次: {e}")
+                    return False
+                logger.warning(f"批量写入 {len(items)} 条失败，{delay:.1f} 秒后重试: {e}")
+            self.retried += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max_delay)
+        return False
+
+    async def _write_rows(self, items: List[Any]):
+        """批量写入仍然失败时逐条写入，只丢弃写入失败的数据"""
+        self.row_fallbacks += 1
+        for item in items:
+            try:
+                await self.write_one(item)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"逐条写入失败，丢弃: {item!r}, {e}")
+
+    async def _write(self, batch: List[Tuple[float, Any]]):
+        start = time.monotonic()
+        items = [item for _, item in batch]
+        if await self._flush_with_retry(items):
+            self.written += len(items)
+        elif self.write_one is not None:
+            await self._write_rows(items)
+        else:
+            self.failed += len(items)
+            logger.error(f"批量写入失败，丢弃 {len(items)} 条")
+        end = time.monotonic()
+        elapsed = end - start
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.flush_seconds += elapsed
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.max_lag_seconds = max(self.max_lag_seconds, end - batch[0][0])
+
+    async def close(self):
+        """停止接收新数据，写完队列中的数据后结束写入任务"""
+        self._closing = True
+        if self._task is None:
+            return
+        self._notify_arrived()
+        self._notify_space()
+        await self._task
+
+    def stats(self) -> Dict[str, Any]:
+        """返回队列和写入统计信息（耗时单位为毫秒）"""
+        oldest = self._items[0][0] if self._items else None
+        return {
+            "depth": len(self._items) + self._inflight,
+            "inflight": self._inflight,
+            "max_depth": self.max_depth,
+            "max_size": self.max_size,
+            "overflow": self.overflow,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "retried": self.retried,
+            "row_fallbacks": self.row_fallbacks,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": round((self.written + self.failed) / self.batches, 1) if self.batches else 0,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2),
+            "avg_flush_ms": round(self.flush_seconds * 1000 / self.batches, 2) if self.batches else 0,
+            "max_lag_ms": round(self.max_lag_seconds * 1000, 2),
+            "oldest_wait_ms": round((time.monotonic() - oldest) * 1000, 2) if oldest is not None else 0,
+        }
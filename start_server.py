@@ -7,13 +7,22 @@
 - development: 开发环境 (默认)
 - production: 生产环境
 - testing: 测试环境
+
+工作进程数大于 1 时（生产环境默认每个 CPU 核心一个）使用预加载 + fork 的多进程模式:
+主进程导入应用、编译解析规格并绑定端口后 fork 出工作进程，工作进程以写时复制方式
+共享这些内存；HTTP 客户端、解析进程池、数据库连接池在各工作进程的 startup 事件中创建。
+工作进程异常退出时主进程会重新拉起，主进程收到 SIGTERM/SIGINT 时通知所有工作进程退出
 """
 
 import os
+import gc
 import sys
+import time
+import signal
 import uvicorn
 import logging
 import argparse
+from typing import Dict
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -38,6 +47,12 @@ def parse_args():
         default=os.getenv('HOST', '127.0.0.1'),
         help='绑定主机 (默认: 127.0.0.1)'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='工作进程数 (默认: 配置中的 WORKERS，生产环境为 CPU 核心数)'
+    )
     return parser.parse_args()
 
 # 导入日志配置
@@ -50,6 +65,88 @@ def set_environment(env):
     os.environ['APP_ENV'] = env
     return env
 
+def preload_app(server_config: uvicorn.Config):
+    """
+    在主进程中预加载应用（fork 之前），工作进程直接继承已导入的模块和编译结果
+    """
+    from src.app.registry import registry
+    from src.utils.extraction import compile_all
+
+    # 导入 main:app 以及 HTTP 协议实现
+    server_config.load()
+    # 导入所有平台的提取器并编译字段提取规格
+    for app_type in registry.app_types():
+        registry.get(app_type)
+    compile_all()
+    # 把已有对象移出垃圾回收的跟踪范围，避免工作进程中的 GC 改写这些对象导致内存页被复制
+    gc.freeze()
+
+
+def run_worker(server_config: uvicorn.Config, sock):
+    """在 fork 出的工作进程中运行服务，返回值作为进程退出码"""
+    # 恢复默认信号处理，uvicorn 会安装自己的处理函数
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = uvicorn.Server(server_config)
+    server.run(sockets=[sock])
+    return 0 if server.started else 1
+
+
+def serve_prefork(server_config: uvicorn.Config, workers: int, logger):
+    """预加载应用后 fork 出 workers 个工作进程，并在工作进程异常退出时重新拉起"""
+    preload_app(server_config)
+    sock = server_config.bind_socket()
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_worker(server_config, sock)
+            finally:
+                # 不执行主进程的清理逻辑
+                os._exit(code)
+        children[pid] = index
+        logger.info(f"工作进程 {index} 已启动 - PID: {pid}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        code = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status
+        if stopping:
+            logger.info(f"工作进程 {index} 已退出 - PID: {pid}")
+            continue
+        logger.error(f"工作进程 {index} 异常退出 - PID: {pid}, 退出码: {code}，正在重新启动")
+        # 避免启动即失败时无限快速重启
+        time.sleep(1)
+        spawn(index)
+
+    sock.close()
+    logger.info("所有工作进程已退出")
+
+
 # 获取应用日志器
 def start_server():
     """静默启动服务"""
@@ -79,24 +176,38 @@ def start_server():
         logging.getLogger("uvicorn.access").parent = logging.getLogger("app")
         logging.getLogger("uvicorn.error").parent = logging.getLogger("app")
         
-        # 使用命令行参数覆盖配置中的主机和端口
+        # 使用命令行参数覆盖配置中的主机、端口和工作进程数
         host = args.host or config.HOST
         port = args.port or config.PORT
+        workers = max(1, args.workers or config.WORKERS)
+        if args.workers and 'PROCESS_POOL_WORKERS' not in os.environ:
+            # 各工作进程的解析进程池平分 CPU 核心
+            config.PROCESS_POOL_WORKERS = max(1, (os.cpu_count() or 1) // workers)
         
         # 记录启动信息
-        logger.info(f"正在启动 API 服务... 环境: {env}, 主机: {host}, 端口: {port}")
+        logger.info(f"正在启动 API 服务... 环境: {env}, 主机: {host}, 端口: {port}, 工作进程数: {workers}")
         
-        # 启动 uvicorn 服务器
-        uvicorn.run(
+        server_config = uvicorn.Config(
             "main:app",                 # 应用导入字符串
             host=host,                  # 绑定的主机
             port=port,                  # 绑定的端口
             reload=False,               # 在生产环境中禁用自动重载
             log_level=config.LOG_LEVEL.lower(),  # 日志级别
-            workers=1,                  # 工作进程数
+            workers=workers,            # 工作进程数
+            loop="auto",                # 已安装 uvloop 时使用 uvloop
+            http="auto",                # 已安装 httptools 时使用 httptools
+            backlog=config.SERVER_BACKLOG,  # 监听队列长度
+            timeout_keep_alive=config.SERVER_KEEP_ALIVE_TIMEOUT,  # 空闲长连接保持时间
+            limit_concurrency=config.SERVER_LIMIT_CONCURRENCY or None,  # 最大并发连接数
             log_config=None,            # 禁用 uvicorn 默认日志配置
             access_log=False,           # 禁用 uvicorn 访问日志
         )
+        
+        # 启动 uvicorn 服务器
+        if workers > 1:
+            serve_prefork(server_config, workers, logger)
+        else:
+            uvicorn.Server(server_config).run()
     except Exception as e:
         # 在出错时尝试获取日志器
         try:
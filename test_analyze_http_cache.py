@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+GET /analyze 的 ETag / 304 / Cache-Control 离线测试
+
+用一个假的平台提取器代替真实平台，不访问网络
+"""
+
+import sys
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.cache import ResultCache
+from src.utils.response import Response
+from src.routes import analyze
+
+URL = "https://fake.example.com/post/1001"
+
+
+class FakeExtractor:
+    """假的平台提取器，记录实际解析次数"""
+
+    app_type = "fake"
+    calls = 0
+
+    @staticmethod
+    def parse_content_id(url):
+        return url.rsplit("/", 1)[-1]
+
+    @staticmethod
+    async def resolve(url):
+        return url
+
+    @classmethod
+    async def create(cls, text, type, url=None):
+        cls.calls += 1
+        return cls()
+
+    def to_dict(self):
+        return Response.success({"title": "标题", "image_list": ["https://img/1.png"]}, "获取成功")
+
+
+def make_client():
+    FakeExtractor.calls = 0
+    analyze.analyze_service.cache = ResultCache(max_bytes=1024 * 1024, ttl=600)
+    analyze.analyze_service.detect_extractor = lambda text: (FakeExtractor, URL)
+    app = FastAPI()
+    app.include_router(analyze.router)
+    return TestClient(app)
+
+
+def test_analyze_get_etag():
+    print("测试 GET /analyze 的 ETag、Cache-Control 和 304")
+    client = make_client()
+    first = client.get("/analyze", params={"url": URL})
+    assert first.status_code == 200
+    assert first.json()["data"]["title"] == "标题"
+    etag = first.headers["etag"]
+    max_age = int(first.headers["cache-control"].split("max-age=")[1])
+    assert 590 <= max_age <= 600
+
+    second = client.get("/analyze", params={"url": URL}, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert FakeExtractor.calls == 1
+
+    # POST 接口使用同一套 ETag
+    post = client.post("/analyze", json={"url": URL}, headers={"If-None-Match": etag})
+    assert post.status_code == 304
+
+    # 图片类型不同，结果（缓存键）不同，但内容相同时 ETag 也相同
+    other = client.get("/analyze", params={"url": URL, "type": "webp"}, headers={"If-None-Match": etag})
+    assert other.status_code == 304
+    assert FakeExtractor.calls == 2
+
+
+def test_analyze_get_error_not_cached():
+    print("测试解析失败的结果不被 HTTP 缓存")
+    client = make_client()
+    original = FakeExtractor.to_dict
+    FakeExtractor.to_dict = lambda self: Response.error("解析失败")
+    try:
+        response = client.get("/analyze", params={"url": URL})
+    finally:
+        FakeExtractor.to_dict = original
+    assert response.json()["code"] == Response.ERROR_CODE
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_etag_matches():
+    print("测试 If-None-Match 的弱比较只去掉 W/ 前缀")
+    assert analyze.etag_matches('W/"abc"', '"abc"')
+    assert analyze.etag_matches(' "x", W/"abc" ', '"abc"')
+    assert analyze.etag_matches("*", '"abc"')
+    assert not analyze.etag_matches(None, '"abc"')
+    # lstrip("W/") 会把 WW/"abc" 和 /W"abc" 也当作 "abc"
+    assert not analyze.etag_matches('WW/"abc"', '"abc"')
+    assert not analyze.etag_matches('/W"abc"', '"abc"')
+
+
+if __name__ == "__main__":
+    test_analyze_get_etag()
+    test_analyze_get_error_not_cached()
+    test_etag_matches()
+    print("测试通过")
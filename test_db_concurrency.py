@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库访问层的并发压力测试
+
+用假的连接池代替 MySQL: 每条语句在工作线程中阻塞几毫秒，游标各自保存结果；
+并发写入和读取时检查结果没有串到其他请求、连接数不超过上限、事件循环没有被阻塞
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils import config
+from src.utils.db import DatabasePool, POOL_READY, close_db_pool
+from src.models.tracking import TrackingEvent
+from src.services.tracking_service import TrackingService
+
+USERS = 200
+
+
+class FakeCursor:
+    """每个游标保存自己的查询结果，游标被其他请求复用时结果会错位"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = None
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.connection.check_owner()
+        # 模拟网络往返，让其他线程有机会交错执行
+        time.sleep(random.uniform(0.001, 0.004))
+        table = self.connection.pool.table
+        if query.strip().upper().startswith("SELECT"):
+            with self.connection.pool.lock:
+                self.rows = [dict(row) for row in table if row["user_id"] == params[0]]
+            self.rowcount = len(self.rows)
+        else:
+            with self.connection.pool.lock:
+                table.append({"user_id": params[0], "event_type": params[2], "event_params": params[6]})
+            self.rowcount = 1
+
+    def fetchall(self):
+        self.connection.check_owner()
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """记录持有连接的线程，被另一个线程同时使用时报错"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.owner = threading.get_ident()
+
+    def check_owner(self):
+        assert self.owner == threading.get_ident(), "连接被多个线程同时使用"
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.check_owner()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        with self.pool.lock:
+            self.pool.active -= 1
+        self.pool.slots.release()
+
+
+class FakePool:
+    """与 PooledDB(blocking=True) 一样，连接用完时阻塞等待"""
+
+    def __init__(self, max_connections):
+        self.slots = threading.Semaphore(max_connections)
+        self.lock = threading.Lock()
+        self.table = []
+        self.active = 0
+        self.peak = 0
+
+    def connection(self):
+        self.slots.acquire()
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        return FakeConnection(self)
+
+    def close(self):
+        pass
+
+
+async def heartbeat(stop, lags, interval=0.005):
+    """记录事件循环的调度延迟: 每次 sleep 实际多等待的时间"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+def test_concurrent_inserts_and_reads():
+    print("测试并发写入和读取: 结果不串、连接数不超过上限、不阻塞事件循环")
+    db_pool = DatabasePool()
+    original = (db_pool.pool, db_pool.state)
+    fake_pool = FakePool(config.DB_MAX_CONNECTIONS)
+    db_pool.pool, db_pool.state = fake_pool, POOL_READY
+
+    async def user_session(service, user_id):
+        event = TrackingEvent(
+            user_id=user_id,
+            source_platform="pc",
+            event_type=f"view_{user_id}",
+            ip_address="127.0.0.1",
+            event_params={"user": user_id},
+        )
+        assert await service.insert_event(event) == 1
+        return await service.get_events(user_id=user_id)
+
+    async def check():
+        service = TrackingService()
+        stop = asyncio.Event()
+        lags = []
+        beat = asyncio.ensure_future(heartbeat(stop, lags))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(user_session(service, user_id) for user_id in range(1, USERS + 1)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await beat
+        await close_db_pool()
+        return results, lags, elapsed
+
+    try:
+        results, lags, elapsed = asyncio.run(check())
+    finally:
+        db_pool.pool, db_pool.state = original
+
+    for user_id, events in enumerate(results, start=1):
+        assert len(events) == 1, (user_id, events)
+        assert events[0]["user_id"] == user_id
+        assert events[0]["event_type"] == f"view_{user_id}"
+        assert events[0]["event_params"] == {"user": user_id}
+    assert len(fake_pool.table) == USERS
+    assert fake_pool.active == 0
+    assert fake_pool.peak <= config.DB_MAX_CONNECTIONS
+    # 每条语句阻塞 1-4 毫秒，但都在数据库线程池中执行，事件循环的调度延迟保持在很低的水平
+    max_lag = max(lags)
+    print(f"  {USERS * 2} 条语句耗时 {elapsed * 1000:.0f} ms, 连接峰值 {fake_pool.peak}, 事件循环最大延迟 {max_lag * 1000:.1f} ms")
+    assert max_lag < 0.05, max_lag
+
+
+def test_shared_connection_object_isolated():
+    print("测试同一个 DatabaseConnection 在多个线程中使用时各自取得独立的连接和游标")
+    db_pool = DatabasePool()
+    original = (db_pool.pool, db_pool.state)
+    fake_pool = FakePool(config.DB_MAX_CONNECTIONS)
+    db_pool.pool, db_pool.state = fake_pool, POOL_READY
+    service = TrackingService()
+    errors = []
+
+    def worker(user_id):
+        try:
+            service.db.execute_query("INSERT INTO event_tracking VALUES (%s)", (user_id, "pc", "view", None, None, None, json.dumps({})))
+            rows = service.db.execute_query("SELECT * FROM event_tracking WHERE user_id = %s", (user_id,))
+            assert [row["user_id"] for row in rows] == [user_id]
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        db_pool.pool, db_pool.state = original
+    assert errors == [], errors
+    assert fake_pool.active == 0
+
+
+if __name__ == "__main__":
+    test_concurrent_inserts_and_reads()
+    test_shared_connection_object_isolated()
+    print("测试通过")
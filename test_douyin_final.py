@@ -41,5 +41,41 @@ def test_douyin_video():
             print(f"测试失败: {str(e)}")
             print(traceback.format_exc())
 
+def user_name_pages():
+    """用户名提取的样例页面: 页面内容中的 nickname 字样、用户名元素、多个脚本、只有标题"""
+    state = '<script>window._ROUTER_DATA = {"loaderData":{"video_(id)/page":{"author":{"nickname":"脚本作者"}}}}</script>'
+    return [
+        # 脚本之外的页面内容中出现 "nickname":"..." 时不应被匹配
+        '<html><head><title>作品</title></head><body><pre>"nickname":"正文字样"</pre>' + state + '</body></html>',
+        # 有用户名元素时优先于脚本数据
+        '<html><body><span class="user-name">元素作者</span>' + state + '</body></html>',
+        # 多个脚本时按文档顺序取第一个匹配的脚本
+        '<html><body><script>var a = {"userName":"前一个脚本"};</script>' + state + '</body></html>',
+        # 相似的 class（user-name-wrap）不是用户名元素
+        '<html><body><div class="user-name-wrap">x</div>' + state + '</body></html>',
+        '<html><head><title>标题作者的抖音视频</title></head><body><script></script></body></html>',
+    ]
+
+
+def test_douyin_user_name_fast():
+    """测试不构建 DOM 的用户名提取与 DOM 方案的结果和优先级一致"""
+    print("测试抖音用户名快速提取与 DOM 方案一致")
+    from bs4 import BeautifulSoup
+
+    expected = ["脚本作者", "元素作者", "前一个脚本", "脚本作者", "标题作者"]
+    for page, name in zip(user_name_pages(), expected):
+        fast = Douyin.__new__(Douyin)
+        fast.title = ""
+        fast.content = page.encode("utf-8")
+        fast.extract_user_name_fast()
+
+        dom = Douyin.__new__(Douyin)
+        dom.title = ""
+        dom.soup = BeautifulSoup(page, "html.parser")
+        dom.extract_user_name()
+        assert fast.title == dom.title == name, (fast.title, dom.title, name)
+
+
 if __name__ == "__main__":
+    test_douyin_user_name_fast()
     test_douyin_video() 
\ No newline at end of file
@@ -32,5 +32,39 @@ def test_kuaishou_extraction():
     except Exception as e:
         print(f"测试出错: {e}")
 
+def new_extractor():
+    """构造一个未填充字段的 Kuaishou 实例（不请求页面）"""
+    ks = Kuaishou.__new__(Kuaishou)
+    ks.title = ""
+    ks.description = ""
+    ks.video = ""
+    ks.image_list = []
+    ks.image_prefix = "https://tx2.a.kwimgs.com/"
+    ks.nodes_visited = 0
+    return ks
+
+
+def test_flat_search_video_with_later_images():
+    print("测试视频作品找到视频后继续查找后面节点中的图片")
+    payload = {
+        "tv-8f2a": {
+            "photo": {
+                "caption": "作品描述文本",
+                "manifest": {"adaptationSet": [{"representation": [{"url": "https://v.kwaicdn.com/video.mp4"}]}]},
+            },
+            "user": {"name": "快手作者"},
+            "recommend": {"feeds": [{"id": f"feed{i}"} for i in range(10)]},
+            "cover": {"ext_params": {"atlas": {"list": ["upic/2024/01/01/a.jpg"]}}},
+        },
+    }
+    ks = new_extractor()
+    ks.flat_search_data(payload)
+    assert ks.title == "快手作者"
+    assert ks.description == "作品描述文本"
+    assert ks.video == "https://v.kwaicdn.com/video.mp4"
+    assert ks.image_list, "视频作品后面节点中的图片不应丢失"
+
+
 if __name__ == "__main__":
+    test_flat_search_video_with_later_images()
     test_kuaishou_extraction() 
\ No newline at end of file
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+AnalyzeService.detect_extractor 的平台识别测试: 单个链接按域名查表，自由文本回退到正则查找
+
+不访问网络
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.app.registry import registry
+from src.services.analyze_service import AnalyzeService
+
+
+def test_detect_extractor_host_lookup():
+    print("测试单个链接按域名查表，不使用整段文本的正则")
+    original = registry.match
+    registry.match = lambda text: (_ for _ in ()).throw(AssertionError("不应使用正则查找"))
+    try:
+        extractor, url = AnalyzeService.detect_extractor("https://v.douyin.com/abc123/")
+        assert (extractor.app_type, url) == ("douyin", "https://v.douyin.com/abc123/")
+        extractor, url = AnalyzeService.detect_extractor("复制打开 https://www.xiaohongshu.com/explore/1a2b，看看")
+        assert (extractor.app_type, url) == ("xiaohongshu", "https://www.xiaohongshu.com/explore/1a2b")
+    finally:
+        registry.match = original
+
+
+def test_detect_extractor_fallback():
+    print("测试第一个链接不受支持或输入不是单个链接时回退到正则查找")
+    extractor, url = AnalyzeService.detect_extractor("https://example.com/x 和 https://v.kuaishou.com/k1")
+    assert (extractor.app_type, url) == ("kuaishou", "https://v.kuaishou.com/k1")
+    extractor, url = AnalyzeService.detect_extractor("https://example.com/a https://m.weibo.cn/status/1")
+    assert (extractor.app_type, url) == ("weibo", "https://m.weibo.cn/status/1")
+    assert AnalyzeService.detect_extractor("没有链接") is None
+    assert AnalyzeService.detect_extractor("https://example.com/a") is None
+
+
+if __name__ == "__main__":
+    test_detect_extractor_host_lookup()
+    test_detect_extractor_fallback()
+    print("测试通过")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+解析结果磁盘缓存的离线测试
+
+用两个 ResultCache 实例共享同一个 SQLite 文件，模拟同一台机器上的多个工作进程和重启后的进程
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.cache import ResultCache
+from src.utils.disk_cache import DiskCache
+
+KEY = ("douyin", "7300000000000000001", "png")
+
+
+def make_cache(path, ttl=60, stale_ttl=60, max_bytes=1024 * 1024):
+    return ResultCache(max_bytes=1024 * 1024, ttl=ttl, store=DiskCache(path, max_bytes=max_bytes, stale_ttl=stale_ttl))
+
+
+def counting_loader(calls, value):
+    async def loader():
+        calls.append(value)
+        return {"code": 200, "data": value}
+    return loader
+
+
+def test_shared_between_workers():
+    print("测试多个工作进程（及重启后的进程）共享磁盘缓存")
+
+    async def check(path):
+        calls = []
+        first = make_cache(path)
+        result = await first.get_or_load(KEY, counting_loader(calls, "v1"))
+        first.close()
+        # 另一个进程（或重启后的进程）直接命中磁盘缓存，并写回内存
+        second = make_cache(path)
+        assert await second.get_or_load(KEY, counting_loader(calls, "v2")) == result
+        assert calls == ["v1"]
+        assert second.get(KEY) == result
+        assert 0 < second.ttl_remaining(KEY) <= 60
+        # 磁盘缓存的统计查询在线程池中执行
+        assert (await second.stats())["disk"]["entries"] == 1
+        second.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check(os.path.join(tmp, "cache.sqlite3")))
+
+
+def test_stale_while_revalidate():
+    print("测试过期后先返回旧值、后台刷新")
+
+    async def check(path):
+        calls = []
+        writer = make_cache(path, ttl=0)
+        await writer.get_or_load(KEY, counting_loader(calls, "old"))
+        writer.close()
+
+        reader = make_cache(path)
+        stale = await reader.get_or_load(KEY, counting_loader(calls, "new"))
+        assert stale["data"] == "old"
+        assert reader.stale_served == 1
+        # 等待后台刷新完成
+        while reader._inflight:
+            await asyncio.sleep(0.01)
+        assert calls == ["old", "new"]
+        assert (await reader.get_or_load(KEY, counting_loader(calls, "newer")))["data"] == "new"
+        reader.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check(os.path.join(tmp, "cache.sqlite3")))
+
+
+def test_disk_eviction():
+    print("测试磁盘缓存按容量淘汰")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiskCache(os.path.join(tmp, "cache.sqlite3"), max_bytes=4096, stale_ttl=0)
+        store.EVICT_EVERY = 1
+        for index in range(50):
+            store.set(("douyin", str(index), None), {"data": "x" * 200}, ttl=60)
+        stats = store.stats()
+        assert stats["bytes"] <= 4096
+        assert stats["evictions"] > 0
+        # 最近写入的仍然存在
+        assert store.get(("douyin", "49", None)) is not None
+        store.close()
+
+
+if __name__ == "__main__":
+    test_shared_between_workers()
+    test_stale_while_revalidate()
+    test_disk_eviction()
+    print("测试通过")
@@ -0,0 +1,432 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+/system 文件流接口的离线测试
+
+在本地启动一个桩服务，按块生成指定大小的文件，不访问真实的资源服务器；
+每个测试使用临时目录中的媒体缓存
+"""
+
+import sys
+import os
+import asyncio
+import time
+import tempfile
+import threading
+import tracemalloc
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from fastapi import HTTPException
+from starlette.requests import Request
+from PIL import Image
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils import http_client
+from src.utils.media_cache import MediaCache
+from src.routes import system
+from src.routes.system import SystemParams, process_get_file_stream, process_image_proxy, proxy_download, process_thumbnail
+
+BLOCK = b"0123456789abcdef" * 4096
+IMAGE = bytes(range(256)) * 1024
+VIDEO = bytes(range(256)) * 4096
+VIDEO_ETAG = '"video-v1"'
+
+
+def make_photo():
+    """生成一张 800x600 带透明通道的 PNG"""
+    image = Image.new("RGBA", (800, 600), (255, 0, 0, 128))
+    output = BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
+
+
+PHOTO = make_photo()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    /file?size=N 返回 N 字节的文件，边生成边发送；/image 延迟返回一张图片；
+    /video 支持 Range 和 If-None-Match；/photo 延迟返回一张 PNG；
+    记录各路径的请求次数和最后一次的请求头
+    """
+
+    protocol_version = "HTTP/1.1"
+    counts = {}
+    last_headers = {}
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        StubHandler.counts[parsed.path] = StubHandler.counts.get(parsed.path, 0) + 1
+        StubHandler.last_headers[parsed.path] = self.headers
+        if parsed.path == "/video":
+            self.send_video()
+        elif parsed.path in ("/image", "/photo"):
+            body, content_type = (IMAGE, "image/jpeg") if parsed.path == "/image" else (PHOTO, "image/png")
+            time.sleep(0.2)
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif parsed.path == "/file":
+            self.send_file(int(parse_qs(parsed.query)["size"][0]))
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def send_file(self, size):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        sent = 0
+        try:
+            while sent < size:
+                block = BLOCK[:size - sent]
+                self.wfile.write(block)
+                sent += len(block)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def send_video(self):
+        if self.headers.get("If-None-Match") == VIDEO_ETAG:
+            self.send_response(304)
+            self.send_header("ETag", VIDEO_ETAG)
+            self.end_headers()
+            return
+        range_header = self.headers.get("Range")
+        if not range_header:
+            self.send_response(200)
+            start, end = 0, len(VIDEO) - 1
+        else:
+            first, _, last = range_header.replace("bytes=", "").partition("-")
+            start = int(first)
+            end = min(int(last), len(VIDEO) - 1) if last else len(VIDEO) - 1
+            if start >= len(VIDEO):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(VIDEO)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(VIDEO)}")
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", VIDEO_ETAG)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self.wfile.write(VIDEO[start:end + 1])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_stub(check, revalidate_after=3600):
+    """启动桩服务并使用临时目录中的媒体缓存，执行 check(base_url, cache)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    StubHandler.counts = {}
+    StubHandler.last_headers = {}
+    original_cache = system.media_cache
+
+    async def _run(cache):
+        try:
+            return await check(base_url, cache)
+        finally:
+            await http_client.close_http_client()
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = MediaCache(tmp, max_bytes=64 * 1024 * 1024, max_file_bytes=128 * 1024 * 1024,
+                               revalidate_after=revalidate_after)
+            system.media_cache = cache
+            asyncio.run(_run(cache))
+    finally:
+        system.media_cache = original_cache
+        server.shutdown()
+        server.server_close()
+
+
+def make_request(headers):
+    """构造带指定请求头的 starlette 请求"""
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/system/proxy",
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+async def call(response):
+    """按 ASGI 协议执行响应，返回 (状态码, 响应头, 响应体)"""
+    messages = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await response({"type": "http"}, receive, send)
+    start = messages[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], headers, body
+
+
+def test_get_file_stream_constant_memory():
+    print("测试文件流接口边读边转发，内存占用与文件大小无关")
+    size = 64 * 1024 * 1024
+
+    async def check(base_url, cache):
+        # 先完整请求一次小文件（创建共享客户端、导入按需加载的模块），只统计转发过程中的内存
+        await call(await process_get_file_stream(SystemParams(url=f"{base_url}/file?size=1024")))
+        tracemalloc.start()
+        try:
+            response = await process_get_file_stream(SystemParams(url=f"{base_url}/file?size={size}", filename="a.mp4"))
+            assert response.headers["content-length"] == str(size)
+            assert response.headers["content-disposition"] == "attachment; filename=a.mp4"
+            assert response.media_type == "video/mp4"
+            received = 0
+            async for chunk in response.body_iterator:
+                received += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert received == size
+        # 64MB 的文件，峰值内存只有若干个分块
+        assert peak < 2 * 1024 * 1024, peak
+
+    run_stub(check)
+
+
+def test_get_file_stream_client_disconnect():
+    print("测试客户端断开时关闭上游连接，不写入缓存")
+
+    async def check(base_url, cache):
+        response = await process_get_file_stream(SystemParams(url=f"{base_url}/file?size={256 * 1024 * 1024}"))
+        iterator = response.body_iterator
+        await iterator.__anext__()
+        # 模拟 starlette 在客户端断开后的处理: 停止转发并执行 background
+        await iterator.aclose()
+        await response.background()
+        upstream = response.background.func.__self__
+        assert upstream.is_closed
+        assert os.listdir(cache.tmp_dir) == []
+        assert cache.stats()["entries"] == 0
+
+    run_stub(check)
+
+
+def test_image_proxy_coalesced():
+    print("测试同一图片的并发请求只请求一次上游，之后从磁盘缓存返回")
+
+    async def check(base_url, cache):
+        url = f"{base_url}/image"
+
+        async def load():
+            return await call(await process_image_proxy(url, make_request({})))
+
+        results = await asyncio.gather(*(load() for _ in range(20)))
+        assert StubHandler.counts["/image"] == 1
+        for status, headers, body in results:
+            assert status == 200
+            assert body == IMAGE
+            assert headers["content-type"] == "image/jpeg"
+            assert headers["content-length"] == str(len(IMAGE))
+            assert "max-age" in headers["cache-control"]
+
+        status, headers, body = await call(await process_image_proxy(url, make_request({})))
+        assert (status, body) == (200, IMAGE)
+        assert "max-age" in headers["cache-control"]
+        assert StubHandler.counts["/image"] == 1
+
+    run_stub(check)
+
+
+def test_proxy_range():
+    print("测试视频代理透传 Range 请求")
+
+    async def check(base_url, cache):
+        url = f"{base_url}/video"
+        status, headers, body = await call(await proxy_download(make_request({"Range": "bytes=1000-1999"}), url))
+        assert status == 206
+        assert headers["content-range"] == f"bytes 1000-1999/{len(VIDEO)}"
+        assert headers["content-length"] == "1000"
+        assert headers["accept-ranges"] == "bytes"
+        assert body == VIDEO[1000:2000]
+        # Host 由目标 URL 决定
+        assert StubHandler.last_headers["/video"]["Host"] == urlparse(base_url).netloc
+        assert StubHandler.last_headers["/video"]["Range"] == "bytes=1000-1999"
+        # 部分内容不写入缓存
+        assert cache.stats()["entries"] == 0
+
+        status, headers, body = await call(await proxy_download(make_request({"Range": f"bytes={len(VIDEO)}-"}), url))
+        assert status == 416
+        assert headers["content-range"] == f"bytes */{len(VIDEO)}"
+
+    run_stub(check)
+
+
+def test_proxy_media_cache():
+    print("测试视频代理的磁盘缓存: 按 Range 从缓存返回、内容去重、条件请求")
+
+    async def check(base_url, cache):
+        url = f"{base_url}/video?b=2&a=1"
+        # 播放器的首个请求 bytes=0- 按完整文件请求并写入缓存，仍返回 206
+        status, headers, body = await call(await proxy_download(make_request({"Range": "bytes=0-"}), url))
+        assert (status, body) == (206, VIDEO)
+        assert headers["content-range"] == f"bytes 0-{len(VIDEO) - 1}/{len(VIDEO)}"
+        assert "Range" not in StubHandler.last_headers["/video"]
+        assert StubHandler.counts["/video"] == 1
+        assert os.listdir(cache.tmp_dir) == []
+
+        # 参数顺序不同的同一个 URL 命中缓存，按 Range 返回
+        same_url = f"{base_url}/video?a=1&b=2"
+        status, headers, body = await call(await proxy_download(make_request({"Range": "bytes=-100"}), same_url))
+        assert status == 206
+        assert headers["content-range"] == f"bytes {len(VIDEO) - 100}-{len(VIDEO) - 1}/{len(VIDEO)}"
+        assert body == VIDEO[-100:]
+        assert StubHandler.counts["/video"] == 1
+
+        # 内容哈希作为 ETag
+        etag = headers["etag"]
+        status, _, body = await call(await proxy_download(make_request({"If-None-Match": etag}), url))
+        assert (status, body) == (304, b"")
+
+        # 另一个 URL 的相同内容只存一份
+        await call(await proxy_download(make_request({}), f"{base_url}/video?mirror=1"))
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["bytes"] == len(VIDEO)
+
+    run_stub(check)
+
+
+def test_proxy_media_cache_revalidate():
+    print("测试缓存过期后用上游 ETag 重新验证")
+
+    async def check(base_url, cache):
+        url = f"{base_url}/video"
+        await call(await proxy_download(make_request({}), url))
+        status, _, body = await call(await proxy_download(make_request({"Range": "bytes=0-9"}), url))
+        assert (status, body) == (206, VIDEO[:10])
+        assert StubHandler.counts["/video"] == 2
+        assert StubHandler.last_headers["/video"]["If-None-Match"] == VIDEO_ETAG
+        assert cache.revalidated == 1
+
+    run_stub(check, revalidate_after=0)
+
+
+def test_proxy_stale_cache_range():
+    print("测试缓存需要重新验证时透传 Range，上游返回 304 后从缓存按 Range 返回 206")
+
+    async def check(base_url, cache):
+        url = f"{base_url}/video"
+        await call(await proxy_download(make_request({}), url))
+        status, headers, body = await call(await proxy_download(make_request({"Range": "bytes=5000-5999"}), url))
+        assert (status, body) == (206, VIDEO[5000:6000])
+        assert headers["content-range"] == f"bytes 5000-5999/{len(VIDEO)}"
+        assert StubHandler.last_headers["/video"]["Range"] == "bytes=5000-5999"
+        assert StubHandler.last_headers["/video"]["If-None-Match"] == VIDEO_ETAG
+        assert cache.revalidated == 1
+
+    run_stub(check, revalidate_after=0)
+
+
+def test_thumbnail():
+    print("测试缩略图: 并发请求只生成一次，结果和原图写入磁盘缓存")
+
+    async def check(base_url, cache):
+        url = f"{base_url}/photo"
+
+        async def load(format):
+            return await call(await process_thumbnail(make_request({}), url, 200, 80, format))
+
+        results = await asyncio.gather(*(load("webp") for _ in range(10)))
+        assert StubHandler.counts["/photo"] == 1
+        for status, headers, body in results:
+            assert status == 200
+            assert headers["content-type"] == "image/webp"
+            assert "max-age" in headers["cache-control"]
+            image = Image.open(BytesIO(body))
+            assert (image.format, image.size) == ("WEBP", (200, 150))
+        # 原图和缩略图各一条
+        assert cache.stats()["entries"] == 2
+
+        # 缓存命中，ETag 与首次生成时一致
+        etag = results[0][1]["etag"]
+        status, headers, body = await call(await process_thumbnail(make_request({}), url, 200, 80, "webp"))
+        assert (status, headers["etag"], body) == (200, etag, results[0][2])
+        status, _, _ = await call(await process_thumbnail(make_request({"If-None-Match": etag}), url, 200, 80, "webp"))
+        assert status == 304
+
+        # 其他尺寸和格式从缓存的原图生成；JPEG 去掉透明通道
+        status, headers, body = await load("jpeg")
+        image = Image.open(BytesIO(body))
+        assert (status, image.format, image.mode, image.size) == (200, "JPEG", "RGB", (200, 150))
+        assert StubHandler.counts["/photo"] == 1
+
+        # 原图比要求的宽度小时不放大
+        status, _, body = await call(await process_thumbnail(make_request({}), url, 1600, 80, "webp"))
+        assert Image.open(BytesIO(body)).size == (800, 600)
+
+    run_stub(check)
+
+
+def test_thumbnail_invalid_image():
+    print("测试无法识别的图片返回 415")
+
+    async def check(base_url, cache):
+        try:
+            await process_thumbnail(make_request({}), f"{base_url}/image", 200, 80, "webp")
+        except HTTPException as e:
+            assert e.status_code == 415
+        else:
+            raise AssertionError("应返回 415")
+        assert cache.stats()["entries"] == 1
+
+    run_stub(check)
+
+
+def test_media_cache_eviction():
+    print("测试媒体缓存累计总字节数: 相同内容只计一次，超出容量时按访问时间淘汰，与索引统计一致")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MediaCache(tmp, max_bytes=3000, max_file_bytes=2000, revalidate_after=60)
+        cache.store_chunks("https://example.com/a", {}, [b"a" * 1000])
+        cache.store_chunks("https://example.com/a-copy", {}, [b"a" * 1000])
+        cache.store_chunks("https://example.com/b", {}, [b"b" * 1000])
+        assert cache._bytes == 2000
+        # 同一 URL 的内容更新后，旧文件不再被引用
+        cache.store_chunks("https://example.com/b", {}, [b"c" * 1500])
+        assert cache._bytes == 2500
+        cache.store_chunks("https://example.com/d", {}, [b"d" * 1000])
+        assert cache._bytes <= 3000
+        assert cache.lookup("https://example.com/a") is None
+        assert cache.lookup("https://example.com/d") is not None
+        running = cache._bytes
+        assert cache.stats()["bytes"] == running
+        blobs = sum(len(files) for _, _, files in os.walk(cache.blob_dir))
+        assert blobs == 2
+
+
+if __name__ == "__main__":
+    test_get_file_stream_constant_memory()
+    test_get_file_stream_client_disconnect()
+    test_image_proxy_coalesced()
+    test_proxy_range()
+    test_proxy_media_cache()
+    test_proxy_media_cache_revalidate()
+    test_proxy_stale_cache_range()
+    test_thumbnail()
+    test_thumbnail_invalid_image()
+    test_media_cache_eviction()
+    print("测试通过")
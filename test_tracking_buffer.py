@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+埋点写入缓冲的离线测试
+
+用记录调用的假写入函数和假连接池代替 MySQL
+"""
+
+import sys
+import os
+import asyncio
+import threading
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.write_buffer import WriteBuffer, OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK
+from src.utils.db import DatabasePool, POOL_READY, POOL_WARMING
+from src.routes import tracking
+
+
+class Recorder:
+    """假的写入函数，记录每一批数据；可以设置延迟、前 failures 次调用失败、包含 bad 的批次失败"""
+
+    def __init__(self, delay=0.0, failures=0, bad=None):
+        self.batches = []
+        self.delay = delay
+        self.failures = failures
+        self.bad = bad
+
+    async def __call__(self, items):
+        await asyncio.sleep(self.delay)
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("写入失败")
+        if self.bad in items:
+            raise ValueError(f"无效数据: {self.bad}")
+        self.batches.append(list(items))
+
+    async def write_one(self, item):
+        await self([item])
+
+
+def test_flush_by_size_and_interval():
+    print("测试攒够一批或等待超时后写入，关闭时写完剩余数据")
+    recorder = Recorder()
+
+    async def check():
+        buffer = WriteBuffer(recorder, batch_size=100, flush_interval=0.2, max_size=1000)
+        for i in range(250):
+            assert await buffer.put(i)
+        await asyncio.sleep(0.05)
+        # 两个整批立即写入，剩余 50 条等待超时
+        assert [len(batch) for batch in recorder.batches] == [100, 100]
+        await asyncio.sleep(0.3)
+        assert [len(batch) for batch in recorder.batches] == [100, 100, 50]
+
+        await buffer.put(250)
+        await buffer.close()
+        assert recorder.batches[-1] == [250]
+        assert not await buffer.put(251)
+        stats = buffer.stats()
+        assert stats["written"] == 251
+        assert stats["batches"] == 4
+        assert stats["max_batch_size"] == 100
+        assert stats["depth"] == 0
+        assert stats["rejected"] == 1
+        assert 150 <= stats["max_lag_ms"] < 1000
+
+    asyncio.run(check())
+    assert [item for batch in recorder.batches for item in batch] == list(range(251))
+
+
+def test_overflow_policies():
+    print("测试队列满时拒绝、丢弃最早的数据、等待空位")
+
+    async def check(overflow):
+        recorder = Recorder(delay=0.2)
+        buffer = WriteBuffer(recorder, batch_size=10, flush_interval=0.01, max_size=20, overflow=overflow)
+        results = [await buffer.put(i) for i in range(10)]
+        # 第一批正在写入（0.2 秒），仍计入队列长度，队列只能再放 10 条
+        await asyncio.sleep(0.05)
+        results += await asyncio.gather(*(buffer.put(i) for i in range(10, 40)))
+        await buffer.close()
+        return results, [item for batch in recorder.batches for item in batch], buffer.stats()
+
+    results, written, stats = asyncio.run(check("reject"))
+    assert results == [True] * 20 + [False] * 20
+    assert written == list(range(20))
+    assert stats["rejected"] == 20
+
+    results, written, stats = asyncio.run(check(OVERFLOW_DROP_OLDEST))
+    assert all(results)
+    assert written == list(range(10)) + list(range(30, 40))
+    assert stats["dropped"] == 20
+
+    results, written, stats = asyncio.run(check(OVERFLOW_BLOCK))
+    assert all(results)
+    assert written == list(range(40))
+
+
+def test_flush_retry():
+    print("测试批量写入失败时退避重试，重试期间这一批仍计入队列长度")
+    recorder = Recorder(failures=2)
+
+    async def check():
+        buffer = WriteBuffer(recorder, batch_size=5, flush_interval=0.01, max_size=10, retry_delay=0.05)
+        for i in range(5):
+            await buffer.put(i)
+        await asyncio.sleep(0.02)
+        # 第一批正在重试: 不丢弃，队列只剩 5 个空位
+        assert buffer.stats()["inflight"] == 5
+        results = [await buffer.put(i) for i in range(5, 11)]
+        assert results == [True] * 5 + [False]
+        await buffer.close()
+        return buffer.stats()
+
+    stats = asyncio.run(check())
+    assert stats["retried"] == 2
+    assert stats["failed"] == 0
+    assert stats["written"] == 10
+    assert [item for batch in recorder.batches for item in batch] == list(range(10))
+
+
+def test_flush_row_fallback():
+    print("测试重试后仍失败时逐条写入，只丢弃无效的那一条")
+    recorder = Recorder(bad=3)
+
+    async def check():
+        buffer = WriteBuffer(
+            recorder, batch_size=5, flush_interval=0.01, max_size=100,
+            write_one=recorder.write_one, retries=1, retry_delay=0.01,
+        )
+        for i in range(12):
+            await buffer.put(i)
+        await buffer.close()
+        return buffer.stats()
+
+    stats = asyncio.run(check())
+    assert stats["written"] == 11
+    assert stats["failed"] == 1
+    assert stats["row_fallbacks"] == 1
+    assert sorted(item for batch in recorder.batches for item in batch) == [i for i in range(12) if i != 3]
+
+
+class FakeCursor:
+    def __init__(self, calls):
+        self.calls = calls
+        self.rowcount = 0
+
+    def executemany(self, query, params_list):
+        self.calls.append((threading.current_thread().name, query, list(params_list)))
+        self.rowcount = len(params_list)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, calls):
+        self.calls = calls
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self.calls)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.calls = []
+
+    def connection(self):
+        return FakeConnection(self.calls)
+
+
+def test_track_event_endpoint():
+    print("测试埋点接口返回 202，事件在关闭时用一条 executemany 写入")
+    db_pool = DatabasePool()
+    original = (db_pool.pool, db_pool.state)
+    fake_pool = FakePool()
+    db_pool.pool, db_pool.state = fake_pool, POOL_READY
+    # 只在关闭时写入
+    tracking._tracking_service = tracking.TrackingService()
+    tracking._tracking_service.buffer.flush_interval = 60
+    app = FastAPI()
+    app.include_router(tracking.router)
+    app.add_event_handler("shutdown", tracking.close_tracking)
+    try:
+        with TestClient(app) as client:
+            for i in range(30):
+                response = client.post(
+                    "/tracking/event",
+                    json={"user_id": i, "source_platform": "pc", "event_type": "page_view", "event_params": {"i": i}},
+                    headers={"User-Agent": "test"},
+                )
+                assert response.status_code == 202
+                assert response.json()["message"] == "埋点已接收"
+            assert fake_pool.calls == []
+            stats = client.get("/tracking/stats").json()["data"]
+            assert stats["depth"] == 30
+    finally:
+        db_pool.pool, db_pool.state = original
+        tracking._tracking_service = None
+
+    assert len(fake_pool.calls) == 1
+    thread_name, query, rows = fake_pool.calls[0]
+    assert thread_name.startswith("db")
+    assert "INSERT INTO event_tracking" in query
+    assert [row[0] for row in rows] == list(range(30))
+    assert rows[0][1:3] == ("pc", "page_view")
+    # TestClient 的客户端地址 testclient 不是合法 IP，按 0.0.0.0 写入（列不允许为空）；事件时间为接收时间
+    assert rows[0][3] == bytes(4)
+    assert rows[0][4] == "test"
+    assert rows[0][7] is not None
+
+
+def test_stats_without_database():
+    print("测试数据库未就绪时埋点接口返回 503，统计接口仍然可用")
+    db_pool = DatabasePool()
+    original = (db_pool.pool, db_pool.state)
+    db_pool.pool, db_pool.state = None, POOL_WARMING
+    tracking._tracking_service = tracking.TrackingService()
+    app = FastAPI()
+    app.include_router(tracking.router)
+    try:
+        with TestClient(app) as client:
+            response = client.post(
+                "/tracking/event",
+                json={"user_id": 1, "source_platform": "pc", "event_type": "page_view", "event_params": {}},
+            )
+            assert response.status_code == 503
+            assert client.get("/tracking/events").status_code == 503
+            response = client.get("/tracking/stats")
+            assert response.status_code == 200
+            assert response.json()["data"]["depth"] == 0
+    finally:
+        db_pool.pool, db_pool.state = original
+        tracking._tracking_service = None
+
+
+if __name__ == "__main__":
+    test_flush_by_size_and_interval()
+    test_overflow_policies()
+    test_flush_retry()
+    test_flush_row_fallback()
+    test_track_event_endpoint()
+    test_stats_without_database()
+    print("测试通过")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+微博 statuses/show 接口方案的离线测试
+
+在本地启动一个桩服务，返回预置的 statuses/show JSON 和 m.weibo.cn 页面，
+不访问真实的微博服务
+"""
+
+import sys
+import os
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils import config, http_client
+from src.app.weibo.index import Weibo
+
+STATUS = {
+    "id": "5000000000000001",
+    "bid": "OkStub001",
+    "text": "桩服务微博正文",
+    "pic_ids": ["pic001", "pic002"],
+    "pics": [
+        {"pid": "pic001", "url": "https://wx1.sinaimg.cn/orj360/pic001.jpg"},
+        {"pid": "pic002", "url": "https://wx1.sinaimg.cn/orj360/pic002.jpg"},
+    ],
+}
+
+# 返回异常的微博 ID，用于测试回退到页面方案
+BROKEN_ID = "OkBroken01"
+# 接口返回 HTML（如登录页）的微博 ID
+HTML_ID = "OkLogin001"
+
+PAGE = (
+    "<html><head><title>微博正文</title></head><body><script>"
+    "var $render_data = [" + json.dumps({"status": STATUS}, ensure_ascii=False) + "][0] || {};"
+    "</script></body></html>"
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """返回预置内容的桩服务"""
+
+    requests = []
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        StubHandler.requests.append(parsed.path)
+        if parsed.path == "/statuses/show":
+            status_id = parse_qs(parsed.query).get("id", [""])[0]
+            if status_id == HTML_ID:
+                self.send_body("<html>请先登录</html>", "text/html")
+                return
+            if status_id == BROKEN_ID:
+                payload = {"ok": 0, "msg": "请求过于频繁"}
+            else:
+                payload = {"ok": 1, "data": STATUS}
+            self.send_body(json.dumps(payload, ensure_ascii=False), "application/json")
+        elif parsed.path.startswith("/detail/"):
+            self.send_body(PAGE, "text/html")
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def send_body(self, text, content_type):
+        body = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_stub(check):
+    """启动桩服务并将 statuses/show 接口指向它，执行 check(base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    original_api = config.WEIBO_STATUS_API
+    config.WEIBO_STATUS_API = base_url + "/statuses/show?id={id}"
+    StubHandler.requests = []
+
+    async def _run():
+        try:
+            return await check(base_url)
+        finally:
+            await http_client.close_http_client()
+
+    try:
+        asyncio.run(_run())
+    finally:
+        config.WEIBO_STATUS_API = original_api
+        server.shutdown()
+        server.server_close()
+
+
+def assert_status_result(weibo):
+    assert weibo.title == "桩服务微博正文"
+    assert weibo.description == "桩服务微博正文"
+    assert weibo.image_list == [
+        "https://wx1.sinaimg.cn/osj1080/pic001.jpg",
+        "https://wx1.sinaimg.cn/osj1080/pic002.jpg",
+    ]
+
+
+def test_weibo_statuses_show():
+    print("测试微博 statuses/show 接口方案")
+
+    async def check(base_url):
+        url = f"{base_url}/detail/{STATUS['bid']}"
+        weibo = await Weibo.create(url, "url", url=url)
+        assert weibo.parser == "json"
+        assert_status_result(weibo)
+        # 只请求接口，不请求页面
+        assert StubHandler.requests == ["/statuses/show"]
+
+    run_stub(check)
+
+
+def test_weibo_statuses_show_fallback():
+    print("测试微博 statuses/show 接口失败时回退到页面方案")
+
+    async def check(base_url):
+        url = f"{base_url}/detail/{BROKEN_ID}"
+        weibo = await Weibo.create(url, "url", url=url)
+        assert weibo.parser == "native"
+        assert_status_result(weibo)
+        assert StubHandler.requests == ["/statuses/show", f"/detail/{BROKEN_ID}"]
+
+    run_stub(check)
+
+
+def test_weibo_statuses_show_not_json():
+    print("测试微博 statuses/show 接口返回非 JSON 内容时不解析、直接回退到页面方案")
+
+    async def check(base_url):
+        url = f"{base_url}/detail/{HTML_ID}"
+        weibo = await Weibo.create(url, "url", url=url)
+        assert weibo.parser == "native"
+        assert_status_result(weibo)
+        assert StubHandler.requests == ["/statuses/show", f"/detail/{HTML_ID}"]
+
+    run_stub(check)
+
+
+def test_weibo_extract_invalid_status():
+    print("测试 statuses/show 数据无效时 extract 返回 None")
+    assert Weibo.extract("", "url", b'{"ok": 0, "msg": "error"}', source="json") is None
+    assert Weibo.extract("", "url", b'{"ok": 1, "data": null}', source="json") is None
+    assert Weibo.extract("", "url", b"<html></html>", source="json") is None
+    result = Weibo.extract("", "url", json.dumps({"ok": 1, "data": STATUS}).encode(), source="json")
+    assert result["_parser"] == "json"
+
+
+if __name__ == "__main__":
+    test_weibo_statuses_show()
+    test_weibo_statuses_show_fallback()
+    test_weibo_statuses_show_not_json()
+    test_weibo_extract_invalid_status()
+    print("测试通过")